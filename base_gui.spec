@@ -14,7 +14,11 @@ a = Analysis(
     ],
     datas=[
         ('assets\\bom.json', 'assets'),
+        ('assets\\bom_rules.json', 'assets'),
         ('assets\\pump_options.json', 'assets'),
+        ('assets\\pump_sizing.json', 'assets'),
+        ('assets\\pump_curves.csv', 'assets'),
+        ('assets\\pump_curves', 'assets\\pump_curves'),
         ('assets\\assembly_part_numbers.json', 'assets'),
         ('assets\\logo.png', 'assets'),
         ('assets\\guth_logo.png', 'assets'),
@@ -0,0 +1,129 @@
+"""Compare row-by-row and batched BOM inserts.
+
+Runs against an in-memory SQLite database by default, with an optional
+per-call delay that stands in for the network round trip to SQL Express.
+Pass --odbc with a connection string to run against a real ODBC target
+(e.g. the SQLite ODBC driver or a scratch SQL Server database) instead.
+
+    python benchmarks/bom_insert_benchmark.py --pumps 50 --latency-ms 5
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from database import execute_with_retry, insert_bom_items
+from utils.bom_utils import get_bom_catalog
+
+INSERT_QUERY = "INSERT INTO bom_items (serial_number, part_code, part_name, quantity) VALUES (?, ?, ?, ?)"
+
+
+class RoundTripCursor:
+    """Cursor wrapper that counts execute calls and sleeps once per call to simulate network latency.
+
+    Attributes other than its own are read from and written to the wrapped
+    cursor, so settings such as pyodbc's fast_executemany reach it.
+    """
+
+    _OWN_ATTRIBUTES = ("latency", "round_trips")
+
+    def __init__(self, cursor, latency):
+        self._cursor = cursor
+        self.latency = latency
+        self.round_trips = 0
+
+    def __setattr__(self, name, value):
+        if name.startswith("_") or name in self._OWN_ATTRIBUTES:
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._cursor, name, value)
+
+    def _round_trip(self):
+        self.round_trips += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def execute(self, query, params=()):
+        self._round_trip()
+        return self._cursor.execute(query, params)
+
+    def executemany(self, query, param_rows):
+        self._round_trip()
+        return self._cursor.executemany(query, param_rows)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+def connect(odbc_conn_str=None):
+    """Open the benchmark database and (re)create a scratch bom_items table."""
+    if odbc_conn_str:
+        import pyodbc
+        conn = pyodbc.connect(odbc_conn_str)
+    else:
+        conn = sqlite3.connect(":memory:")
+    cursor = conn.cursor()
+    try:
+        cursor.execute("DROP TABLE bom_items")
+    except Exception:
+        pass
+    cursor.execute("""
+        CREATE TABLE bom_items (
+            serial_number VARCHAR(50),
+            part_name VARCHAR(100) NOT NULL,
+            part_code VARCHAR(50) NOT NULL,
+            quantity INT NOT NULL
+        )
+    """)
+    conn.commit()
+    return conn
+
+
+def insert_row_by_row(cursor, serial, bom_items):
+    """The previous approach: one INSERT (and one round trip) per BOM line."""
+    for item in bom_items:
+        if item["quantity"] > 0:
+            execute_with_retry(cursor, INSERT_QUERY, (serial, item["part_code"], item["part_name"], item["quantity"]))
+
+
+def run(name, insert, conn, bom_items, pumps, latency):
+    cursor = RoundTripCursor(conn.cursor(), latency)
+    start = time.perf_counter()
+    for i in range(pumps):
+        insert(cursor, f"BENCH {i:05d}", bom_items)
+        conn.commit()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<14} {elapsed * 1000:10.1f} ms total {elapsed * 1000 / pumps:8.2f} ms/pump {cursor.round_trips / pumps:6.1f} round trips/pump")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark row-by-row vs batched BOM inserts.")
+    parser.add_argument("--model", default="P1 1.1KW", help="Pump model whose BOM is inserted")
+    parser.add_argument("--configuration", default="Standard")
+    parser.add_argument("--pumps", type=int, default=50, help="Number of pumps to insert per method")
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="Simulated round-trip latency per call")
+    parser.add_argument("--odbc", help="ODBC connection string to benchmark against instead of SQLite")
+    args = parser.parse_args()
+
+    bom_items = get_bom_catalog().get_items(args.model, args.configuration)
+    rows = sum(1 for item in bom_items if item["quantity"] > 0)
+    latency = args.latency_ms / 1000.0
+    print(f"{args.model}/{args.configuration}: {rows} BOM rows per pump, {args.pumps} pumps, {args.latency_ms} ms simulated latency")
+
+    conn = connect(args.odbc)
+    try:
+        row_time = run("row-by-row", insert_row_by_row, conn, bom_items, args.pumps, latency)
+        batch_time = run("batched", insert_bom_items, conn, bom_items, args.pumps, latency)
+    finally:
+        conn.close()
+    print(f"speed-up: {row_time / batch_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
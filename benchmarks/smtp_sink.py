@@ -0,0 +1,178 @@
+"""Local SMTP stand-in for exercising and benchmarking outbound email.
+
+SmtpSink is a minimal threaded SMTP server that accepts every message and
+counts sessions and messages, optionally sleeping before each reply to stand
+in for the network round trips to a real mail server. Run as a script it
+compares one SMTP session per message (what export_utils.send_email does)
+with the outbox sender worker, which reuses one session for the whole queue:
+
+    python benchmarks/smtp_sink.py --messages 200 --latency-ms 5
+
+or, with --serve, just listens so the application can be pointed at it
+(smtp_host localhost, the printed port, use_tls false, no credentials):
+
+    python benchmarks/smtp_sink.py --serve --port 2525
+"""
+import argparse
+import os
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from export_utils import build_email_message, open_smtp_session
+from utils.email_outbox import EmailOutbox, EmailSender, STATUS_PENDING
+
+
+class _SmtpHandler(socketserver.StreamRequestHandler):
+    """Speaks just enough SMTP for smtplib: EHLO/HELO, MAIL, RCPT, DATA, RSET, NOOP and QUIT."""
+
+    def reply(self, line):
+        if self.server.sink.latency:
+            time.sleep(self.server.sink.latency)
+        self.wfile.write(f"{line}\r\n".encode("ascii"))
+
+    def handle(self):
+        sink = self.server.sink
+        sink.count("sessions")
+        self.reply("220 localhost SMTP sink ready")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode("utf-8", "replace").strip().upper()
+            if command.startswith("EHLO"):
+                self.reply("250-localhost")
+                self.reply("250 8BITMIME")
+            elif command.startswith(("HELO", "MAIL", "RCPT", "RSET", "NOOP")):
+                self.reply("250 OK")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                size = 0
+                while True:
+                    data = self.rfile.readline()
+                    if not data or data == b".\r\n":
+                        break
+                    size += len(data)
+                sink.count("messages", size)
+                self.reply("250 OK queued")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class SmtpSink:
+    """A throwaway SMTP server on localhost that accepts and counts everything sent to it."""
+
+    def __init__(self, port=0, latency_ms=0.0):
+        self.latency = latency_ms / 1000.0
+        self._server = _Server(("127.0.0.1", port), _SmtpHandler)
+        self._server.sink = self
+        self.port = self._server.server_address[1]
+        self._lock = threading.Lock()
+        self.sessions = 0
+        self.messages = 0
+        self.bytes = 0
+        self._thread = None
+
+    def count(self, name, size=0):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+            self.bytes += size
+
+    def settings(self):
+        """Email settings that point the application at this sink."""
+        return {"smtp_host": "127.0.0.1", "smtp_port": str(self.port), "smtp_username": "", "smtp_password": "",
+                "sender_email": "registry@example.com", "use_tls": False}
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="smtp-sink", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def message_parts(i):
+    return (f"stores{i % 5}@example.com", f"Pump BENCH {i:05d} Moved to Assembly", "Dear Stores Team,",
+            f"<p>All items for pump BENCH {i:05d} pulled, moved to Assembly.</p>", "Regards,<br>Stores Team")
+
+
+def session_per_message(sink, count):
+    """The previous approach: connect, send and quit for every message."""
+    settings = sink.settings()
+    for i in range(count):
+        server, sender_email = open_smtp_session(settings)
+        with server:
+            to_email, subject, greeting, body_content, footer = message_parts(i)
+            msg = build_email_message(sender_email, to_email, subject, greeting, body_content, footer)
+            server.sendmail(sender_email, to_email, msg.as_string())
+
+
+def outbox_worker(sink, count):
+    """Queue every message in a scratch outbox and let one EmailSender drain it."""
+    with tempfile.TemporaryDirectory() as directory:
+        outbox = EmailOutbox(os.path.join(directory, "outbox.db"))
+        for i in range(count):
+            outbox.enqueue(*message_parts(i))
+        sender = EmailSender(outbox, settings_provider=sink.settings)
+        sender.start()
+        while outbox.counts().get(STATUS_PENDING):
+            time.sleep(0.01)
+        sender.stop()
+
+
+def run(name, send, count, latency_ms):
+    sink = SmtpSink(latency_ms=latency_ms).start()
+    try:
+        start = time.perf_counter()
+        send(sink, count)
+        elapsed = time.perf_counter() - start
+    finally:
+        sink.stop()
+    print(f"{name:<20} {elapsed * 1000:10.1f} ms total {count / elapsed:8.1f} msg/s "
+          f"{sink.sessions:5d} SMTP sessions {sink.messages:6d} messages")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local SMTP sink and email throughput benchmark.")
+    parser.add_argument("--messages", type=int, default=200, help="Messages sent per method")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="Simulated delay before each server reply")
+    parser.add_argument("--serve", action="store_true", help="Only run the sink until interrupted")
+    parser.add_argument("--port", type=int, default=0, help="Port for --serve (default: any free port)")
+    args = parser.parse_args()
+
+    if args.serve:
+        sink = SmtpSink(args.port, args.latency_ms).start()
+        print(f"SMTP sink listening on 127.0.0.1:{sink.port}; Ctrl+C to stop")
+        try:
+            while True:
+                time.sleep(5)
+                print(f"{sink.sessions} sessions, {sink.messages} messages, {sink.bytes} bytes")
+        except KeyboardInterrupt:
+            sink.stop()
+        return
+
+    print(f"{args.messages} messages, {args.latency_ms} ms simulated latency per SMTP reply")
+    fresh = run("session per message", session_per_message, args.messages, args.latency_ms)
+    reused = run("outbox worker", outbox_worker, args.messages, args.latency_ms)
+    print(f"speed-up: {fresh / reused:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,70 +1,125 @@
 import pyodbc
 import os
+import re
 import sys
 import threading
+import time
 from datetime import datetime
-import json
 import bcrypt
 from utils.serial_utils import generate_serial_number
-from utils.config import get_logger
+from utils.config import get_logger, get_config_service
+from utils.db_pool import ConnectionPool
+from utils.bom_utils import get_bom_catalog
 
 logger = get_logger("database")
 
 # Determine the base directory for bundled resources
 if getattr(sys, 'frozen', False):
     BASE_DIR = sys._MEIPASS
-    CONFIG_DIR = os.path.join(os.getenv('APPDATA'), "GuthPumpRegistry")
-    os.makedirs(CONFIG_DIR, exist_ok=True)
-    CONFIG_PATH = os.path.join(CONFIG_DIR, "config.json")
-    DEFAULT_CONFIG_PATH = os.path.join(BASE_DIR, "config.json")
-    BOM_PATH = os.path.join(BASE_DIR, "assets", "bom.json")
 else:
     BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-    CONFIG_PATH = os.path.join(BASE_DIR, "config.json")
-    DEFAULT_CONFIG_PATH = CONFIG_PATH
-    BOM_PATH = os.path.join(BASE_DIR, "assets", "bom.json")
 
 DB_LOCK = threading.Lock()
 
-# Connection pool (singleton pattern)
+# Connection pool (singleton pattern), rebuilt if the configured connection string changes
 _conn_pool = None
+_conn_pool_key = None
+# Connections added on top of max_size by reserve_connections, one per worker thread
+_reserved_connections = 0
 
-def load_config():
-    """Load configuration from config.json, falling back to defaults if missing."""
-    if os.path.exists(CONFIG_PATH):
-        try:
-            with open(CONFIG_PATH, "r") as f:
-                config = json.load(f)
-            logger.debug(f"Loaded config from {CONFIG_PATH}")
-            return config
-        except Exception as e:
-            logger.error(f"Failed to load config from {CONFIG_PATH}: {str(e)}")
-    if os.path.exists(DEFAULT_CONFIG_PATH):
-        try:
-            with open(DEFAULT_CONFIG_PATH, "r") as f:
-                config = json.load(f)
-            logger.debug(f"Loaded default config from {DEFAULT_CONFIG_PATH}")
-            return config
-        except Exception as e:
-            logger.error(f"Failed to load default config from {DEFAULT_CONFIG_PATH}: {str(e)}")
-    logger.warning(f"No config found at {CONFIG_PATH} or {DEFAULT_CONFIG_PATH}, using minimal defaults")
-    return {"connection_string": None}
+DEFAULT_POOL_SETTINGS = {
+    "max_size": 2,  # For threads outside the worker pools: the Tk thread, plus one spare
+    "idle_timeout": 300,
+    "checkout_timeout": 30,
+    "health_check_interval": 30,
+}
 
-def get_db_connection():
-    """Get a singleton database connection, forcing a new connection to ensure schema updates are recognized."""
-    global _conn_pool
-    try:
-        config = load_config()
-        conn_str = config.get("connection_string")
-        if not conn_str:
-            raise ValueError("No connection string found in config.json. Please configure via the application.")
-        # Force a new connection each time for testing to avoid schema caching issues
-        with DB_LOCK:
+# Rows fetched per keyset page by the list views
+PAGE_SIZE = 200
+
+# Filters accepted by fetch_pumps_page, mapped to their pumps column
+PUMP_FILTER_COLUMNS = {
+    "status": "status",
+    "branch": "branch",
+    "customer": "customer",
+    "serial": "serial_number",
+    "model": "pump_model",
+}
+
+# Typed audit_log events; action keeps the human-readable text shown in the Activity Log
+EVENT_PUMP_CREATED = "pump_created"
+EVENT_STATUS_CHANGED = "status_changed"
+EVENT_PART_PULLED = "part_pulled"
+EVENT_PART_NOT_PULLED = "part_not_pulled"
+EVENT_PUMP_DELETED = "pump_deleted"
+EVENT_OTHER = "other"
+
+# Free-text actions written before audit_log had typed columns, for migrate_audit_log
+LEGACY_AUDIT_PATTERNS = (
+    (EVENT_PUMP_CREATED, re.compile(r"^Created pump S/N: (?P<serial>\S+)$")),
+    (EVENT_PART_PULLED, re.compile(r"^Pulled part (?P<part>.+?) for S/N: (?P<serial>\S+)$")),
+    (EVENT_PART_NOT_PULLED, re.compile(r"^Reason for not pulling (?P<part>.+?) on (?P<serial>\S+): (?P<reason>.*)$", re.DOTALL)),
+    (EVENT_STATUS_CHANGED, re.compile(r"^Updated S/N: (?P<serial>\S+) to (?P<to>.+)$")),
+    (EVENT_STATUS_CHANGED, re.compile(r"^Pump (?P<serial>\S+) moved to (?P<to>.+?) by .+$")),
+)
+
+# Columns the list views read, carried by the keyset indexes so a page never touches the table
+PUMP_LIST_INCLUDE = ("customer", "branch", "pump_model", "configuration", "impeller_size", "connection_type",
+                     "pressure_required", "flow_rate_required", "custom_motor", "flush_seal_housing",
+                     "assembly_part_number", "requested_by", "mechanical_seals", "o_ring_material")
+
+def get_pool():
+    """Return the shared connection pool, creating it on first use."""
+    global _conn_pool, _conn_pool_key
+    config = get_config_service()
+    conn_str = config.get_connection_string()
+    if not conn_str:
+        raise ValueError("No connection string found in config.json. Please configure via the application.")
+    settings = dict(DEFAULT_POOL_SETTINGS)
+    settings.update(config.get("db_pool") or {})
+    key = (conn_str, tuple(sorted(settings.items())))
+    with DB_LOCK:
+        if _conn_pool is None or _conn_pool_key != key:
             if _conn_pool is not None:
-                _conn_pool.close()  # Close existing connection
-            _conn_pool = pyodbc.connect(conn_str)
-            logger.info("Database connection established successfully")
+                logger.info("Connection settings changed, rebuilding connection pool")
+                _conn_pool.close()
+            settings["max_size"] += _reserved_connections
+            _conn_pool = ConnectionPool(lambda: pyodbc.connect(conn_str), **settings)
+            _conn_pool_key = key
+            logger.info(f"Database connection pool created (max_size={settings['max_size']})")
         return _conn_pool
+
+def reserve_connections(count):
+    """Grow the pool by count connections for a pool of count worker threads.
+
+    Called by each worker pool when it is created, so busy workers can never
+    take the connection a call on the Tk thread needs.
+    """
+    global _reserved_connections
+    with DB_LOCK:
+        _reserved_connections += count
+        if _conn_pool is not None:
+            _conn_pool.grow(count)
+
+def get_pool_stats():
+    """Return checkout/handshake counters for the connection pool, or None if it has not been used yet."""
+    with DB_LOCK:
+        pool = _conn_pool
+    return pool.stats() if pool is not None else None
+
+def close_pool():
+    """Close all pooled connections, e.g. on application exit."""
+    global _conn_pool, _conn_pool_key
+    with DB_LOCK:
+        if _conn_pool is not None:
+            _conn_pool.close()
+        _conn_pool = None
+        _conn_pool_key = None
+
+def get_db_connection():
+    """Check out a pooled database connection; close() or leaving a `with` block returns it to the pool."""
+    try:
+        return get_pool().connection()
     except pyodbc.Error as e:
         error_msg = f"Failed to connect to the database: {str(e)}"
         logger.error(error_msg)
@@ -75,10 +130,57 @@ def get_db_connection():
         logger.error(f"Unexpected error while connecting to the database: {str(e)}")
         raise
 
+def execute_with_retry(cursor, query, params, max_retries=3, delay=1):
+    """Execute a database query with retry logic for transient errors."""
+    for attempt in range(max_retries):
+        try:
+            cursor.execute(query, params)
+            return
+        except pyodbc.Error as e:
+            if attempt == max_retries - 1:
+                logger.error(f"Failed to execute query after {max_retries} attempts: {query}, params: {params}, error: {e}")
+                raise
+            logger.warning(f"Database operation failed, retrying ({attempt+1}/{max_retries}): {e}")
+            time.sleep(delay)
+
+def executemany_with_retry(cursor, query, param_rows, max_retries=3, delay=1, cleanup=None):
+    """Execute a parameterised statement for many rows in one round trip, retrying transient errors.
+
+    A failed batch may have been partially applied, so `cleanup` (query, params) is run
+    before each retry to make the batch safe to resend.
+    """
+    if not param_rows:
+        return
+    try:
+        cursor.fast_executemany = True  # Send all rows as one parameter array instead of one call per row
+    except AttributeError:
+        pass  # Not a pyodbc cursor (e.g. the sqlite3 stand-in used by the benchmarks)
+    for attempt in range(max_retries):
+        try:
+            cursor.executemany(query, param_rows)
+            return
+        except pyodbc.Error as e:
+            if attempt == max_retries - 1:
+                logger.error(f"Failed to execute batch of {len(param_rows)} rows after {max_retries} attempts: {query}, error: {e}")
+                raise
+            logger.warning(f"Batch database operation failed, retrying ({attempt+1}/{max_retries}): {e}")
+            time.sleep(delay)
+            if cleanup:
+                execute_with_retry(cursor, *cleanup, max_retries=max_retries, delay=delay)
+
+def insert_bom_items(cursor, serial_number, bom_items, max_retries=3, delay=1):
+    """Insert all BOM items with a non-zero quantity for a pump in a single batch; returns the rows written."""
+    items = [item for item in bom_items if item["quantity"] > 0]
+    params = [(serial_number, item["part_code"], item["part_name"], item["quantity"]) for item in items]
+    executemany_with_retry(cursor, "INSERT INTO bom_items (serial_number, part_code, part_name, quantity) VALUES (?, ?, ?, ?)",
+                           params, max_retries, delay,
+                           cleanup=("DELETE FROM bom_items WHERE serial_number = ?", (serial_number,)))
+    logger.info(f"Inserted {len(items)} BOM items for pump {serial_number}")
+    return items
+
 def initialize_database():
     """Initialize the GuthPumpRegistry tables if they do not exist, without dropping existing tables."""
-    config = load_config()
-    conn_str = config.get("connection_string")
+    conn_str = get_config_service().get_connection_string()
     try:
         with pyodbc.connect(conn_str) as conn:
             cursor = conn.cursor()
@@ -153,9 +255,57 @@ def initialize_database():
                     id INT IDENTITY(1,1) PRIMARY KEY,
                     timestamp DATETIME NOT NULL,
                     username NVARCHAR(50) NOT NULL,
-                    action NVARCHAR(MAX) NOT NULL
+                    action NVARCHAR(MAX) NOT NULL,
+                    event_type NVARCHAR(30),
+                    serial_number NVARCHAR(50),
+                    part_code NVARCHAR(50),
+                    from_status NVARCHAR(20),
+                    to_status NVARCHAR(20),
+                    reason NVARCHAR(MAX)
+                )
+            """)
+            # One row per stage a pump has been in; exited_at is NULL for its current stage
+            cursor.execute("""
+                IF NOT EXISTS (SELECT * FROM sys.tables WHERE name = 'pump_status_history')
+                CREATE TABLE pump_status_history (
+                    id INT IDENTITY(1,1) PRIMARY KEY,
+                    serial_number NVARCHAR(50) NOT NULL,
+                    status NVARCHAR(20) NOT NULL,
+                    entered_at DATETIME NOT NULL,
+                    exited_at DATETIME,
+                    entered_by NVARCHAR(50),
+                    exited_by NVARCHAR(50),
+                    FOREIGN KEY (serial_number) REFERENCES pumps(serial_number) ON DELETE CASCADE
+                )
+            """)
+            # Daily pump counts per model/configuration/branch/status, maintained by update_rollups
+            cursor.execute("""
+                IF NOT EXISTS (SELECT * FROM sys.tables WHERE name = 'pump_daily_rollup')
+                CREATE TABLE pump_daily_rollup (
+                    day DATE NOT NULL,
+                    pump_model NVARCHAR(50) NOT NULL,
+                    configuration NVARCHAR(50) NOT NULL,
+                    branch NVARCHAR(50) NOT NULL,
+                    status NVARCHAR(20) NOT NULL,
+                    created INT NOT NULL DEFAULT 0,
+                    entered INT NOT NULL DEFAULT 0,
+                    exited INT NOT NULL DEFAULT 0,
+                    PRIMARY KEY (day, pump_model, configuration, branch, status)
+                )
+            """)
+            cursor.execute("""
+                IF NOT EXISTS (SELECT * FROM sys.tables WHERE name = 'rollup_state')
+                CREATE TABLE rollup_state (
+                    name NVARCHAR(50) PRIMARY KEY,
+                    last_audit_id INT NOT NULL
                 )
             """)
+            # Typed event columns for audit_log tables created before they existed
+            cursor.execute("""
+                IF COL_LENGTH('audit_log', 'event_type') IS NULL
+                ALTER TABLE audit_log ADD event_type NVARCHAR(30), serial_number NVARCHAR(50), part_code NVARCHAR(50),
+                                          from_status NVARCHAR(20), to_status NVARCHAR(20), reason NVARCHAR(MAX)
+            """)
             cursor.execute("""
                 IF NOT EXISTS (SELECT * FROM sys.tables WHERE name = 'serial_counter')
                 CREATE TABLE serial_counter (
@@ -169,6 +319,42 @@ def initialize_database():
             # Create indexes if they don’t exist
             cursor.execute("IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'idx_pumps_status') CREATE INDEX idx_pumps_status ON pumps(status)")
             cursor.execute("IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'idx_bom_items_serial') CREATE INDEX idx_bom_items_serial ON bom_items(serial_number)")
+            # Covering indexes for the keyset-paginated list queries (see fetch_pumps_page / fetch_audit_log_page)
+            include = ", ".join(PUMP_LIST_INCLUDE)
+            cursor.execute(f"""
+                IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'idx_pumps_created_serial')
+                CREATE INDEX idx_pumps_created_serial ON pumps(created_at DESC, serial_number DESC) INCLUDE (status, {include})
+            """)
+            cursor.execute(f"""
+                IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'idx_pumps_status_created_serial')
+                CREATE INDEX idx_pumps_status_created_serial ON pumps(status, created_at DESC, serial_number DESC) INCLUDE ({include})
+            """)
+            cursor.execute("""
+                IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'idx_audit_log_timestamp_id')
+                CREATE INDEX idx_audit_log_timestamp_id ON audit_log(timestamp DESC, id DESC) INCLUDE (username, action)
+            """)
+            # Event lookups: per pump/part (unpulled reasons, stage entry times) and per transition (throughput reports)
+            cursor.execute("""
+                IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'idx_audit_log_serial_event')
+                CREATE INDEX idx_audit_log_serial_event ON audit_log(serial_number, event_type, part_code, timestamp) INCLUDE (to_status, reason)
+            """)
+            cursor.execute("""
+                IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'idx_audit_log_event_status')
+                CREATE INDEX idx_audit_log_event_status ON audit_log(event_type, to_status, timestamp) INCLUDE (serial_number, from_status)
+            """)
+            # Closing a pump's open stage, and stage timings / WIP by status
+            cursor.execute("""
+                IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'idx_status_history_serial')
+                CREATE INDEX idx_status_history_serial ON pump_status_history(serial_number, exited_at)
+            """)
+            cursor.execute("""
+                IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'idx_status_history_status')
+                CREATE INDEX idx_status_history_status ON pump_status_history(status, exited_at) INCLUDE (serial_number, entered_at)
+            """)
+            conn.commit()
+            migrate_audit_log(cursor)
+            backfill_status_history(cursor)
+            update_rollups(cursor)
             conn.commit()
             logger.info("Database tables verified/initialized successfully.")
     except pyodbc.Error as e:
@@ -222,14 +408,11 @@ def create_pump(cursor, pump_model, configuration, customer, requested_by, branc
               assembly_part_number, None, None, None, None, None, None, None, None))
         
         if insert_bom:
-            bom_items = load_bom_from_json(pump_model, configuration)
-            for item in bom_items:
-                cursor.execute("INSERT INTO bom_items (serial_number, part_name, part_code, quantity) VALUES (?, ?, ?, ?)",
-                               (serial, item["part_name"], item["part_code"], item["quantity"]))
-            logger.info(f"Inserted {len(bom_items)} BOM items for pump {serial}")
-
-        cursor.execute("INSERT INTO audit_log (timestamp, username, action) VALUES (?, ?, ?)",
-                       (datetime.now(), requested_by, f"Created pump S/N: {serial}"))
+            insert_bom_items(cursor, serial, load_bom_from_json(pump_model, configuration))
+
+        log_audit_event(cursor, requested_by, EVENT_PUMP_CREATED, f"Created pump S/N: {serial}",
+                        serial_number=serial, to_status="Stores")
+        record_status_change(cursor, serial, None, "Stores", requested_by)
         return serial
     except Exception as e:
         logger.error(f"Failed to create pump {serial}: {str(e)}")
@@ -240,38 +423,356 @@ def pull_bom_item(cursor, serial_number, part_code, username):
     try:
         cursor.execute("UPDATE bom_items SET pulled_at = ? WHERE serial_number = ? AND part_code = ?",
                        (datetime.now(), serial_number, part_code))
-        cursor.execute("INSERT INTO audit_log (timestamp, username, action) VALUES (?, ?, ?)",
-                       (datetime.now(), username, f"Pulled part {part_code} for S/N: {serial_number}"))
+        log_audit_event(cursor, username, EVENT_PART_PULLED, f"Pulled part {part_code} for S/N: {serial_number}",
+                        serial_number=serial_number, part_code=part_code)
         logger.info(f"Pulled BOM item {part_code} for {serial_number} by {username}")
     except Exception as e:
         logger.error(f"Failed to pull BOM item {part_code} for {serial_number}: {str(e)}")
         raise
 
-def update_pump_status(cursor, serial_number, new_status, username):
-    """Update the status of a pump and log the action."""
+def log_audit_event(cursor, username, event_type, action, serial_number=None, part_code=None,
+                    from_status=None, to_status=None, reason=None, timestamp=None):
+    """Write a typed audit_log event; action is the text shown in the Activity Log."""
+    cursor.execute("""
+        INSERT INTO audit_log (timestamp, username, action, event_type, serial_number, part_code, from_status, to_status, reason)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, (timestamp or datetime.now(), username, action, event_type, serial_number, part_code, from_status, to_status, reason))
+
+def update_pump_status(cursor, serial_number, new_status, username, fields=None):
+    """Update the status of a pump (and any other columns in fields) and log the transition.
+
+    Returns the previous status, or None if there is no such pump. Every
+    status change should go through here so the audit trail stays complete.
+    """
+    fields = fields or {}
+    assignments = "".join(f", {column} = ?" for column in fields)
     try:
-        cursor.execute("UPDATE pumps SET status = ? WHERE serial_number = ?", (new_status, serial_number))
-        cursor.execute("INSERT INTO audit_log (timestamp, username, action) VALUES (?, ?, ?)",
-                       (datetime.now(), username, f"Updated S/N: {serial_number} to {new_status}"))
-        logger.info(f"Status updated: {serial_number} to {new_status} by {username}")
+        # OUTPUT reads the old status in the same statement, so the transition logged is the one applied
+        cursor.execute(f"UPDATE pumps SET status = ?{assignments} OUTPUT deleted.status WHERE serial_number = ?",
+                       [new_status] + list(fields.values()) + [serial_number])
+        row = cursor.fetchone()
+        if row is None:
+            logger.warning(f"Cannot update status of {serial_number} to {new_status}: pump not found")
+            return None
+        old_status = row[0]
+        now = datetime.now()
+        log_audit_event(cursor, username, EVENT_STATUS_CHANGED, f"Updated S/N: {serial_number} to {new_status}",
+                        serial_number=serial_number, from_status=old_status, to_status=new_status, timestamp=now)
+        if new_status != old_status:
+            record_status_change(cursor, serial_number, old_status, new_status, username, now)
+        logger.info(f"Status updated: {serial_number} from {old_status} to {new_status} by {username}")
+        return old_status
     except Exception as e:
         logger.error(f"Failed to update status for {serial_number}: {str(e)}")
         raise
 
+def record_status_change(cursor, serial_number, old_status, new_status, username, timestamp=None):
+    """Close the pump's open stage in pump_status_history and open one for new_status."""
+    timestamp = timestamp or datetime.now()
+    if old_status is not None:
+        cursor.execute("""
+            UPDATE pump_status_history SET exited_at = ?, exited_by = ?
+            WHERE serial_number = ? AND exited_at IS NULL
+        """, (timestamp, username, serial_number))
+    cursor.execute("""
+        INSERT INTO pump_status_history (serial_number, status, entered_at, entered_by) VALUES (?, ?, ?, ?)
+    """, (serial_number, new_status, timestamp, username))
+
+def backfill_status_history(cursor, batch_size=1000):
+    """Build pump_status_history from pumps and their status_changed audit events, if it is empty.
+
+    Each pump gets a Stores stage from its created_at, then one stage per
+    recorded transition; the last stage is left open. Pumps whose transitions
+    predate the audit trail get a single open stage in their current status.
+    Returns the number of stages written.
+    """
+    cursor.execute("SELECT TOP 1 1 FROM pump_status_history")
+    if cursor.fetchone():
+        return 0
+    cursor.execute("""
+        SELECT serial_number, timestamp, to_status, username FROM audit_log
+        WHERE event_type = ? AND serial_number IS NOT NULL AND to_status IS NOT NULL
+        ORDER BY serial_number, timestamp, id
+    """, (EVENT_STATUS_CHANGED,))
+    transitions = {}
+    for serial, timestamp, to_status, username in cursor.fetchall():
+        transitions.setdefault(serial, []).append((timestamp, to_status, username))
+
+    cursor.execute("SELECT serial_number, created_at, status, requested_by FROM pumps")
+    pumps = cursor.fetchall()
+    rows = []
+    for serial, created_at, status, requested_by in pumps:
+        stages = [(created_at, "Stores", requested_by)]
+        for timestamp, to_status, username in transitions.get(serial, ()):
+            if to_status != stages[-1][1] and timestamp >= stages[-1][0]:
+                stages.append((timestamp, to_status, username))
+        if stages[-1][1] != status:
+            # The audit trail does not explain the current status; start it where the trail ends
+            if len(stages) == 1:
+                stages = [(created_at, status, None)]
+            else:
+                stages.append((stages[-1][0], status, None))
+        for (entered_at, stage, entered_by), following in zip(stages, stages[1:] + [None]):
+            exited_at, exited_by = (following[0], following[2]) if following else (None, None)
+            rows.append((serial, stage, entered_at, exited_at, entered_by, exited_by))
+    for start in range(0, len(rows), batch_size):
+        executemany_with_retry(cursor, """
+            INSERT INTO pump_status_history (serial_number, status, entered_at, exited_at, entered_by, exited_by)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, rows[start:start + batch_size])
+    cursor.connection.commit()
+    logger.info(f"Backfilled {len(rows)} status history rows for {len(pumps)} pumps")
+    return len(rows)
+
+def update_rollups(cursor):
+    """Fold audit events newer than the rollup's high-water mark into pump_daily_rollup; returns the events applied.
+
+    A pump_created event counts as created and entered for Stores; a status
+    change counts as exited for the old status and entered for the new one; a
+    pump_deleted event exits the pump's last status. So per status,
+    SUM(entered - exited) is the number of pumps currently in it, and SUM(created)
+    by day, model, configuration or branch is the production history. Events are
+    attributed to the pump's current model/configuration/branch ('' once it has
+    been deleted). The first call seeds the rollup from pumps instead (see
+    seed_rollups). The caller commits; the high-water mark row is locked until
+    then so concurrent catch-ups cannot apply the same events twice.
+    """
+    cursor.execute("SELECT last_audit_id FROM rollup_state WITH (UPDLOCK, HOLDLOCK) WHERE name = 'pump_daily_rollup'")
+    row = cursor.fetchone()
+    if row is None:
+        seed_rollups(cursor)
+        return 0
+    last_id = row[0]
+    cursor.execute("SELECT MAX(id) FROM audit_log")
+    high_water = cursor.fetchone()[0] or 0
+    if high_water <= last_id:
+        return 0
+    cursor.execute("""
+        MERGE pump_daily_rollup AS target
+        USING (
+            SELECT day, pump_model, configuration, branch, status, SUM(created) AS created, SUM(entered) AS entered, SUM(exited) AS exited
+            FROM (
+                SELECT CAST(a.timestamp AS DATE) AS day, COALESCE(p.pump_model, '') AS pump_model,
+                       COALESCE(p.configuration, '') AS configuration, COALESCE(p.branch, '') AS branch,
+                       a.to_status AS status, CASE WHEN a.event_type = ? THEN 1 ELSE 0 END AS created, 1 AS entered, 0 AS exited
+                FROM audit_log a LEFT JOIN pumps p ON p.serial_number = a.serial_number
+                WHERE a.id > ? AND a.id <= ? AND a.event_type IN (?, ?) AND a.to_status IS NOT NULL
+                  AND (a.from_status IS NULL OR a.from_status <> a.to_status)
+                UNION ALL
+                SELECT CAST(a.timestamp AS DATE), COALESCE(p.pump_model, ''), COALESCE(p.configuration, ''), COALESCE(p.branch, ''),
+                       a.from_status, 0, 0, 1
+                FROM audit_log a LEFT JOIN pumps p ON p.serial_number = a.serial_number
+                WHERE a.id > ? AND a.id <= ? AND a.event_type IN (?, ?) AND a.from_status IS NOT NULL
+                  AND (a.to_status IS NULL OR a.from_status <> a.to_status)
+            ) events
+            GROUP BY day, pump_model, configuration, branch, status
+        ) AS source
+        ON target.day = source.day AND target.pump_model = source.pump_model AND target.configuration = source.configuration
+           AND target.branch = source.branch AND target.status = source.status
+        WHEN MATCHED THEN UPDATE SET created = target.created + source.created, entered = target.entered + source.entered,
+                                     exited = target.exited + source.exited
+        WHEN NOT MATCHED THEN INSERT (day, pump_model, configuration, branch, status, created, entered, exited)
+                              VALUES (source.day, source.pump_model, source.configuration, source.branch, source.status,
+                                      source.created, source.entered, source.exited);
+    """, (EVENT_PUMP_CREATED, last_id, high_water, EVENT_PUMP_CREATED, EVENT_STATUS_CHANGED,
+          last_id, high_water, EVENT_STATUS_CHANGED, EVENT_PUMP_DELETED))
+    cursor.execute("UPDATE rollup_state SET last_audit_id = ? WHERE name = 'pump_daily_rollup'", (high_water,))
+    logger.info(f"Rolled up audit events {last_id + 1}-{high_water} into pump_daily_rollup")
+    return high_water - last_id
+
+def seed_rollups(cursor):
+    """Start pump_daily_rollup from a snapshot of pumps, with the high-water mark at the newest audit event.
+
+    Older status changes were not all audited, so replaying the audit trail
+    would misplace pumps; each existing pump instead counts as created on its
+    created_at day and entered into its current status. HOLDLOCK keeps new
+    audit events out until the caller commits, so none is counted twice or lost.
+    """
+    cursor.execute("SELECT MAX(id) FROM audit_log WITH (HOLDLOCK)")
+    high_water = cursor.fetchone()[0] or 0
+    cursor.execute("DELETE FROM pump_daily_rollup")
+    cursor.execute("""
+        INSERT INTO pump_daily_rollup (day, pump_model, configuration, branch, status, created, entered, exited)
+        SELECT CAST(created_at AS DATE), pump_model, configuration, COALESCE(branch, ''), status, COUNT(*), COUNT(*), 0
+        FROM pumps
+        GROUP BY CAST(created_at AS DATE), pump_model, configuration, COALESCE(branch, ''), status
+    """)
+    cursor.execute("INSERT INTO rollup_state (name, last_audit_id) VALUES ('pump_daily_rollup', ?)", (high_water,))
+    logger.info(f"Seeded pump_daily_rollup from pumps up to audit event {high_water}")
+
+def delete_pump(cursor, serial_number, username):
+    """Delete a pump, keeping the rollups consistent; returns False if there is no such pump."""
+    # Roll up the pump's own events while its model/branch can still be looked up
+    update_rollups(cursor)
+    cursor.execute("DELETE FROM pumps OUTPUT deleted.status WHERE serial_number = ?", (serial_number,))
+    row = cursor.fetchone()
+    if row is None:
+        return False
+    log_audit_event(cursor, username, EVENT_PUMP_DELETED, f"Deleted pump S/N: {serial_number}",
+                    serial_number=serial_number, from_status=row[0])
+    logger.info(f"Deleted pump {serial_number} by {username}")
+    return True
+
+def parse_legacy_action(action):
+    """Return (event_type, serial_number, part_code, to_status, reason) parsed from a free-text audit action."""
+    for event_type, pattern in LEGACY_AUDIT_PATTERNS:
+        match = pattern.match(action or "")
+        if match:
+            fields = match.groupdict()
+            return (event_type, fields.get("serial"), fields.get("part"), fields.get("to"), fields.get("reason"))
+    return (EVENT_OTHER, None, None, None, None)
+
+def migrate_audit_log(cursor, batch_size=1000):
+    """Back-fill the typed columns of audit rows written before they existed; returns the rows migrated.
+
+    Rows are read oldest first in id order so each status change can be given
+    the status it left (the pump's previous transition, or Stores after
+    creation). Each batch is committed, and rows already typed are never read
+    again, so the migration can be interrupted and rerun.
+    """
+    last_status = {}
+    last_id = 0
+    total = 0
+    while True:
+        cursor.execute("""
+            SELECT TOP (?) id, action FROM audit_log
+            WHERE event_type IS NULL AND id > ? ORDER BY id
+        """, (batch_size, last_id))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        updates = []
+        for row_id, action in rows:
+            event_type, serial, part, to_status, reason = parse_legacy_action(action)
+            from_status = None
+            if event_type == EVENT_PUMP_CREATED:
+                to_status = last_status[serial] = "Stores"
+            elif event_type == EVENT_STATUS_CHANGED:
+                from_status = last_status.get(serial)
+                last_status[serial] = to_status
+            updates.append((event_type, serial, part, from_status, to_status, reason, row_id))
+        executemany_with_retry(cursor, """
+            UPDATE audit_log SET event_type = ?, serial_number = ?, part_code = ?, from_status = ?, to_status = ?, reason = ?
+            WHERE id = ?
+        """, updates)
+        cursor.connection.commit()
+        last_id = rows[-1][0]
+        total += len(rows)
+    if total:
+        logger.info(f"Migrated {total} audit_log rows to typed events")
+    return total
+
+def _fetch_page(cursor, table, columns, keys, conditions, params, after, limit):
+    """Return (rows, next_key) for one keyset page of table, newest first.
+
+    keys is the (datetime column, unique tiebreaker column) pair the rows are
+    ordered by, descending. Rows are the requested columns only; next_key is
+    the key of the last row, to pass as `after` for the following page, or
+    None once the table is exhausted.
+    """
+    conditions = list(conditions)
+    params = list(params)
+    if after is not None:
+        # CAST keeps the DATETIME equality exact; a DATETIME2 parameter would not match rows stored at .003/.007s
+        conditions.append(f"({keys[0]} < CAST(? AS DATETIME) OR ({keys[0]} = CAST(? AS DATETIME) AND {keys[1]} < ?))")
+        params += [after[0], after[0], after[1]]
+    query = f"SELECT TOP (?) {', '.join(columns)}, {keys[0]}, {keys[1]} FROM {table}"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += f" ORDER BY {keys[0]} DESC, {keys[1]} DESC"
+    cursor.execute(query, [limit] + params)
+    rows = cursor.fetchall()
+    next_key = (rows[-1][-2], rows[-1][-1]) if len(rows) == limit else None
+    return [tuple(row)[:-2] for row in rows], next_key
+
+def pump_filter_conditions(status=None, branch=None, customer=None, serial=None, model=None, search=None):
+    """Return (conditions, params) selecting pumps by the dashboard filters.
+
+    Each filter is an exact value or a list/tuple of accepted values; None
+    means no filter. search is a (filter name, text) pair matched as a
+    case-insensitive substring, as typed into a dashboard search box.
+    """
+    conditions = []
+    params = []
+    filters = {"status": status, "branch": branch, "customer": customer, "serial": serial, "model": model}
+    for name, value in filters.items():
+        if value is None:
+            continue
+        column = PUMP_FILTER_COLUMNS[name]
+        if isinstance(value, (list, tuple)):
+            if not value:
+                conditions.append("1 = 0")
+                continue
+            conditions.append(f"{column} IN ({', '.join('?' * len(value))})")
+            params += list(value)
+        else:
+            conditions.append(f"{column} = ?")
+            params.append(value)
+    if search and search[1]:
+        name, text = search
+        conditions.append(f"LOWER({PUMP_FILTER_COLUMNS[name]}) LIKE ?")
+        params.append(f"%{text.lower()}%")
+    return conditions, params
+
+def fetch_pumps_page(cursor, columns, after=None, limit=PAGE_SIZE, status=None, branch=None, customer=None,
+                     serial=None, model=None, search=None):
+    """Return (rows, next_key) for a page of pumps ordered by (created_at, serial_number), newest first.
+
+    The filters are those of pump_filter_conditions; pass next_key back as
+    `after` for the following page.
+    """
+    conditions, params = pump_filter_conditions(status, branch, customer, serial, model, search)
+    return _fetch_page(cursor, "pumps", columns, ("created_at", "serial_number"), conditions, params, after, limit)
+
+def fetch_audit_log_page(cursor, after=None, limit=PAGE_SIZE):
+    """Return (rows, next_key) for a page of (timestamp, username, action) audit entries, newest first."""
+    return _fetch_page(cursor, "audit_log", ("timestamp", "username", "action"), ("timestamp", "id"), (), (), after, limit)
+
+def query_completed_test_data(cursor, since=None, until=None, model=None, customer=None):
+    """Execute a query for the test data of Completed pumps; read its rows with fetchmany.
+
+    Rows are (serial_number, pump_model, customer, completed_at, test_data),
+    oldest completion first, where completed_at is when the pump entered
+    Completed. since/until are datetimes bounding completed_at (until is
+    exclusive); model and customer are an exact value or a list of values.
+
+    Approvals before the audit trail existed left only a backfilled history
+    stage (no entered_by) whose start is a guess, so for those pumps
+    completed_at is the approval_date in their test data, else test_date,
+    and only then the backfilled stage start.
+    """
+    conditions = ["p.status = 'Completed'"]
+    params = []
+    if since is not None:
+        conditions.append("c.completed_at >= ?")
+        params.append(since)
+    if until is not None:
+        conditions.append("c.completed_at < ?")
+        params.append(until)
+    for column, value in (("p.pump_model", model), ("p.customer", customer)):
+        if value is None:
+            continue
+        values = list(value) if isinstance(value, (list, tuple)) else [value]
+        conditions.append(f"{column} IN ({', '.join('?' * len(values))})" if values else "1 = 0")
+        params += values
+    cursor.execute(f"""
+        SELECT p.serial_number, p.pump_model, p.customer, c.completed_at, p.test_data
+        FROM pumps p
+        JOIN pump_status_history h ON h.serial_number = p.serial_number AND h.status = 'Completed' AND h.exited_at IS NULL
+        CROSS APPLY (
+            SELECT CASE WHEN h.entered_by IS NOT NULL THEN h.entered_at
+                        ELSE COALESCE(TRY_CONVERT(DATETIME, CASE WHEN ISJSON(p.test_data) = 1
+                                                                 THEN JSON_VALUE(p.test_data, '$.approval_date') END),
+                                      CAST(p.test_date AS DATETIME), h.entered_at)
+                   END AS completed_at
+        ) c
+        WHERE {" AND ".join(conditions)}
+        ORDER BY c.completed_at, p.serial_number
+    """, params)
+
 def load_bom_from_json(pump_model, configuration):
-    """Load BOM items from JSON file."""
-    try:
-        if not os.path.exists(BOM_PATH):
-            logger.error(f"BOM file not found: {BOM_PATH}")
-            return []
-        with open(BOM_PATH, "r") as f:
-            bom_data = json.load(f)
-            items = bom_data.get(pump_model, {}).get(configuration, [])
-            logger.debug(f"Loaded BOM items for {pump_model}/{configuration}: {items}")
-            return items
-    except (FileNotFoundError, json.JSONDecodeError) as e:
-        logger.error(f"Failed to load BOM from JSON: {str(e)}")
-        return []
+    """Return the BOM items for a model/configuration from the shared BOM catalog."""
+    return get_bom_catalog().get_items(pump_model, configuration)
 
 def insert_test_data():
     """Insert initial test data into the database if tables are empty."""
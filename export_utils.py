@@ -1,19 +1,16 @@
 import os
 import sys
 from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib import colors
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table
 from reportlab.lib.units import inch
 import smtplib
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.application import MIMEApplication
-from utils.config import get_logger
-import json
+from utils.config import get_logger, get_email_settings, get_document_dir
+from utils.pdf_resources import get_pdf_styles, get_table_styles, image_flowable, image_size
+from utils.graphs import graph_flowable, plot_test_series
 from datetime import datetime
-from PIL import Image as PILImage
-import matplotlib.pyplot as plt
 
 logger = get_logger("export_utils")
 EXPORT_UTILS_VERSION = "2025-03-30_v5"
@@ -24,109 +21,11 @@ if getattr(sys, 'frozen', False):
 else:
     BASE_DIR = r"C:\Users\travism\source\repos\GuthPumpRegistry"
 
-# Define config paths
-if getattr(sys, 'frozen', False):
-    # Use AppData for persistent config in installed app
-    CONFIG_DIR = os.path.join(os.getenv('APPDATA'), "GuthPumpRegistry")
-    os.makedirs(CONFIG_DIR, exist_ok=True)
-    CONFIG_PATH = os.path.join(CONFIG_DIR, "config.json")
-    DEFAULT_CONFIG_PATH = os.path.join(BASE_DIR, "config.json")
-else:
-    CONFIG_PATH = os.path.join(BASE_DIR, "config.json")
-    DEFAULT_CONFIG_PATH = CONFIG_PATH
-
 LOGO_PATH = os.path.join(BASE_DIR, "assets", "logo.png")
+SMTP_TIMEOUT = 30  # Seconds before a stalled SMTP connection or command fails
 
-def load_config():
-    """Load configuration from config.json, creating it with defaults if missing."""
-    # Check user-specific config first (writable location)
-    if os.path.exists(CONFIG_PATH):
-        try:
-            with open(CONFIG_PATH, "r") as f:
-                config = json.load(f)
-            logger.info(f"Loaded user config from {CONFIG_PATH}")
-        except Exception as e:
-            logger.error(f"Failed to load user config from {CONFIG_PATH}: {str(e)}")
-            config = {}
-    else:
-        # Fall back to bundled default config
-        if os.path.exists(DEFAULT_CONFIG_PATH):
-            try:
-                with open(DEFAULT_CONFIG_PATH, "r") as f:
-                    config = json.load(f)
-                logger.info(f"Loaded default config from {DEFAULT_CONFIG_PATH}")
-            except Exception as e:
-                logger.error(f"Failed to load default config from {DEFAULT_CONFIG_PATH}: {str(e)}")
-                config = {}
-        else:
-            config = {}
-            logger.warning(f"No config found at {CONFIG_PATH} or {DEFAULT_CONFIG_PATH}")
-
-    # Ensure defaults are applied for required keys
-    config.setdefault("document_dirs", {
-        "certificate": os.path.join(BASE_DIR, "certificates")
-    })
-    config.setdefault("email_settings", {
-        "smtp_host": "smtp.gmail.com",
-        "smtp_port": "587",
-        "smtp_username": "",
-        "smtp_password": "",
-        "sender_email": "",
-        "use_tls": True
-    })
-
-    # If user config didn’t exist, create it with defaults
-    if not os.path.exists(CONFIG_PATH):
-        try:
-            with open(CONFIG_PATH, "w") as f:
-                json.dump(config, f, indent=4)
-            logger.info(f"Created default config file at {CONFIG_PATH}")
-        except Exception as e:
-            logger.error(f"Failed to create default config at {CONFIG_PATH}: {str(e)}")
-
-    return config
-
-def generate_test_graph(test_data, output_path="temp_graph.png"):
-    """Generate a graph of test data (amperage and pressure)."""
-    try:
-        plt.figure(figsize=(6, 3))
-        # Filter out empty entries and convert to float, using test numbers as x-axis
-        time = [i + 1 for i, x in enumerate(test_data["amperage"]) if x.strip()]
-        amperage = [float(x) for x in test_data["amperage"] if x.strip()]
-        pressure = [float(x) for x in test_data["pressure"] if x.strip()]
-
-        if amperage:
-            plt.plot(time, amperage, label="Amperage (A)", color="blue", marker="o")
-        if pressure:
-            plt.plot(time, pressure, label="Pressure (bar)", color="red", marker="o")
-        plt.xlabel("Test Number")
-        plt.ylabel("Value")
-        plt.title("Pump Test Results")
-        plt.legend()
-        plt.grid(True)
-        plt.savefig(output_path, dpi=100, bbox_inches="tight")
-        plt.close()
-        logger.info(f"Generated test graph at {output_path}")
-        return output_path
-    except Exception as e:
-        logger.error(f"Failed to generate test graph: {str(e)}")
-        return None
-
-def send_email(to_email, subject, greeting, body_content, footer="", *attachment_paths):
-    """Send an email with multiple optional attachments using SMTP settings from config.json."""
-    config = load_config()
-    email_settings = config.get("email_settings", {})
-    smtp_server = email_settings.get("smtp_host", "")
-    smtp_port = int(email_settings.get("smtp_port", 587))
-    sender_email = email_settings.get("sender_email", "")
-    smtp_username = email_settings.get("smtp_username", "")
-    smtp_password = email_settings.get("smtp_password", "")
-    use_tls = email_settings.get("use_tls", True)
-
-    if not all([smtp_server, smtp_port, sender_email]):
-        logger.error("Required email settings (smtp_host, smtp_port, sender_email) not found in config.json")
-        raise ValueError("Required email settings not set in config.json")
-
+def build_email_message(sender_email, to_email, subject, greeting, body_content, footer="", attachment_paths=()):
+    """Build the HTML notification email, attaching each PDF in attachment_paths that exists."""
     msg = MIMEMultipart()
     msg['From'] = sender_email
     msg['To'] = to_email
@@ -164,12 +63,44 @@ def send_email(to_email, subject, greeting, body_content, footer="", *attachment
         else:
             logger.warning(f"Attachment not found: {attachment_path}")
 
+    return msg
+
+def open_smtp_session(email_settings=None):
+    """Connect (and STARTTLS/log in, if configured) to the SMTP server; returns (server, sender_email)."""
+    email_settings = email_settings or get_email_settings()
+    smtp_server = email_settings.get("smtp_host", "")
+    smtp_port = int(email_settings.get("smtp_port", 587))
+    sender_email = email_settings.get("sender_email", "")
+    smtp_username = email_settings.get("smtp_username", "")
+    smtp_password = email_settings.get("smtp_password", "")
+    use_tls = email_settings.get("use_tls", True)
+
+    if not all([smtp_server, smtp_port, sender_email]):
+        logger.error("Required email settings (smtp_host, smtp_port, sender_email) not found in config.json")
+        raise ValueError("Required email settings not set in config.json")
+
+    server = smtplib.SMTP(smtp_server, smtp_port, timeout=SMTP_TIMEOUT)
     try:
-        with smtplib.SMTP(smtp_server, smtp_port) as server:
-            if use_tls:
-                server.starttls()
-            if smtp_username and smtp_password:
-                server.login(smtp_username, smtp_password)
+        if use_tls:
+            server.starttls()
+        if smtp_username and smtp_password:
+            server.login(smtp_username, smtp_password)
+    except Exception:
+        server.close()
+        raise
+    return server, sender_email
+
+def send_email(to_email, subject, greeting, body_content, footer="", *attachment_paths):
+    """Send an email with multiple optional attachments using SMTP settings from config.json.
+
+    This sends synchronously over a new SMTP session; notifications should go
+    through utils.email_outbox.queue_email instead, which survives restarts
+    and retries.
+    """
+    try:
+        server, sender_email = open_smtp_session()
+        msg = build_email_message(sender_email, to_email, subject, greeting, body_content, footer, attachment_paths)
+        with server:
             server.sendmail(sender_email, to_email, msg.as_string())
         logger.info(f"Email sent to {to_email} with subject '{subject}' and {len(attachment_paths)} attachments")
     except Exception as e:
@@ -178,33 +109,25 @@ def send_email(to_email, subject, greeting, body_content, footer="", *attachment
 
 def generate_pdf_notification(serial_number, data, title="Pump Assembly Notification", output_path=None):
     """Generate a PDF document with pump details, BOM items, and test data graph if applicable."""
-    config = load_config()
     if output_path is None:
-        output_dir = config["document_dirs"].get("certificate", os.path.join(BASE_DIR, "certificates"))
+        output_dir = get_document_dir("certificate", os.path.join(BASE_DIR, "certificates"))
         os.makedirs(output_dir, exist_ok=True)
         output_path = os.path.join(output_dir, f"{serial_number}_{title.replace(' ', '_')}.pdf")
 
     doc = SimpleDocTemplate(output_path, pagesize=A4, rightMargin=36, leftMargin=36, topMargin=36, bottomMargin=36)
-    styles = getSampleStyleSheet()
-    title_style = styles["Heading1"]
-    title_style.alignment = 1
-    heading2_style = styles["Heading2"]
-    normal_style = styles["Normal"]
-    cell_style = ParagraphStyle(name="CellStyle", fontSize=10, leading=12, wordWrap="CJK", alignment=0)
+    styles = get_pdf_styles()
+    title_style = styles["title"]
+    heading2_style = styles["heading2"]
+    normal_style = styles["normal"]
+    cell_style = styles["cell"]
+    table_style = get_table_styles()["notification"]
     elements = []
 
-    if os.path.exists(LOGO_PATH):
-        try:
-            with PILImage.open(LOGO_PATH) as img:
-                orig_width, orig_height = img.size
-                logo_width = min(orig_width * 0.5, 120)
-                logo_height = min(orig_height * 0.5, 60)
-                logo = Image(LOGO_PATH, width=logo_width, height=logo_height)
-            logo.hAlign = 'RIGHT'
-            elements.append(logo)
-            elements.append(Spacer(1, 12))
-        except Exception as e:
-            logger.warning(f"Failed to load logo for PDF: {str(e)}")
+    logo_size = image_size(LOGO_PATH)
+    if logo_size:
+        orig_width, orig_height = logo_size
+        elements.append(image_flowable(LOGO_PATH, min(orig_width * 0.5, 120), min(orig_height * 0.5, 60), "RIGHT"))
+        elements.append(Spacer(1, 12))
 
     elements.append(Paragraph(title, title_style))
     elements.append(Spacer(1, 12))
@@ -216,10 +139,10 @@ def generate_pdf_notification(serial_number, data, title="Pump Assembly Notifica
             "pressure": data["pressure"],
             "amperage": data["amperage"]
         }
-        graph_path = generate_test_graph(test_data)
-        if graph_path and os.path.exists(graph_path):
+        graph = graph_flowable(plot_test_series, test_data, 6*inch, 3*inch)
+        if graph is not None:
             elements.append(Paragraph("Test Data Graph", heading2_style))
-            elements.append(Image(graph_path, width=6*inch, height=3*inch))
+            elements.append(graph)
             elements.append(Spacer(1, 12))
 
     if "bom_items" in data:
@@ -236,17 +159,7 @@ def generate_pdf_notification(serial_number, data, title="Pump Assembly Notifica
                 quantity = str(item.get("quantity", "1")) if isinstance(item, dict) else "1"
                 table_data.append([Paragraph(part_code, cell_style), Paragraph(part_name, cell_style), quantity, "[ ]"])
             table = Table(table_data, colWidths=[2.5*inch, 2*inch, 1*inch, 1*inch])
-            table.setStyle(TableStyle([
-                ("BACKGROUND", (0, 0), (-1, 0), colors.grey),
-                ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
-                ("ALIGN", (0, 0), (-1, -1), "LEFT"),
-                ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-                ("FONTSIZE", (0, 0), (-1, -1), 10),
-                ("BOTTOMPADDING", (0, 0), (-1, 0), 12),
-                ("BACKGROUND", (0, 1), (-1, -1), colors.beige),
-                ("GRID", (0, 0), (-1, -1), 1, colors.black),
-                ("VALIGN", (0, 0), (-1, -1), "TOP")
-            ]))
+            table.setStyle(table_style)
             elements.append(table)
     else:
         table_data = [["Field", "Value"]]
@@ -260,21 +173,11 @@ def generate_pdf_notification(serial_number, data, title="Pump Assembly Notifica
                 value_paragraph = Paragraph(str(value).replace("\n", "<br/>"), cell_style)
                 table_data.append([key.replace("_", " ").title(), value_paragraph])
         table = Table(table_data, colWidths=[2.5*inch, 4.5*inch])
-        table.setStyle(TableStyle([
-            ("BACKGROUND", (0, 0), (-1, 0), colors.grey),
-            ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
-            ("ALIGN", (0, 0), (-1, -1), "LEFT"),
-            ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-            ("FONTSIZE", (0, 0), (-1, -1), 10),
-            ("BOTTOMPADDING", (0, 0), (-1, 0), 12),
-            ("BACKGROUND", (0, 1), (-1, -1), colors.beige),
-            ("GRID", (0, 0), (-1, -1), 1, colors.black),
-            ("VALIGN", (0, 0), (-1, -1), "TOP")
-        ]))
+        table.setStyle(table_style)
         elements.append(table)
 
     elements.append(Spacer(1, 12))
-    footer_style = ParagraphStyle(name="Footer", fontSize=10, alignment=1, textColor=colors.grey)
+    footer_style = styles["footer"]
     generated_on = data.get("generated_on", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
     elements.append(Paragraph(f"Generated on {generated_on} | Version {EXPORT_UTILS_VERSION}", footer_style))
 
@@ -288,6 +191,22 @@ def generate_pdf_notification(serial_number, data, title="Pump Assembly Notifica
         doc.build(elements)
         return output_path
 
+def generate_bom_checklist(serial_number, bom_items, output_path):
+    """Generate a BOM checklist PDF."""
+    title = f"BOM Checklist - Pump {serial_number}"
+    data = {
+        "bom_items": bom_items,
+        "instructions": "Tick the 'Check' column as you pull each item.",
+        "generated_on": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    }
+    try:
+        generate_pdf_notification(serial_number, data, title=title, output_path=output_path)
+        logger.info(f"BOM checklist PDF generated at {output_path}")
+        return output_path
+    except Exception as e:
+        logger.error(f"Failed to generate BOM checklist PDF: {e}")
+        raise
+
 def generate_pump_details_table(data):
     """Generate an HTML table for pump details."""
     try:
@@ -306,6 +225,30 @@ def generate_pump_details_table(data):
         logger.error(f"Failed to generate pump details table: {str(e)}")
         return "<p>Error generating pump details table.</p>"
 
+def generate_digest_table(notifications):
+    """Generate one HTML table for a digest email: a row per (summary, pump details) notification."""
+    try:
+        rows = "".join(f"""
+            <tr>
+                <td style="padding: 8px; border: 1px solid #ddd; background-color: #f9f9f9; font-weight: bold; vertical-align: top;">{summary}</td>
+                <td style="padding: 8px; border: 1px solid #ddd;">{generate_pump_details_table(details)}</td>
+            </tr>
+        """ for summary, details in notifications)
+        return f"""
+            <table style="border-collapse: collapse; width: 100%; max-width: 600px; margin: 10px 0; font-family: Arial, sans-serif;">
+                <thead>
+                    <tr style="background-color: #f4f4f4;">
+                        <th style="padding: 8px; border: 1px solid #ddd;">Notification</th>
+                        <th style="padding: 8px; border: 1px solid #ddd;">Pump Details</th>
+                    </tr>
+                </thead>
+                <tbody>{rows}</tbody>
+            </table>
+        """
+    except Exception as e:
+        logger.error(f"Failed to generate digest table: {str(e)}")
+        return "<p>Error generating digest table.</p>"
+
 def generate_bom_table(bom_items):
     """Generate an HTML table for BOM items."""
     if not bom_items:
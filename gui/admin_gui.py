@@ -5,18 +5,23 @@ from PIL import Image, ImageTk
 import pyodbc
 import os
 import sys
-from datetime import datetime, timedelta
+from datetime import datetime
 import shutil
+import threading
 import bcrypt
 import re
-import pandas as pd
 import tkinter.filedialog as filedialog
-from utils.config import get_logger
-import json
+from concurrent.futures import ThreadPoolExecutor
+from utils.config import get_logger, load_config, save_config, get_document_dir, get_email_settings, DEFAULT_DIRS
 from export_utils import generate_pdf_notification
 import smtplib
 from email.mime.text import MIMEText
-from database import get_db_connection
+from database import (get_db_connection, fetch_pumps_page, fetch_audit_log_page, delete_pump as delete_pump_record,
+                      reserve_connections)
+from utils.reports import get_report_engine
+from utils.streaming_export import export_query, export_rows, ExportCancelled
+from gui.background import get_runner
+from gui.virtual_tree import VirtualTreeview
 
 logger = get_logger("admin_gui")
 
@@ -26,88 +31,100 @@ if getattr(sys, 'frozen', False):
 else:
     BASE_DIR = r"C:\Users\travism\source\repos\GuthPumpRegistry"
 
-# Define config paths
-if getattr(sys, 'frozen', False):
-    # Use AppData for persistent config in installed app
-    CONFIG_DIR = os.path.join(os.getenv('APPDATA'), "GuthPumpRegistry")
-    os.makedirs(CONFIG_DIR, exist_ok=True)
-    CONFIG_PATH = os.path.join(CONFIG_DIR, "config.json")
-    DEFAULT_CONFIG_PATH = os.path.join(BASE_DIR, "config.json")
-else:
-    CONFIG_PATH = os.path.join(BASE_DIR, "config.json")
-    DEFAULT_CONFIG_PATH = CONFIG_PATH
-
 LOGO_PATH = os.path.join(BASE_DIR, "assets", "logo.png")
 BUILD_NUMBER = "1.0.0"
+EXPORT_PROGRESS_MS = 200
+# Exports run for minutes; they get their own threads so list pages and reports on the GUI pool are not starved
+EXPORT_WORKERS = 2
+
+PUMP_EXPORT_COLUMNS = (("serial_number", "Serial Number"), ("pump_model", "Pump Model"), ("configuration", "Configuration"),
+                       ("status", "Status"), ("customer", "Customer"), ("requested_by", "Requested By"), ("branch", "Branch"),
+                       ("impeller_size", "Impeller Size"), ("connection_type", "Connection Type"),
+                       ("pressure_required", "Pressure Required"), ("flow_rate_required", "Flow Rate Required"),
+                       ("custom_motor", "Custom Motor"), ("flush_seal_housing", "Flush Seal Housing"), ("created_at", "Created At"))
+
+_export_executor = None
+_export_executor_lock = threading.Lock()
+_active_export_paths = set()  # Files being written by running exports; only touched on the Tk thread
+
+def get_export_executor():
+    """Return the worker pool that runs exports, separate from the shared GUI pool."""
+    global _export_executor
+    if _export_executor is None:
+        with _export_executor_lock:
+            if _export_executor is None:
+                _export_executor = ThreadPoolExecutor(max_workers=EXPORT_WORKERS, thread_name_prefix="export-worker")
+                reserve_connections(EXPORT_WORKERS)
+    return _export_executor
+
+def export_filename(name, extension="xlsx"):
+    """Return a timestamped path in the Excel exports directory that no file or running export uses."""
+    export_dir = get_document_dir("excel_exports")
+    os.makedirs(export_dir, exist_ok=True)
+    stem = f"{name}_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    path = os.path.join(export_dir, f"{stem}.{extension}")
+    copy = 1
+    while path in _active_export_paths or os.path.exists(path):
+        copy += 1
+        path = os.path.join(export_dir, f"{stem}_{copy}.{extension}")
+    return path
+
+def run_export(parent, description, filename, export):
+    """Run export(filename, progress, cancel_event) on an export worker thread behind a progress window.
+
+    export writes the file and returns the number of rows written; progress is
+    called with the running row count from the worker, and the window shows it
+    until the export finishes, fails or is cancelled.
+    """
+    window = ttk.Toplevel(parent)
+    window.title(f"Exporting {description}")
+    window.geometry("420x160")
+    window.transient(parent.winfo_toplevel())
+    status_label = ttk.Label(window, text=f"Exporting {description}...", font=("Roboto", 12))
+    status_label.pack(pady=(20, 10))
+    progress_bar = ttk.Progressbar(window, mode="indeterminate", bootstyle="primary")
+    progress_bar.pack(fill=X, padx=20)
+    progress_bar.start()
+    cancel_event = threading.Event()
+    state = {"rows": 0, "done": False}
+
+    def progress(rows):
+        state["rows"] = rows  # Read by the Tk thread in update_progress
+
+    def update_progress():
+        if state["done"] or cancel_event.is_set() or not window.winfo_exists():
+            return
+        status_label.config(text=f"Exporting {description}... {state['rows']:,} rows")
+        window.after(EXPORT_PROGRESS_MS, update_progress)
+
+    def finish():
+        state["done"] = True
+        _active_export_paths.discard(filename)
+        if window.winfo_exists():
+            window.destroy()
+
+    def on_success(rows):
+        finish()
+        logger.info(f"Exported {rows} {description} rows to {filename}")
+        Messagebox.show_info("Export Successful", f"{description.capitalize()} exported to {filename} ({rows:,} rows)")
+
+    def on_error(error):
+        finish()
+        if isinstance(error, ExportCancelled):
+            logger.info(f"Export of {description} cancelled")
+            return
+        logger.error(f"Export failed: {str(error)}")
+        Messagebox.show_error("Export Failed", f"Error: {str(error)}")
 
-# Default directories (relative to BASE_DIR for default, but will be overridden by config)
-DEFAULT_DIRS = {
-    "certificate": os.path.join(BASE_DIR, "certificates"),
-    "bom": os.path.join(BASE_DIR, "boms"),
-    "confirmation": os.path.join(BASE_DIR, "confirmations"),
-    "reports": os.path.join(BASE_DIR, "reports"),
-    "excel_exports": os.path.join(BASE_DIR, "exports")
-}
-
-# Default email settings (Gmail)
-DEFAULT_EMAIL_SETTINGS = {
-    "smtp_host": "smtp.gmail.com",
-    "smtp_port": "587",
-    "smtp_username": "",
-    "smtp_password": "",
-    "sender_email": "",
-    "use_tls": True
-}
-
-def load_config():
-    """Load configuration from config.json, creating it with defaults if missing."""
-    # Check user-specific config first (writable location)
-    if os.path.exists(CONFIG_PATH):
-        try:
-            with open(CONFIG_PATH, "r") as f:
-                config = json.load(f)
-            logger.info(f"Loaded user config from {CONFIG_PATH}")
-        except Exception as e:
-            logger.error(f"Failed to load user config from {CONFIG_PATH}: {str(e)}")
-            config = {}
-    else:
-        # Fall back to bundled default config
-        if os.path.exists(DEFAULT_CONFIG_PATH):
-            try:
-                with open(DEFAULT_CONFIG_PATH, "r") as f:
-                    config = json.load(f)
-                logger.info(f"Loaded default config from {DEFAULT_CONFIG_PATH}")
-            except Exception as e:
-                logger.error(f"Failed to load default config from {DEFAULT_CONFIG_PATH}: {str(e)}")
-                config = {}
-        else:
-            config = {}
-            logger.warning(f"No config found at {CONFIG_PATH} or {DEFAULT_CONFIG_PATH}")
-
-    # Ensure defaults are applied
-    config.setdefault("document_dirs", DEFAULT_DIRS.copy())
-    config.setdefault("email_settings", DEFAULT_EMAIL_SETTINGS.copy())
-    for key, default in DEFAULT_DIRS.items():
-        config["document_dirs"].setdefault(key, default)
-    for key, default in DEFAULT_EMAIL_SETTINGS.items():
-        config["email_settings"].setdefault(key, default)
-
-    # If user config didnt exist, create it with defaults
-    if not os.path.exists(CONFIG_PATH):
-        save_config(config)
-        logger.info(f"Created default config file at {CONFIG_PATH}")
-
-    return config
+    def cancel():
+        cancel_event.set()
+        status_label.config(text="Cancelling...")
 
-def save_config(config):
-    """Save configuration to config.json in a writable location."""
-    try:
-        with open(CONFIG_PATH, "w") as f:
-            json.dump(config, f, indent=4)
-        logger.info(f"Saved config to {CONFIG_PATH}")
-    except Exception as e:
-        logger.error(f"Failed to save config to {CONFIG_PATH}: {str(e)}")
-        raise
+    ttk.Button(window, text="Cancel", command=cancel, bootstyle="danger").pack(pady=15)
+    window.protocol("WM_DELETE_WINDOW", cancel)
+    _active_export_paths.add(filename)
+    get_runner(parent).watch(get_export_executor().submit(export, filename, progress, cancel_event), on_success, on_error)
+    update_progress()
 
 def show_admin_gui(root, username, logout_callback):
     """Display the admin GUI with tabbed interface."""
@@ -151,6 +168,7 @@ def show_admin_gui(root, username, logout_callback):
         ("Email", show_email_tab)
     ]:
         tab_frame = ttk.Frame(notebook)
+        tab_frame.username = username  # For the audit trail of changes made from the tab
         notebook.add(tab_frame, text=tab)
         func(tab_frame)
 
@@ -161,11 +179,13 @@ def show_admin_gui(root, username, logout_callback):
 def show_pumps_tab(frame):
     """Display and manage pump records."""
     if not hasattr(frame, 'tree'):
-        frame.tree = ttk.Treeview(frame, columns=("Serial Number", "Pump Model", "Configuration", "Status", "Customer", "Created At"), show="headings", height=20)
+        frame.pump_view = VirtualTreeview(frame, ("Serial Number", "Pump Model", "Configuration", "Status", "Customer", "Created At"),
+                                          height=20, error_message="Failed to load pumps")
+        frame.tree = frame.pump_view.tree
         for col in frame.tree["columns"]:
             frame.tree.heading(col, text=col, anchor=W)
             frame.tree.column(col, width=150 if col != "Created At" else 120, anchor=W)
-        frame.tree.pack(fill=BOTH, expand=True, padx=10, pady=10)
+        frame.pump_view.pack(fill=BOTH, expand=True, padx=10, pady=10)
         frame.tree.bind("<Double-1>", lambda event: edit_pump_window(frame, frame.tree))
 
         button_frame = ttk.Frame(frame)
@@ -173,30 +193,20 @@ def show_pumps_tab(frame):
         ttk.Button(button_frame, text="Export to Excel", command=lambda: export_to_excel(frame.tree), bootstyle="primary", style="large.TButton").pack(side=LEFT, padx=5)
 
     def export_to_excel(tree):
-        config = load_config()
-        export_dir = config["document_dirs"]["excel_exports"]
-        os.makedirs(export_dir, exist_ok=True)
+        def export(filename, progress, cancel_event):
+            with get_db_connection() as conn:
+                query = f"SELECT {', '.join(column for column, _ in PUMP_EXPORT_COLUMNS)} FROM pumps ORDER BY created_at DESC, serial_number DESC"
+                return export_query(conn.cursor(), query, (), [heading for _, heading in PUMP_EXPORT_COLUMNS], filename,
+                                    "Pumps", progress, cancel_event)
+
+        run_export(frame, "pumps", export_filename("pumps"), export)
+
+    def fetch_page(after, limit):
         with get_db_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT serial_number, pump_model, configuration, status, customer, requested_by, branch, impeller_size, connection_type, pressure_required, flow_rate_required, custom_motor, flush_seal_housing, created_at FROM pumps")
-            data = [tuple(row) for row in cursor.fetchall()]
-        df = pd.DataFrame(data, columns=["Serial Number", "Pump Model", "Configuration", "Status", "Customer", "Requested By", "Branch", "Impeller Size", "Connection Type", "Pressure Required", "Flow Rate Required", "Custom Motor", "Flush Seal Housing", "Created At"])
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = os.path.join(export_dir, f"pumps_export_{timestamp}.xlsx")
-        try:
-            df.to_excel(filename, index=False)
-            logger.info(f"Exported pumps to {filename}")
-            Messagebox.show_info("Export Successful", f"Pumps exported to {filename}")
-        except Exception as e:
-            logger.error(f"Export failed: {str(e)}")
-            Messagebox.show_error("Export Failed", f"Error: {str(e)}")
+            return fetch_pumps_page(conn.cursor(), ("serial_number", "pump_model", "configuration", "status", "customer", "created_at"),
+                                    after, limit)
 
-    frame.tree.delete(*frame.tree.get_children())
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT serial_number, pump_model, configuration, status, customer, created_at FROM pumps")
-        for pump in cursor.fetchall():
-            frame.tree.insert("", END, values=(pump[0], pump[1], pump[2], pump[3], pump[4], pump[5]))
+    frame.pump_view.reload(fetch_page)
 
 def edit_pump_window(parent_frame, tree):
     """Edit or delete a pump record."""
@@ -282,9 +292,8 @@ def edit_pump_window(parent_frame, tree):
         if Messagebox.yesno("Confirm Delete", f"Are you sure you want to delete pump {serial_number}?") == "Yes":
             with get_db_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute("DELETE FROM pumps WHERE serial_number = ?", (serial_number,))
+                delete_pump_record(cursor, serial_number, parent_frame.username)
                 conn.commit()
-                logger.info(f"Deleted pump {serial_number}")
                 show_pumps_tab(parent_frame)
                 edit_window.destroy()
 
@@ -377,20 +386,12 @@ def show_user_tab(frame):
                     refresh_user_list()
 
         def export_to_excel():
-            config = load_config()
-            export_dir = config["document_dirs"]["excel_exports"]
-            os.makedirs(export_dir, exist_ok=True)
-            data = [frame.user_tree.item(item)["values"] for item in frame.user_tree.get_children()]
-            df = pd.DataFrame(data, columns=["Username", "Role"])
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = os.path.join(export_dir, f"users_export_{timestamp}.xlsx")
-            try:
-                df.to_excel(filename, index=False)
-                logger.info(f"Exported users to {filename}")
-                Messagebox.show_info("Export Successful", f"Users exported to {filename}")
-            except Exception as e:
-                logger.error(f"Export failed: {str(e)}")
-                Messagebox.show_error("Export Failed", f"Error: {str(e)}")
+            def export(filename, progress, cancel_event):
+                with get_db_connection() as conn:
+                    return export_query(conn.cursor(), "SELECT username, role FROM users ORDER BY username", (),
+                                        ["Username", "Role"], filename, "Users", progress, cancel_event)
+
+            run_export(frame, "users", export_filename("users"), export)
 
         button_frame = ttk.Frame(input_frame)
         button_frame.grid(row=len(fields) + 1, column=0, columnspan=2, sticky=W, pady=10)
@@ -457,6 +458,7 @@ def show_reports_tab(frame):
 
         frame.report_treeviews = {}
         frame.report_data = {}
+        # Names must match utils.reports.REPORT_NAMES
         reports = [
             ("Pumps by Month", ("Month", "Count")),
             ("Pumps by Status", ("Status", "Count")),
@@ -465,7 +467,8 @@ def show_reports_tab(frame):
             ("Pumps Assembled This Week", ("Detail", "Assembled On")),
             ("Pumps Assembled This Month", ("Detail", "Assembled On")),
             ("Pumps Assembled This Year", ("Detail", "Assembled On")),
-            ("Pump Model Distribution", ("Detail", "Percentage"))
+            ("Pump Model Distribution", ("Detail", "Percentage")),
+            ("Stage Cycle Times", ("Detail", "Hours"))
         ]
 
         for report_name, columns in reports:
@@ -486,110 +489,47 @@ def show_reports_tab(frame):
 
             def create_export_function(name, cols):
                 def export_report():
-                    config = load_config()
-                    export_dir = config["document_dirs"]["excel_exports"]
-                    os.makedirs(export_dir, exist_ok=True)
-                    df = pd.DataFrame(frame.report_data[name], columns=["Report", *cols])
-                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    filename = os.path.join(export_dir, f"{name.lower().replace(' ', '_')}_export_{timestamp}.xlsx")
-                    try:
-                        df.to_excel(filename, index=False)
-                        logger.info(f"Exported {name} report to {filename}")
-                        Messagebox.show_info("Export Successful", f"{name} report exported to {filename}")
-                    except Exception as e:
-                        logger.error(f"Export failed: {str(e)}")
-                        Messagebox.show_error("Export Failed", f"Error: {str(e)}")
+                    rows = list(frame.report_data[name])
+
+                    def export(filename, progress, cancel_event):
+                        return export_rows([rows], ["Report", *cols], filename, name, progress, cancel_event)
+
+                    run_export(frame, f"{name} report", export_filename(name.lower().replace(' ', '_')), export)
                 return export_report
 
             button_frame = ttk.Frame(tab_frame)
             button_frame.pack(pady=5)
             ttk.Button(button_frame, text="Export to Excel", command=create_export_function(report_name, columns), bootstyle="primary", style="large.TButton", width=15).pack(side=LEFT, padx=5)
 
-        def refresh_reports():
-            today = datetime.now()
+        frame.report_rows = {}
+
+        def show_reports(reports):
+            if not frame.winfo_exists():
+                return
             for report_name, tree in frame.report_treeviews.items():
+                rows = reports.get(report_name, [])
+                frame.report_data[report_name] = [(report_name, detail, value) for detail, value, _ in rows]
+                if frame.report_rows.get(report_name) == rows:
+                    continue  # Unchanged, leave the Treeview alone
+                frame.report_rows[report_name] = rows
                 tree.delete(*tree.get_children())
-                frame.report_data[report_name] = []
+                for detail, _, display in rows:
+                    tree.insert("", END, values=(detail, display))
+            frame.configure(cursor="")
 
-            with get_db_connection() as conn:
-                cursor = conn.cursor()
-                six_months_ago = today - timedelta(days=180)
-                cursor.execute("SELECT FORMAT(created_at, 'yyyy-MM') as month, COUNT(*) as count FROM pumps WHERE created_at >= ? GROUP BY FORMAT(created_at, 'yyyy-MM') ORDER BY month DESC", (six_months_ago,))
-                for row in cursor.fetchall():
-                    frame.report_data["Pumps by Month"].append(("Pumps by Month", row[0], row[1]))
-                    frame.report_treeviews["Pumps by Month"].insert("", END, values=(row[0], row[1]))
-
-                cursor.execute("SELECT status, COUNT(*) as count FROM pumps GROUP BY status")
-                for row in cursor.fetchall():
-                    frame.report_data["Pumps by Status"].append(("Pumps by Status", row[0], row[1]))
-                    frame.report_treeviews["Pumps by Status"].insert("", END, values=(row[0], row[1]))
-
-                cursor.execute("SELECT branch, COUNT(*) as count FROM pumps GROUP BY branch")
-                for row in cursor.fetchall():
-                    frame.report_data["Pumps by Branch"].append(("Pumps by Branch", row[0], row[1]))
-                    frame.report_treeviews["Pumps by Branch"].insert("", END, values=(row[0], row[1]))
-
-                two_days_ago = today - timedelta(days=2)
-                cursor.execute("""
-                    SELECT p.serial_number, p.customer, p.branch, p.pump_model, p.configuration,
-                           DATEDIFF(day, a.timestamp, GETDATE()) as days_in_assembly
-                    FROM pumps p
-                    JOIN audit_log a ON p.serial_number = SUBSTRING(a.action, 6, CHARINDEX(' moved to', a.action) - 6)
-                    WHERE p.status = 'Assembler' AND a.action LIKE 'Pump % moved to Assembler by %' AND a.timestamp <= ?
-                """, (two_days_ago,))
-                for row in cursor.fetchall():
-                    detail = f"{row[0]} | {row[1]} | {row[2]} | {row[3]} | {row[4]}"
-                    frame.report_data["Pumps Over 2 Days in Assembly"].append(("Pumps Over 2 Days in Assembly", detail, row[5]))
-                    frame.report_treeviews["Pumps Over 2 Days in Assembly"].insert("", END, values=(detail, f"{row[5]} days"))
-
-                week_start = today - timedelta(days=today.weekday())
-                cursor.execute("""
-                    SELECT p.serial_number, p.customer, p.branch, p.pump_model, p.configuration, a.timestamp
-                    FROM pumps p
-                    JOIN audit_log a ON p.serial_number = SUBSTRING(a.action, 6, CHARINDEX(' moved to', a.action) - 6)
-                    WHERE a.action LIKE 'Pump % moved to Testing by %' AND a.timestamp >= ?
-                """, (week_start,))
-                for row in cursor.fetchall():
-                    detail = f"{row[0]} | {row[1]} | {row[2]} | {row[3]} | {row[4]}"
-                    frame.report_data["Pumps Assembled This Week"].append(("Pumps Assembled This Week", detail, row[5]))
-                    frame.report_treeviews["Pumps Assembled This Week"].insert("", END, values=(detail, row[5]))
-
-                month_start = today.replace(day=1)
-                cursor.execute("""
-                    SELECT p.serial_number, p.customer, p.branch, p.pump_model, p.configuration, a.timestamp
-                    FROM pumps p
-                    JOIN audit_log a ON p.serial_number = SUBSTRING(a.action, 6, CHARINDEX(' moved to', a.action) - 6)
-                    WHERE a.action LIKE 'Pump % moved to Testing by %' AND a.timestamp >= ?
-                """, (month_start,))
-                for row in cursor.fetchall():
-                    detail = f"{row[0]} | {row[1]} | {row[2]} | {row[3]} | {row[4]}"
-                    frame.report_data["Pumps Assembled This Month"].append(("Pumps Assembled This Month", detail, row[5]))
-                    frame.report_treeviews["Pumps Assembled This Month"].insert("", END, values=(detail, row[5]))
-
-                year_start = today.replace(month=1, day=1)
-                cursor.execute("""
-                    SELECT p.serial_number, p.customer, p.branch, p.pump_model, p.configuration, a.timestamp
-                    FROM pumps p
-                    JOIN audit_log a ON p.serial_number = SUBSTRING(a.action, 6, CHARINDEX(' moved to', a.action) - 6)
-                    WHERE a.action LIKE 'Pump % moved to Testing by %' AND a.timestamp >= ?
-                """, (year_start,))
-                for row in cursor.fetchall():
-                    detail = f"{row[0]} | {row[1]} | {row[2]} | {row[3]} | {row[4]}"
-                    frame.report_data["Pumps Assembled This Year"].append(("Pumps Assembled This Year", detail, row[5]))
-                    frame.report_treeviews["Pumps Assembled This Year"].insert("", END, values=(detail, row[5]))
-
-                cursor.execute("SELECT pump_model, COUNT(*) as count FROM pumps GROUP BY pump_model")
-                model_counts = cursor.fetchall()
-                total_pumps = sum(row[1] for row in model_counts)
-                for row in model_counts:
-                    percentage = (row[1] / total_pumps * 100) if total_pumps > 0 else 0
-                    detail = f"{row[0]}: {row[1]} pumps"
-                    frame.report_data["Pump Model Distribution"].append(("Pump Model Distribution", detail, f"{percentage:.2f}%"))
-                    frame.report_treeviews["Pump Model Distribution"].insert("", END, values=(detail, f"{percentage:.2f}%"))
+        def report_failed(error):
+            if frame.winfo_exists():
+                frame.configure(cursor="")
+            logger.error(f"Failed to load reports: {str(error)}")
+            Messagebox.show_error("Error", f"Failed to load reports: {str(error)}")
+
+        def refresh_reports(force=False):
+            frame.configure(cursor="watch")
+            engine = get_report_engine()
+            get_runner(frame).submit(lambda: engine.get(force), show_reports, report_failed, key="reports")
 
         def generate_pdf_report():
-            config = load_config()
-            report_dir = config["document_dirs"]["reports"]
+            report_dir = get_document_dir("reports")
             os.makedirs(report_dir, exist_ok=True)
             report_data = {
                 "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
@@ -608,7 +548,7 @@ def show_reports_tab(frame):
 
         button_frame = ttk.Frame(report_frame)
         button_frame.pack(pady=5)
-        ttk.Button(button_frame, text="Refresh Reports", command=refresh_reports, bootstyle="info", style="large.TButton", width=15).pack(side=LEFT, padx=5)
+        ttk.Button(button_frame, text="Refresh Reports", command=lambda: refresh_reports(force=True), bootstyle="info", style="large.TButton", width=15).pack(side=LEFT, padx=5)
         ttk.Button(button_frame, text="Generate PDF Report", command=generate_pdf_report, bootstyle="success", style="large.TButton", width=18).pack(side=LEFT, padx=5)
 
         refresh_reports()
@@ -619,43 +559,38 @@ def show_activity_log_tab(frame):
         log_frame = ttk.Frame(frame)
         log_frame.pack(fill=BOTH, expand=True, padx=10, pady=10)
 
-        frame.log_tree = ttk.Treeview(log_frame, columns=("Timestamp", "Username", "Action"), show="headings", height=20)
+        frame.log_view = VirtualTreeview(log_frame, ("Timestamp", "Username", "Action"), height=20,
+                                         error_message="Failed to load activity log")
+        frame.log_tree = frame.log_view.tree
         frame.log_tree.heading("Timestamp", text="Timestamp", anchor=W)
         frame.log_tree.heading("Username", text="Username", anchor=W)
         frame.log_tree.heading("Action", text="Action", anchor=W)
         frame.log_tree.column("Timestamp", width=150, anchor=W)
         frame.log_tree.column("Username", width=150, anchor=W)
         frame.log_tree.column("Action", width=400, anchor=W)
-        frame.log_tree.pack(fill=BOTH, expand=True)
+        frame.log_view.pack(fill=BOTH, expand=True)
 
-        def refresh_activity_log():
-            frame.log_tree.delete(*frame.log_tree.get_children())
+        def fetch_page(after, limit):
             with get_db_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT timestamp, username, action FROM audit_log ORDER BY timestamp DESC")
-                for log in cursor.fetchall():
-                    frame.log_tree.insert("", END, values=(log[0], log[1], log[2]))
+                return fetch_audit_log_page(conn.cursor(), after, limit)
 
-        def export_to_excel():
-            config = load_config()
-            export_dir = config["document_dirs"]["excel_exports"]
-            os.makedirs(export_dir, exist_ok=True)
-            data = [frame.log_tree.item(item)["values"] for item in frame.log_tree.get_children()]
-            df = pd.DataFrame(data, columns=["Timestamp", "Username", "Action"])
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = os.path.join(export_dir, f"activity_log_export_{timestamp}.xlsx")
-            try:
-                df.to_excel(filename, index=False)
-                logger.info(f"Exported activity log to {filename}")
-                Messagebox.show_info("Export Successful", f"Activity log exported to {filename}")
-            except Exception as e:
-                logger.error(f"Export failed: {str(e)}")
-                Messagebox.show_error("Export Failed", f"Error: {str(e)}")
+        def refresh_activity_log():
+            frame.log_view.reload(fetch_page)
+
+        def export_log(extension):
+            def export(filename, progress, cancel_event):
+                # The view only holds the rows on screen, so stream the table itself
+                with get_db_connection() as conn:
+                    return export_query(conn.cursor(), "SELECT timestamp, username, action FROM audit_log ORDER BY timestamp DESC, id DESC",
+                                        (), ["Timestamp", "Username", "Action"], filename, "Activity Log", progress, cancel_event)
+
+            run_export(frame, "activity log", export_filename("activity_log", extension), export)
 
         button_frame = ttk.Frame(log_frame)
         button_frame.pack(pady=5)
         ttk.Button(button_frame, text="Refresh Log", command=refresh_activity_log, bootstyle="info", style="large.TButton").pack(side=LEFT, padx=5)
-        ttk.Button(button_frame, text="Export to Excel", command=export_to_excel, bootstyle="primary", style="large.TButton").pack(side=LEFT, padx=5)
+        ttk.Button(button_frame, text="Export to Excel", command=lambda: export_log("xlsx"), bootstyle="primary", style="large.TButton").pack(side=LEFT, padx=5)
+        ttk.Button(button_frame, text="Export to CSV", command=lambda: export_log("csv"), bootstyle="primary", style="large.TButton").pack(side=LEFT, padx=5)
 
         refresh_activity_log()
 
@@ -720,14 +655,14 @@ def show_email_tab(frame):
     ttk.Label(email_frame, text="Email Configuration (Gmail)", font=("Roboto", 14)).grid(row=0, column=0, columnspan=2, pady=10)
     ttk.Label(email_frame, text="Note: Use Gmail App Password (Google Account > Security > App Passwords) for authentication.", font=("Roboto", 12), wraplength=600, justify=LEFT, bootstyle="info").grid(row=1, column=0, columnspan=2, pady=10)
 
-    config = load_config()
-    email_settings = config["email_settings"]
+    email_settings = get_email_settings()
     fields = [
         ("smtp_host", "SMTP Host"),
         ("smtp_port", "SMTP Port"),
         ("smtp_username", "SMTP Username"),
         ("smtp_password", "SMTP Password"),
-        ("sender_email", "Sender Email")
+        ("sender_email", "Sender Email"),
+        ("digest_window_minutes", "Digest Window (minutes, 0 = off)")
     ]
     entries = {}
     for i, (key, label) in enumerate(fields, start=2):
@@ -4,25 +4,20 @@ from ttkbootstrap.dialogs import Messagebox
 from PIL import Image, ImageTk
 import os
 import sys
-import tempfile
 import logging
-from database import get_db_connection
+from database import get_db_connection, fetch_pumps_page, update_pump_status
 from utils.config import get_logger
 import json
-import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from datetime import datetime
 import io
 import traceback
-from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, Image as RLImage
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib import colors
-from reportlab.lib.units import inch
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-import threading
-from export_utils import send_email, generate_pump_details_table
+from utils.email_outbox import queue_email
+from export_utils import generate_pump_details_table
+from utils.graphs import preview_figure
+from utils.doc_pipeline import render_job, render_documents
+from gui.background import get_runner
+from gui.virtual_tree import VirtualTreeview
 
 # Initialize logger with fallback to stderr
 logger = get_logger("approval_gui")
@@ -47,345 +42,17 @@ if getattr(sys, 'frozen', False):
 else:
     BASE_DIR = r"C:\Users\travism\source\repos\GuthPumpRegistry"
 
-# Define config paths
-if getattr(sys, 'frozen', False):
-    # Use AppData for persistent config in installed app
-    CONFIG_DIR = os.path.join(os.getenv('APPDATA'), "GuthPumpRegistry")
-    os.makedirs(CONFIG_DIR, exist_ok=True)
-    CONFIG_PATH = os.path.join(CONFIG_DIR, "config.json")
-    DEFAULT_CONFIG_PATH = os.path.join(BASE_DIR, "config.json")
-else:
-    CONFIG_PATH = os.path.join(BASE_DIR, "config.json")
-    DEFAULT_CONFIG_PATH = CONFIG_PATH
-
 LOGO_PATH = os.path.join(BASE_DIR, "assets", "logo.png")
-PDF_LOGO_PATH = os.path.join(BASE_DIR, "assets", "guth_logo.png")
-FONT_PATH = os.path.join(BASE_DIR, "assets", "Roboto-Regular.ttf")
-FONT_BOLD_PATH = os.path.join(BASE_DIR, "assets", "Roboto-Black.ttf")
 BUILD_NUMBER = "1.0.0"
 
-# Register Roboto fonts with error handling
-try:
-    pdfmetrics.registerFont(TTFont('Roboto', FONT_PATH))
-    pdfmetrics.registerFont(TTFont('Roboto-Black', FONT_BOLD_PATH))
-    logger.info("Roboto fonts registered successfully")
-except Exception as e:
-    error_msg = f"Failed to register fonts: {str(e)}"
-    logger.error(error_msg)
-    raise Exception(error_msg)
-
-def load_config():
-    """Load configuration from config.json, creating it with defaults if missing."""
-    # Check user-specific config first (writable location)
-    if os.path.exists(CONFIG_PATH):
-        try:
-            with open(CONFIG_PATH, "r") as f:
-                config = json.load(f)
-            logger.info(f"Loaded user config from {CONFIG_PATH}")
-        except Exception as e:
-            logger.error(f"Failed to load user config from {CONFIG_PATH}: {str(e)}")
-            config = {}
-    else:
-        # Fall back to bundled default config
-        if os.path.exists(DEFAULT_CONFIG_PATH):
-            try:
-                with open(DEFAULT_CONFIG_PATH, "r") as f:
-                    config = json.load(f)
-                logger.info(f"Loaded default config from {DEFAULT_CONFIG_PATH}")
-            except Exception as e:
-                logger.error(f"Failed to load default config from {DEFAULT_CONFIG_PATH}: {str(e)}")
-                config = {}
-        else:
-            config = {}
-            logger.warning(f"No config found at {CONFIG_PATH} or {DEFAULT_CONFIG_PATH}")
-
-    # Ensure defaults are applied
-    config.setdefault("document_dirs", {
-        "certificate": os.path.join(BASE_DIR, "certificates")
-    })
-    # If user config didnt exist, create it with defaults
-    if not os.path.exists(CONFIG_PATH):
-        try:
-            with open(CONFIG_PATH, "w") as f:
-                json.dump(config, f, indent=4)
-            logger.info(f"Created default config file at {CONFIG_PATH}")
-        except Exception as e:
-            logger.error(f"Failed to create default config at {CONFIG_PATH}: {str(e)}")
-
-    return config
-
-def generate_test_graph(test_data, output_path=None, for_gui=False):
-    """Generate a graph of test data (amperage and pressure vs. flowrate) for GUI or PDF."""
+def generate_test_graph(test_data):
+    """Return a Figure of test data (amperage and pressure vs. flowrate) for the GUI preview, or None if there is no data."""
     try:
-        flowrate = [float(f) if f.strip() else 0.0 for f in test_data.get("flowrate", [""] * 5)]
-        pressure = [float(p) if p.strip() else 0.0 for p in test_data.get("pressure", [""] * 5)]
-        amperage = [float(a) if a.strip() else 0.0 for a in test_data.get("amperage", [""] * 5)]
-
-        valid_data = [(f, p, a) for f, p, a in zip(flowrate, pressure, amperage) if f or p or a]
-        if not valid_data:
-            logger.debug("No valid data to plot")
-            return None
-
-        flowrate, pressure, amperage = zip(*valid_data)
-        sorted_data = sorted(zip(flowrate, pressure, amperage), key=lambda x: x[0])
-        flowrate, pressure, amperage = zip(*sorted_data) if sorted_data else ([], [], [])
-
-        figsize = (4, 2) if for_gui else (6, 3)
-        fig, ax1 = plt.subplots(figsize=figsize)
-        desaturated_blue = (100/255, 149/255, 237/255)  # #6495ED
-        desaturated_red = (255/255, 99/255, 71/255)     # #FF6347
-
-        ax1.plot(flowrate, pressure, marker='o', color=desaturated_blue, label='Pressure (bar)', linewidth=1.5)
-        ax1.set_xlabel("Flowrate (l/h)", fontsize=8)
-        ax1.set_ylabel("Pressure (bar)", color=desaturated_blue, fontsize=8)
-        ax1.tick_params(axis='y', labelcolor=desaturated_blue, labelsize=6)
-        ax1.tick_params(axis='x', labelsize=6)
-        ax1.grid(True, linestyle='--', alpha=0.7)
-
-        ax2 = ax1.twinx()
-        ax2.plot(flowrate, amperage, marker='s', color=desaturated_red, label='Amperage (A)', linewidth=1.5)
-        ax2.set_ylabel("Amperage (A)", color=desaturated_red, fontsize=8)
-        ax2.tick_params(axis='y', labelcolor=desaturated_red, labelsize=6)
-
-        positive_flowrate = [f for f in flowrate if f > 0]
-        flow_min = min(positive_flowrate) if positive_flowrate else 0
-        flow_max = max(flowrate) if flowrate else 1000
-
-        positive_pressure = [p for p in pressure if p > 0]
-        press_min = min(positive_pressure) if positive_pressure else 0
-        press_max = max(pressure) if pressure else 5
-
-        positive_amperage = [a for a in amperage if a > 0]
-        amp_min = min(positive_amperage) if positive_amperage else 0
-        amp_max = max(amperage) if amperage else 10
-
-        flow_range = flow_max - flow_min if flow_max > flow_min else 100
-        press_range = press_max - press_min if press_max > press_min else 1
-        amp_range = amp_max - amp_min if amp_max > amp_min else 1
-
-        ax1.set_xlim(max(0, flow_min - flow_range * 0.1), flow_max + flow_range * 0.1)
-        ax1.set_ylim(max(0, press_min - press_range * 0.1), press_max + press_range * 0.1)
-        ax2.set_ylim(max(0, amp_min - amp_range * 0.1), amp_max + amp_range * 0.1)
-
-        ax1.set_title("Pump Test Results", fontsize=10, pad=5)
-        lines1, labels1 = ax1.get_legend_handles_labels()
-        lines2, labels2 = ax2.get_legend_handles_labels()
-        ax1.legend(lines1 + lines2, labels1 + labels2, loc='best', fontsize=6)
-
-        plt.tight_layout()
-        if output_path:
-            plt.savefig(output_path, format='png', dpi=100, bbox_inches="tight")
-            plt.close(fig)
-            if os.path.exists(output_path):
-                logger.info(f"Generated test graph at {output_path}")
-                return output_path
-            else:
-                logger.error(f"Graph file not created at {output_path}")
-                return None
-        return fig
+        return preview_figure(test_data)
     except Exception as e:
         logger.error(f"Graph generation failed: {str(e)}\n{traceback.format_exc()}")
         return None
 
-def generate_certificate(data, serial_number):
-    """Generate a pump test certificate PDF."""
-    config = load_config()
-    cert_dir = config["document_dirs"]["certificate"]
-    os.makedirs(cert_dir, exist_ok=True)
-    pdf_path = os.path.join(cert_dir, f"Pump_Test_Report_{serial_number}.pdf")
-    doc = SimpleDocTemplate(pdf_path, pagesize=A4, rightMargin=36, leftMargin=36, topMargin=36, bottomMargin=36)
-    styles = getSampleStyleSheet()
-    custom_style = ParagraphStyle(name='Custom', fontName='Roboto', fontSize=8)
-    heading_style = ParagraphStyle(name='Heading', fontName='Roboto-Black', fontSize=14, alignment=0)
-    subheading_style = ParagraphStyle(name='Subheading', fontName='Roboto-Black', fontSize=9, alignment=1)
-
-    story = []
-    if os.path.exists(PDF_LOGO_PATH):
-        try:
-            logo = RLImage(PDF_LOGO_PATH, width=120, height=60)
-            logo.hAlign = 'RIGHT'
-            story.append(logo)
-            story.append(Spacer(1, 3))
-        except Exception as e:
-            logger.error(f"Failed to add logo to certificate: {str(e)}\n{traceback.format_exc()}")
-
-    story.append(Paragraph("PUMP TEST REPORT", heading_style))
-    story.append(Spacer(1, 3))
-
-    top_data = [
-        ["Invoice Number:", data.get("invoice_number", "N/A")],
-        ["Customer:", data.get("customer", "N/A")],
-        ["Job Number:", data.get("job_number", "N/A")]
-    ]
-    top_table = Table(top_data, colWidths=[125, 375], style=[
-        ('FONTNAME', (0, 0), (-1, -1), 'Roboto'),
-        ('FONTSIZE', (0, 0), (-1, -1), 7.5),
-        ('LEADING', (0, 0), (-1, -1), 8),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-    ])
-    story.append(top_table)
-    story.append(Spacer(1, 3))
-
-    fab_data = [
-        ["FABRICATION", ""],
-        ["Assembly Number:", data.get("assembly_part_number", "N/A")],
-        ["Pump Model:", data.get("pump_model", "N/A")],
-        ["Serial Number:", serial_number],
-        ["Impeller Diameter:", data.get("impeller_diameter", "N/A")],
-        ["Assembled By:", data.get("assembled_by", "N/A")],
-    ]
-    fab_table = Table(fab_data, colWidths=[80, 170], style=[
-        ('FONTNAME', (0, 0), (-1, -1), 'Roboto'),
-        ('FONTSIZE', (0, 0), (-1, -1), 7.5),
-        ('LEADING', (0, 0), (-1, -1), 8),
-        ('FONTNAME', (0, 0), (1, 0), 'Roboto-Black'),
-        ('FONTSIZE', (0, 0), (1, 0), 9),
-        ('FONTWEIGHT', (0, 0), (1, 0), 'bold'),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ('BACKGROUND', (0, 0), (1, 0), colors.Color(188/255, 161/255, 4/255)),
-    ])
-
-    hydro_data = [
-        ["HYDRAULIC TEST", ""],
-        ["Date of Test:", data.get("date_of_test", "N/A")],
-        ["Duration of Test:", data.get("duration_of_test", "N/A")],
-        ["Test Medium:", data.get("test_medium", "N/A")],
-        ["Tested By:", data.get("tested_by", "N/A")],
-    ]
-    hydro_table = Table(hydro_data, colWidths=[80, 170], style=[
-        ('FONTNAME', (0, 0), (-1, -1), 'Roboto'),
-        ('FONTSIZE', (0, 0), (-1, -1), 7.5),
-        ('LEADING', (0, 0), (-1, -1), 8),
-        ('FONTNAME', (0, 0), (1, 0), 'Roboto-Black'),
-        ('FONTSIZE', (0, 0), (1, 0), 9),
-        ('FONTWEIGHT', (0, 0), (1, 0), 'bold'),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ('BACKGROUND', (0, 0), (1, 0), colors.Color(188/255, 161/255, 4/255)),
-    ])
-
-    side_by_side_table = Table([[fab_table, hydro_table]], colWidths=[250, 250], style=[
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('LEFTPADDING', (0, 0), (-1, -1), 0),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 0),
-    ])
-    story.append(side_by_side_table)
-    story.append(Spacer(1, 3))
-
-    details_data = [
-        ["DETAILS", "", "", ""],
-        ["Motor Size:", data.get("motor_size", "N/A"), "Frequency:", data.get("frequency", "N/A")],
-        ["Motor Speed:", data.get("motor_speed", "N/A"), "Pump Housing:", data.get("pump_housing", "N/A")],
-        ["Motor Volts:", data.get("motor_volts", "N/A"), "Pump Connection:", data.get("pump_connection", "N/A")],
-        ["Motor Enclosure:", data.get("motor_enclosure", "N/A"), "Suction:", data.get("suction", "N/A")],
-        ["Mechanical Seal:", data.get("mechanical_seal", "N/A"), "Discharge:", data.get("discharge", "N/A")],
-        ["", "", "Flush Arrangement:", data.get("flush_arrangement", "N/A")],
-    ]
-    details_table = Table(details_data, colWidths=[125, 125, 125, 125], style=[
-        ('FONTNAME', (0, 0), (-1, -1), 'Roboto'),
-        ('FONTSIZE', (0, 0), (-1, -1), 7.5),
-        ('LEADING', (0, 0), (-1, -1), 8),
-        ('FONTNAME', (0, 0), (3, 0), 'Roboto-Black'),
-        ('FONTSIZE', (0, 0), (3, 0), 9),
-        ('FONTWEIGHT', (0, 0), (3, 0), 'bold'),
-        ('SPAN', (0, 0), (3, 0)),
-        ('ALIGN', (0, 0), (3, 0), 'CENTER'),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ('BACKGROUND', (0, 0), (3, 0), colors.Color(188/255, 161/255, 4/255)),
-    ])
-    story.append(details_table)
-    story.append(Spacer(1, 3))
-
-    story.append(Paragraph("TEST RESULTS", subheading_style))
-    story.append(Spacer(1, 3))
-
-    test_results_data = [["Test", "Flowrate (L/h)", "Pressure (bar)", "Amperage (A)"]]
-    for i in range(5):
-        test_results_data.append([
-            f"Test {i+1}",
-            data["flowrate"][i] if i < len(data["flowrate"]) else "",
-            data["pressure"][i] if i < len(data["pressure"]) else "",
-            data["amperage"][i] if i < len(data["amperage"]) else ""
-        ])
-    test_results_table = Table(test_results_data, colWidths=[125, 125, 125, 125], style=[
-        ('FONTNAME', (0, 0), (-1, -1), 'Roboto'),
-        ('FONTSIZE', (0, 0), (-1, -1), 7.5),
-        ('LEADING', (0, 0), (-1, -1), 8),
-        ('FONTNAME', (0, 0), (3, 0), 'Roboto'),
-        ('FONTSIZE', (0, 0), (3, 0), 8),
-        ('FONTWEIGHT', (0, 0), (3, 0), 'bold'),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ('BACKGROUND', (0, 0), (3, 0), colors.Color(188/255, 161/255, 4/255)),
-    ])
-    story.append(test_results_table)
-    story.append(Spacer(1, 3))
-
-    # Embed graph in PDF using temp directory
-    temp_dir = tempfile.gettempdir()
-    graph_path = os.path.join(temp_dir, f"temp_graph_{serial_number}.png")
-    graph_result = generate_test_graph(data, output_path=graph_path)
-    if graph_result and os.path.exists(graph_path):
-        logger.debug(f"Graph file exists at {graph_path} before adding to story")
-        graph = RLImage(graph_path, width=6*inch, height=3*inch)
-        graph_table = Table([[graph]], colWidths=[6*inch], style=[
-            ('BOX', (0, 0), (-1, -1), 0.5, colors.grey),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ])
-        story.append(graph_table)
-        story.append(Spacer(1, 3))
-    else:
-        logger.warning(f"No graph generated for certificate at {pdf_path}")
-
-    approval_data = [
-        ["APPROVAL", "", "", ""],
-        ["Approved By:", data.get("approved_by", "N/A"), "", ""],
-        ["Date:", data.get("approval_date", "N/A"), "", ""],
-    ]
-    approval_table = Table(approval_data, colWidths=[125, 125, 125, 125], style=[
-        ('FONTNAME', (0, 0), (-1, -1), 'Roboto'),
-        ('FONTSIZE', (0, 0), (-1, -1), 7.5),
-        ('LEADING', (0, 0), (-1, -1), 8),
-        ('FONTNAME', (0, 0), (3, 0), 'Roboto-Black'),
-        ('FONTSIZE', (0, 0), (3, 0), 9),
-        ('FONTWEIGHT', (0, 0), (3, 0), 'bold'),
-        ('SPAN', (0, 0), (3, 0)),
-        ('ALIGN', (0, 0), (3, 0), 'CENTER'),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ('BACKGROUND', (0, 0), (3, 0), colors.Color(188/255, 161/255, 4/255)),
-    ])
-    story.append(approval_table)
-
-    try:
-        logger.debug(f"Building PDF at {pdf_path} with graph at {graph_path}")
-        doc.build(story)
-        logger.info(f"Certificate generated: {pdf_path}")
-        # Clean up graph file only after PDF is built
-        if graph_result and os.path.exists(graph_path):
-            try:
-                os.remove(graph_path)
-                logger.info(f"Cleaned up temporary graph file: {graph_path}")
-            except Exception as e:
-                logger.warning(f"Failed to remove temporary graph file {graph_path}: {str(e)}")
-        return pdf_path
-    except Exception as e:
-        logger.error(f"Failed to generate certificate: {str(e)}\n{traceback.format_exc()}")
-        # Clean up graph file in case of error
-        if graph_result and os.path.exists(graph_path):
-            try:
-                os.remove(graph_path)
-                logger.info(f"Cleaned up temporary graph file after error: {graph_path}")
-            except Exception as cleanup_e:
-                logger.warning(f"Failed to remove temporary graph file after error {graph_path}: {str(cleanup_e)}")
-        raise
-
 def show_pump_details_window(parent, serial_number, username, refresh_callback):
     """Display pump details for approval, mirroring Tester dashboard with live graph."""
     try:
@@ -577,7 +244,7 @@ def show_pump_details_window(parent, serial_number, username, refresh_callback):
             "amperage": [entry.get() for entry in amp_entries],
             "serial_number": serial_number
         }
-        fig = generate_test_graph(current_data, for_gui=True)
+        fig = generate_test_graph(current_data)
         for widget in graph_frame.winfo_children():
             widget.destroy()
         if fig:
@@ -654,8 +321,7 @@ def show_pump_details_window(parent, serial_number, username, refresh_callback):
         try:
             with get_db_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute("UPDATE pumps SET status = 'Testing', test_data = ? WHERE serial_number = ?",
-                               (json.dumps(updated_test_data), serial_number))
+                update_pump_status(cursor, serial_number, "Testing", username, {"test_data": json.dumps(updated_test_data)})
                 conn.commit()
                 logger.info(f"Pump {serial_number} sent back to Testing by {username}")
             refresh_callback()
@@ -708,56 +374,69 @@ def show_pump_details_window(parent, serial_number, username, refresh_callback):
             Messagebox.show_error("Error", "Flowrate, Pressure, and Amperage must be numeric if provided.")
             return
 
-        try:
-            pdf_path = generate_certificate(updated_test_data, serial_number)
-            if not pdf_path or not os.path.exists(pdf_path):
-                logger.error(f"Certificate generation failed or file missing: {pdf_path}")
-                Messagebox.show_error("Error", "Failed to generate certificate PDF.")
-                return
-
-            with get_db_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT requested_by FROM pumps WHERE serial_number = ?", (serial_number,))
-                requested_by_data = cursor.fetchone()
-                if requested_by_data and requested_by_data[0]:
-                    requested_by_username = requested_by_data[0]
-                    cursor.execute("SELECT email FROM users WHERE username = ?", (requested_by_username,))
-                    requested_by_email = cursor.fetchone()
-                    if requested_by_email and requested_by_email[0]:
-                        subject = f"Pump {serial_number} Approved"
-                        greeting = f"Dear {requested_by_username},"
-                        body_content = f"""
-                            <p>We are pleased to inform you that the pump with serial number <strong>{serial_number}</strong> has been approved on {updated_test_data["approval_date"]}.</p>
-                            {generate_pump_details_table(updated_test_data)}
-                            <p>Please find the attached pump certificate for your records.</p>
-                        """
-                        footer = "Best regards,<br>Guth Pump Registry Approval Team"
-                        threading.Thread(
-                            target=send_email,
-                            args=(requested_by_email[0], subject, greeting, body_content, footer, pdf_path),
-                            daemon=True
-                        ).start()
-                        logger.info(f"Approval email sent to {requested_by_email[0]} for pump {serial_number}")
+        def certificate_ready(paths):
+            pdf_path = paths[0]
+            try:
+                details_window.configure(cursor="")
+            except Exception:
+                pass  # Window already closed; the approval still goes ahead
+            try:
+                if not pdf_path or not os.path.exists(pdf_path):
+                    logger.error(f"Certificate generation failed or file missing: {pdf_path}")
+                    Messagebox.show_error("Error", "Failed to generate certificate PDF.")
+                    return
+                with get_db_connection() as conn:
+                    cursor = conn.cursor()
+                    cursor.execute("SELECT requested_by FROM pumps WHERE serial_number = ?", (serial_number,))
+                    requested_by_data = cursor.fetchone()
+                    if requested_by_data and requested_by_data[0]:
+                        requested_by_username = requested_by_data[0]
+                        cursor.execute("SELECT email FROM users WHERE username = ?", (requested_by_username,))
+                        requested_by_email = cursor.fetchone()
+                        if requested_by_email and requested_by_email[0]:
+                            subject = f"Pump {serial_number} Approved"
+                            greeting = f"Dear {requested_by_username},"
+                            body_content = f"""
+                                <p>We are pleased to inform you that the pump with serial number <strong>{serial_number}</strong> has been approved on {updated_test_data["approval_date"]}.</p>
+                                {generate_pump_details_table(updated_test_data)}
+                                <p>Please find the attached pump certificate for your records.</p>
+                            """
+                            footer = "Best regards,<br>Guth Pump Registry Approval Team"
+                            queue_email(requested_by_email[0], subject, greeting, body_content, footer, pdf_path)
+                            logger.info(f"Approval email sent to {requested_by_email[0]} for pump {serial_number}")
+                        else:
+                            logger.warning(f"No email found for requested_by user {requested_by_username}")
+                            Messagebox.show_warning("Email Not Sent", f"No email address found for {requested_by_username}.")
                     else:
-                        logger.warning(f"No email found for requested_by user {requested_by_username}")
-                        Messagebox.show_warning("Email Not Sent", f"No email address found for {requested_by_username}.")
-                else:
-                    logger.warning(f"No requested_by user found for pump {serial_number}")
-                    Messagebox.show_warning("Email Not Sent", "No requested_by user found.")
-
-                cursor.execute("UPDATE pumps SET status = 'Completed', test_data = ? WHERE serial_number = ?",
-                               (json.dumps(updated_test_data), serial_number))
-                conn.commit()
-                logger.info(f"Pump {serial_number} approved by {username}")
+                        logger.warning(f"No requested_by user found for pump {serial_number}")
+                        Messagebox.show_warning("Email Not Sent", "No requested_by user found.")
+
+                    update_pump_status(cursor, serial_number, "Completed", username, {"test_data": json.dumps(updated_test_data)})
+                    conn.commit()
+                    logger.info(f"Pump {serial_number} approved by {username}")
+
+                refresh_callback()
+                if details_window.winfo_exists():
+                    details_window.destroy()
+                os.startfile(pdf_path)
+                Messagebox.show_info(f"Pump {serial_number} approved.\nCertificate saved at: {pdf_path}", "Approval Success")
+            except Exception as e:
+                error_msg = f"Failed to approve pump: {str(e)}\n{traceback.format_exc()}"
+                logger.error(error_msg)
+                Messagebox.show_error("Error", error_msg)
 
-            refresh_callback()
-            details_window.destroy()
-            os.startfile(pdf_path)
-            Messagebox.show_info(f"Pump {serial_number} approved.\nCertificate saved at: {pdf_path}", "Approval Success")
-        except Exception as e:
-            error_msg = f"Failed to approve pump: {str(e)}\n{traceback.format_exc()}"
-            logger.error(error_msg)
-            Messagebox.show_error("Error", error_msg)
+        def certificate_failed(error):
+            try:
+                details_window.configure(cursor="")
+            except Exception:
+                pass
+            logger.error(f"Failed to generate certificate for pump {serial_number}: {str(error)}")
+            Messagebox.show_error("Error", f"Failed to generate certificate PDF: {str(error)}")
+
+        # The certificate builds in a worker process; the pump is approved once it exists
+        details_window.configure(cursor="watch")
+        job = render_job("certificate", updated_test_data, serial_number)
+        get_runner(parent).watch(render_documents([job]), certificate_ready, certificate_failed, key=("certificate", serial_number))
 
     ttk.Button(button_frame, text="Retest", command=retest_pump, bootstyle="info", style="large.TButton").pack(side=LEFT, padx=5)
     ttk.Button(button_frame, text="Approve", command=approve_pump, bootstyle="success", style="large.TButton").pack(side=LEFT, padx=5)
@@ -793,34 +472,24 @@ def show_approval_dashboard(root, username, role, logout_callback):
     approval_list_frame = ttk.LabelFrame(main_frame, text="Pumps for Approval", padding=10)
     approval_list_frame.pack(fill=BOTH, expand=True, padx=10, pady=10)
     columns = ("Serial Number", "Assembly Part Number", "Customer", "Branch", "Pump Model", "Configuration", "Originator")
-    tree = ttk.Treeview(approval_list_frame, columns=columns, show="headings", height=10)
+    approval_view = VirtualTreeview(approval_list_frame, columns, height=10,
+                                    to_values=lambda pump: (pump[0], pump[1] or "N/A", pump[2], pump[3], pump[4], pump[5], pump[6]),
+                                    error_message="Failed to load pumps")
+    tree = approval_view.tree
     for col in columns:
         tree.heading(col, text=col, anchor=W)
         tree.column(col, width=150, anchor=W)
-    tree.pack(side=LEFT, fill=BOTH, expand=True)
-    scrollbar = ttk.Scrollbar(approval_list_frame, orient=VERTICAL, command=tree.yview)
-    scrollbar.pack(side=RIGHT, fill=Y)
-    tree.configure(yscrollcommand=scrollbar.set)
+    approval_view.pack(fill=BOTH, expand=True)
+
+    def fetch_page(after, limit):
+        # requested_by is shown as the originator
+        with get_db_connection() as conn:
+            return fetch_pumps_page(conn.cursor(), ("serial_number", "assembly_part_number", "customer", "branch", "pump_model", "configuration", "requested_by"),
+                                    after, limit, status="Pending Approval")
 
     def refresh_approval_list():
-        tree.delete(*tree.get_children())
-        try:
-            with get_db_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT serial_number, assembly_part_number, customer, branch, pump_model, configuration, requested_by AS originator
-                    FROM pumps WHERE status = 'Pending Approval'
-                """)
-                columns = [desc[0] for desc in cursor.description]
-                for row in cursor.fetchall():
-                    pump = dict(zip(columns, row))
-                    tree.insert("", END, values=(pump["serial_number"], pump["assembly_part_number"] or "N/A",
-                                                 pump["customer"], pump["branch"], pump["pump_model"],
-                                                 pump["configuration"], pump["originator"]))
-            logger.info("Refreshed approval list")
-        except Exception as e:
-            logger.error(f"Failed to refresh approval list: {str(e)}\n{traceback.format_exc()}")
-            Messagebox.show_error("Error", f"Failed to load pumps: {str(e)}")
+        approval_view.reload(fetch_page)
+        logger.info("Refreshing approval list")
 
     refresh_approval_list()
     tree.bind("<Double-1>", lambda event: show_pump_details_window(root, tree.item(tree.selection())["values"][0], username, refresh_approval_list) if tree.selection() else None)
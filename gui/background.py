@@ -0,0 +1,142 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from database import reserve_connections
+from utils.config import get_logger
+
+logger = get_logger("background")
+
+# Enough workers for a few concurrent DB queries; each gets its own pooled connection (see reserve_connections)
+MAX_WORKERS = 4
+POLL_MS = 30
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_executor():
+    """Return the worker pool shared by all dashboards."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="gui-worker")
+                reserve_connections(MAX_WORKERS)
+    return _executor
+
+
+class Debouncer:
+    """Coalesce rapid calls (e.g. <KeyRelease> events) into one callback after a quiet period."""
+
+    def __init__(self, widget, delay_ms, callback):
+        self.widget = widget
+        self.delay_ms = delay_ms
+        self.callback = callback
+        self._after_id = None
+
+    def __call__(self, event=None):
+        self.cancel()
+        self._after_id = self.widget.after(self.delay_ms, self._fire)
+
+    def _fire(self):
+        self._after_id = None
+        self.callback()
+
+    def cancel(self):
+        if self._after_id is not None:
+            try:
+                self.widget.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+
+
+class BackgroundRunner:
+    """Run functions on the shared worker pool and deliver their results on the Tk thread.
+
+    Workers never touch Tk: finished jobs are queued and picked up by an
+    after() poll that only runs while jobs are outstanding. Jobs submitted with
+    a key supersede earlier jobs with the same key; a superseded job is
+    cancelled if it has not started and its result is dropped if it has.
+    submit() must be called from the Tk thread.
+    """
+
+    def __init__(self, widget, poll_ms=POLL_MS):
+        self.widget = widget
+        self.poll_ms = poll_ms
+        self._done = queue.Queue()
+        self._pending = 0
+        self._polling = False
+        self._latest = {}
+
+    def submit(self, func, on_success, on_error=None, key=None):
+        """Run func() in the background, then call on_success(result) or on_error(exception) on the Tk thread."""
+        if key is not None:
+            self.cancel(key)  # Before queuing, so a superseded job that has not started never runs
+        return self.watch(get_executor().submit(func), on_success, on_error, key)
+
+    def watch(self, future, on_success, on_error=None, key=None):
+        """Call on_success(result) or on_error(exception) on the Tk thread once a future started elsewhere finishes.
+
+        Used for work that does not run on the shared pool, such as documents
+        rendered by utils.doc_pipeline. Keys behave as for submit().
+        """
+        job = object()
+        if key is not None:
+            self.cancel(key)
+            self._latest[key] = (job, future)
+        self._pending += 1
+        future.add_done_callback(lambda f: self._done.put((job, key, f, on_success, on_error)))
+        self._schedule_poll()
+        return future
+
+    def cancel(self, key):
+        """Drop the outstanding job for key, if any."""
+        previous = self._latest.pop(key, None)
+        if previous is not None:
+            previous[1].cancel()
+
+    def _schedule_poll(self):
+        if self._polling:
+            return
+        try:
+            self.widget.after(self.poll_ms, self._poll)
+            self._polling = True
+        except Exception as e:
+            logger.debug(f"Cannot schedule background poll, widget is gone: {str(e)}")
+
+    def _poll(self):
+        self._polling = False
+        while True:
+            try:
+                job, key, future, on_success, on_error = self._done.get_nowait()
+            except queue.Empty:
+                break
+            self._pending -= 1
+            if key is not None:
+                latest = self._latest.get(key)
+                if latest is None or latest[0] is not job:
+                    continue  # Superseded or cancelled
+                del self._latest[key]
+            if future.cancelled():
+                continue
+            error = future.exception()
+            try:
+                if error is None:
+                    on_success(future.result())
+                elif on_error is not None:
+                    on_error(error)
+                else:
+                    logger.error(f"Background job failed: {str(error)}")
+            except Exception as e:
+                logger.error(f"Background job callback failed: {str(e)}")
+        if self._pending > 0:
+            self._schedule_poll()
+
+
+def get_runner(widget):
+    """Return the BackgroundRunner shared by everything in widget's window."""
+    toplevel = widget.winfo_toplevel()
+    runner = getattr(toplevel, "_background_runner", None)
+    if runner is None:
+        runner = toplevel._background_runner = BackgroundRunner(toplevel)
+    return runner
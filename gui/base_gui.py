@@ -10,6 +10,11 @@ if project_root not in sys.path:
 # Now safe to import modules
 import traceback
 import logging
+import multiprocessing
+
+# Document pipeline workers re-launch this executable when frozen; run them before any GUI code loads
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
 
 print("BaseGUI: Execution started")  # Keep for debugging visibility
 
@@ -58,6 +63,8 @@ try:
     from gui.combined_assembler_tester_gui import show_combined_assembler_tester_dashboard
     from gui.approval_gui import show_approval_dashboard
     from database import get_db_connection, check_user, insert_user
+    from utils.email_outbox import get_email_sender
+    from utils.doc_pipeline import get_document_pipeline
 except Exception as e:
     error_msg = f"BaseGUI: Import error: {str(e)}\n{traceback.format_exc()}"
     print(error_msg)
@@ -215,9 +222,13 @@ if __name__ == "__main__":
         root.iconbitmap(resource_path("app_icon.ico"))
         configure_styles()
         app = BaseGUI(root)
+        email_sender = get_email_sender()  # Also delivers mail still queued from a previous run
+        document_pipeline = get_document_pipeline().start()  # Workers warm up while the user logs in
         logger.info("Main loop starting")
         print("BaseGUI: Main loop starting")
         root.mainloop()
+        document_pipeline.shutdown()
+        email_sender.stop()
     except Exception as e:
         error_msg = f"BaseGUI: Main error: {str(e)}\n{traceback.format_exc()}"
         logger.error(error_msg)
@@ -2,14 +2,17 @@ import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 from ttkbootstrap.dialogs import Messagebox
 from PIL import Image, ImageTk
-from database import get_db_connection
+from database import get_db_connection, fetch_pumps_page, update_pump_status, EVENT_PART_NOT_PULLED
 import os
 import sys
 from datetime import datetime, timedelta
 import json
-import threading
-from utils.config import get_logger
-from export_utils import send_email, generate_pdf_notification, generate_pump_details_table, generate_test_data_table
+from utils.config import get_logger, get_document_dir
+from gui.virtual_tree import VirtualTreeview
+from utils.email_outbox import queue_email
+from export_utils import generate_pump_details_table, generate_test_data_table
+from utils.doc_pipeline import render_job, render_documents
+from gui.background import get_runner
 
 logger = get_logger("combined_assembler_tester_gui")
 
@@ -19,66 +22,10 @@ if getattr(sys, 'frozen', False):
 else:
     BASE_DIR = r"C:\Users\travism\source\repos\GuthPumpRegistry"
 
-# Define config paths
-if getattr(sys, 'frozen', False):
-    # Use AppData for persistent config in installed app
-    CONFIG_DIR = os.path.join(os.getenv('APPDATA'), "GuthPumpRegistry")
-    os.makedirs(CONFIG_DIR, exist_ok=True)
-    CONFIG_PATH = os.path.join(CONFIG_DIR, "config.json")
-    DEFAULT_CONFIG_PATH = os.path.join(BASE_DIR, "config.json")
-else:
-    CONFIG_PATH = os.path.join(BASE_DIR, "config.json")
-    DEFAULT_CONFIG_PATH = CONFIG_PATH
-
 LOGO_PATH = os.path.join(BASE_DIR, "assets", "logo.png")
 OPTIONS_PATH = os.path.join(BASE_DIR, "assets", "pump_options.json")
 BUILD_NUMBER = "1.0.0"
 
-def load_config():
-    """Load configuration from config.json, creating it with defaults if missing."""
-    # Check user-specific config first (writable location)
-    if os.path.exists(CONFIG_PATH):
-        try:
-            with open(CONFIG_PATH, "r") as f:
-                config = json.load(f)
-            logger.info(f"Loaded user config from {CONFIG_PATH}")
-        except Exception as e:
-            logger.error(f"Failed to load user config from {CONFIG_PATH}: {str(e)}")
-            config = {}
-    else:
-        # Fall back to bundled default config
-        if os.path.exists(DEFAULT_CONFIG_PATH):
-            try:
-                with open(DEFAULT_CONFIG_PATH, "r") as f:
-                    config = json.load(f)
-                logger.info(f"Loaded default config from {DEFAULT_CONFIG_PATH}")
-            except Exception as e:
-                logger.error(f"Failed to load default config from {DEFAULT_CONFIG_PATH}: {str(e)}")
-                config = {}
-        else:
-            config = {}
-            logger.warning(f"No config found at {CONFIG_PATH} or {DEFAULT_CONFIG_PATH}")
-
-    # Ensure defaults are applied for required keys
-    config.setdefault("document_dirs", {
-        "certificate": os.path.join(BASE_DIR, "certificates"),
-        "bom": os.path.join(BASE_DIR, "boms"),
-        "confirmation": os.path.join(BASE_DIR, "confirmations"),
-        "reports": os.path.join(BASE_DIR, "reports"),
-        "excel_exports": os.path.join(BASE_DIR, "exports")
-    })
-
-    # If user config didn’t exist, create it with defaults
-    if not os.path.exists(CONFIG_PATH):
-        try:
-            with open(CONFIG_PATH, "w") as f:
-                json.dump(config, f, indent=4)
-            logger.info(f"Created default config file at {CONFIG_PATH}")
-        except Exception as e:
-            logger.error(f"Failed to create default config at {CONFIG_PATH}: {str(e)}")
-
-    return config
-
 class CustomTooltip:
     """Custom tooltip class for widgets."""
     def __init__(self, widget, text):
@@ -150,47 +97,25 @@ def show_combined_assembler_tester_dashboard(root, username, role, logout_callba
     assembler_list_frame = ttk.LabelFrame(assembler_frame, text="Pumps in Assembly", padding=10)
     assembler_list_frame.pack(fill=BOTH, expand=True, padx=10, pady=10)
     assembler_columns = ("Serial Number", "Assembly Part Number", "Customer", "Branch", "Pump Model", "Configuration", "Mechanical Seal", "O ring Material", "Impeller Size", "Flush Seal Housing")
-    assembler_tree = ttk.Treeview(assembler_list_frame, columns=assembler_columns, show="headings", height=10)
+    assembler_view = VirtualTreeview(assembler_list_frame, assembler_columns, height=10,
+                                     to_values=lambda pump: (pump[0], pump[1] or "N/A", pump[2], pump[3], pump[4], pump[5], pump[6] or "N/A", pump[7] or "N/A", pump[8] or "N/A", pump[9] or "N/A"),
+                                     error_message="Failed to load assembly pumps")
+    assembler_tree = assembler_view.tree
     for col in assembler_columns:
         assembler_tree.heading(col, text=col, anchor=W)
         assembler_tree.column(col, width=150, anchor=W)
-    assembler_tree.pack(side=LEFT, fill=BOTH, expand=True)
-    assembler_scrollbar = ttk.Scrollbar(assembler_list_frame, orient=VERTICAL, command=assembler_tree.yview)
-    assembler_scrollbar.pack(side=RIGHT, fill=Y)
-    assembler_tree.configure(yscrollcommand=assembler_scrollbar.set)
-
-    def on_mouse_wheel(event):
-        if assembler_tree.winfo_exists():
-            if event.delta > 0 or event.num == 4:
-                assembler_tree.yview_scroll(-1, "units")
-            elif event.delta < 0 or event.num == 5:
-                assembler_tree.yview_scroll(1, "units")
+    assembler_view.pack(fill=BOTH, expand=True)
 
-    assembler_tree.bind("<MouseWheel>", on_mouse_wheel)
-    assembler_tree.bind("<Button-4>", on_mouse_wheel)
-    assembler_tree.bind("<Button-5>", on_mouse_wheel)
+    def fetch_assembler_page(after, limit):
+        with get_db_connection() as conn:
+            return fetch_pumps_page(conn.cursor(), ("serial_number", "assembly_part_number", "customer", "branch", "pump_model", "configuration",
+                                                    "mechanical_seals", "o_ring_material", "impeller_size", "flush_seal_housing"),
+                                    after, limit, status="Assembler")
 
     def refresh_assembler_pump_list():
         """Refresh the list of pumps in assembly."""
-        assembler_tree.delete(*assembler_tree.get_children())
-        try:
-            with get_db_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT p.serial_number, p.assembly_part_number, p.customer, p.branch, p.pump_model, p.configuration,
-                           p.mechanical_seals, p.o_ring_material, p.impeller_size, p.flush_seal_housing
-                    FROM pumps p
-                    LEFT JOIN bom_items b ON p.serial_number = b.serial_number
-                    WHERE p.status = 'Assembler'
-                    GROUP BY p.serial_number, p.assembly_part_number, p.customer, p.branch, p.pump_model, p.configuration,
-                             p.mechanical_seals, p.o_ring_material, p.impeller_size, p.flush_seal_housing
-                """)
-                for pump in cursor.fetchall():
-                    assembler_tree.insert("", END, values=(pump[0], pump[1] or "N/A", pump[2], pump[3], pump[4], pump[5], pump[6] or "N/A", pump[7] or "N/A", pump[8] or "N/A", pump[9] or "N/A"))
-            logger.info("Refreshed assembler pump list")
-        except Exception as e:
-            logger.error(f"Failed to refresh assembler pump list: {str(e)}")
-            Messagebox.show_error("Error", f"Failed to load assembly pumps: {str(e)}")
+        assembler_view.reload(fetch_assembler_page)
+        logger.info("Refreshing assembler pump list")
 
     refresh_assembler_pump_list()
     assembler_tree.bind("<Double-1>", lambda event: show_bom_window(main_frame, assembler_tree, username, refresh_assembler_pump_list))
@@ -201,31 +126,24 @@ def show_combined_assembler_tester_dashboard(root, username, role, logout_callba
     testing_list_frame = ttk.LabelFrame(testing_frame, text="Pumps in Testing", padding=10)
     testing_list_frame.pack(fill=BOTH, expand=True, padx=10, pady=10)
     testing_columns = ("Serial Number", "Assembly Part Number", "Customer", "Branch", "Pump Model", "Configuration")
-    testing_tree = ttk.Treeview(testing_list_frame, columns=testing_columns, show="headings", height=10)
+    testing_view = VirtualTreeview(testing_list_frame, testing_columns, height=10,
+                                   to_values=lambda pump: (pump[0], pump[1] or "N/A", pump[2], pump[3], pump[4], pump[5]),
+                                   error_message="Failed to load testing pumps")
+    testing_tree = testing_view.tree
     for col in testing_columns:
         testing_tree.heading(col, text=col, anchor=W)
         testing_tree.column(col, width=150, anchor=W)
-    testing_tree.pack(side=LEFT, fill=BOTH, expand=True)
-    testing_scrollbar = ttk.Scrollbar(testing_list_frame, orient=VERTICAL, command=testing_tree.yview)
-    testing_scrollbar.pack(side=RIGHT, fill=Y)
-    testing_tree.configure(yscrollcommand=testing_scrollbar.set)
+    testing_view.pack(fill=BOTH, expand=True)
+
+    def fetch_testing_page(after, limit):
+        with get_db_connection() as conn:
+            return fetch_pumps_page(conn.cursor(), ("serial_number", "assembly_part_number", "customer", "branch", "pump_model", "configuration"),
+                                    after, limit, status="Testing")
 
     def refresh_testing_pump_list():
         """Refresh the list of pumps in testing."""
-        testing_tree.delete(*testing_tree.get_children())
-        try:
-            with get_db_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT serial_number, assembly_part_number, customer, branch, pump_model, configuration
-                    FROM pumps WHERE status = 'Testing'
-                """)
-                for pump in cursor.fetchall():
-                    testing_tree.insert("", END, values=(pump[0], pump[1] or "N/A", pump[2], pump[3], pump[4], pump[5]))
-            logger.info("Refreshed testing pump list")
-        except Exception as e:
-            logger.error(f"Failed to refresh testing pump list: {str(e)}")
-            Messagebox.show_error("Error", f"Failed to load testing pumps: {str(e)}")
+        testing_view.reload(fetch_testing_page)
+        logger.info("Refreshing testing pump list")
 
     refresh_testing_pump_list()
     testing_tree.bind("<Double-1>", lambda event: show_test_report(main_frame, testing_tree, username, refresh_testing_pump_list))
@@ -385,16 +303,15 @@ def show_bom_window(parent_frame, tree, username, refresh_callback):
                 cursor = conn.cursor()
                 cursor.execute("""
                     SELECT b.part_code, b.part_name, COALESCE((
-                        SELECT TOP 1 action FROM audit_log 
-                        WHERE action LIKE '%' + 'Reason for not pulling ' + b.part_code + ' on ' + b.serial_number + '%'
-                        ORDER BY timestamp DESC
+                        SELECT TOP 1 a.reason FROM audit_log a
+                        WHERE a.serial_number = b.serial_number AND a.event_type = ? AND a.part_code = b.part_code
+                        ORDER BY a.timestamp DESC
                     ), 'No reason provided') AS reason
                     FROM bom_items b
                     WHERE b.serial_number = ? AND b.pulled_at IS NULL
-                """, (serial_number,))
+                """, (EVENT_PART_NOT_PULLED, serial_number))
                 for item in cursor.fetchall():
-                    reason = item[2].replace(f"Reason for not pulling {item[0]} on {serial_number}: ", "") if item[2].startswith("Reason") else item[2]
-                    unpulled_tree.insert("", END, values=(item[0], item[1], reason))
+                    unpulled_tree.insert("", END, values=(item[0], item[1], item[2]))
         except Exception as e:
             logger.error(f"Failed to refresh unpulled list: {str(e)}")
             Messagebox.show_error("Error", f"Failed to load unpulled items: {str(e)}")
@@ -436,15 +353,15 @@ def show_bom_window(parent_frame, tree, username, refresh_callback):
 
     def submit_bom():
         try:
+            email = None
             with get_db_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute("UPDATE pumps SET status = 'Testing' WHERE serial_number = ?", (serial_number,))
+                update_pump_status(cursor, serial_number, "Testing", username)
                 conn.commit()
                 logger.info(f"Pump {serial_number} moved to Testing by {username} (Assembler_Tester role)")
 
-                config = load_config()
-                bom_dir = config["document_dirs"]["bom"]
-                confirmation_dir = config["document_dirs"]["confirmation"]
+                bom_dir = get_document_dir("bom")
+                confirmation_dir = get_document_dir("confirmation")
                 os.makedirs(bom_dir, exist_ok=True)
                 os.makedirs(confirmation_dir, exist_ok=True)
 
@@ -459,7 +376,7 @@ def show_bom_window(parent_frame, tree, username, refresh_callback):
                 }
                 bom_items_str = "\n".join([f"{item[1]}: {item[0]} (Qty: {item[2]})" for item in bom_items])
                 bom_data["bom_items"] = bom_items_str
-                generate_pdf_notification(serial_number, bom_data, title=f"BOM - {serial_number}", output_path=bom_path)
+                jobs = [render_job("notification", serial_number, bom_data, title=f"BOM - {serial_number}", output_path=bom_path)]
 
                 confirmation_path = os.path.join(confirmation_dir, f"confirmation_{serial_number}.pdf")
                 confirmation_data = {
@@ -469,7 +386,7 @@ def show_bom_window(parent_frame, tree, username, refresh_callback):
                     "assembled_by": username,
                     "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
                 }
-                generate_pdf_notification(serial_number, confirmation_data, title=f"Confirmation - {serial_number}", output_path=confirmation_path)
+                jobs.append(render_job("notification", serial_number, confirmation_data, title=f"Confirmation - {serial_number}", output_path=confirmation_path))
 
                 if originator:
                     pump_data = {
@@ -494,10 +411,23 @@ def show_bom_window(parent_frame, tree, username, refresh_callback):
                         {generate_pump_details_table(pump_data)}
                     """
                     footer = "Regards,<br>Assembler/Tester Team"
-                    threading.Thread(target=send_email, args=(originator[1], subject, greeting, body_content, footer, bom_path, confirmation_path), daemon=True).start()
+                    email = (originator[1], subject, greeting, body_content, footer, bom_path, confirmation_path)
                 else:
                     logger.warning(f"No originator found for pump {serial_number}")
 
+            # The PDFs build in worker processes; the email is queued now and held until both exist
+            documents = render_documents(jobs)
+            if email is not None:
+                queue_email(*email, wait_for=documents)
+
+            def documents_ready(paths):
+                logger.info(f"Documents for pump {serial_number} ready: {', '.join(paths)}")
+
+            def documents_failed(error):
+                logger.error(f"Failed to generate documents for pump {serial_number}: {str(error)}")
+                Messagebox.show_error("Error", f"Pump {serial_number} moved to Testing, but its documents failed: {str(error)}")
+
+            get_runner(parent_frame).watch(documents, documents_ready, documents_failed)
             refresh_callback()
             bom_window.destroy()
         except Exception as e:
@@ -666,19 +596,14 @@ def show_test_report(parent_frame, tree, username, refresh_callback):
                         return
 
         try:
+            email = None
             with get_db_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute("""
-                    UPDATE pumps 
-                    SET status = 'Pending Approval', 
-                        test_data = ? 
-                    WHERE serial_number = ?
-                """, (json.dumps(test_data), serial_number))
+                update_pump_status(cursor, serial_number, "Pending Approval", username, {"test_data": json.dumps(test_data)})
                 conn.commit()
                 logger.info(f"Pump {serial_number} submitted for approval by {username} (Assembler_Tester role)")
 
-                config = load_config()
-                certificate_dir = config["document_dirs"]["certificate"]
+                certificate_dir = get_document_dir("certificate")
                 os.makedirs(certificate_dir, exist_ok=True)
 
                 pdf_path = os.path.join(certificate_dir, f"test_certificate_{serial_number}.pdf")
@@ -709,7 +634,7 @@ def show_test_report(parent_frame, tree, username, refresh_callback):
                     "pressure_display": ", ".join([v for v in test_data["pressure"] if v.strip()]) or "Not provided",
                     "amperage_display": ", ".join([v for v in test_data["amperage"] if v.strip()]) or "Not provided",
                 }
-                generate_pdf_notification(serial_number, pump_data, title=f"Test Certificate - {serial_number}", output_path=pdf_path)
+                job = render_job("notification", serial_number, pump_data, title=f"Test Certificate - {serial_number}", output_path=pdf_path)
 
                 if originator:
                     subject = f"Pump {serial_number} Submitted for Approval"
@@ -728,10 +653,22 @@ def show_test_report(parent_frame, tree, username, refresh_callback):
                         })}
                     """
                     footer = "Regards,<br>Assembler/Tester Team"
-                    threading.Thread(target=send_email, args=(originator[1], subject, greeting, body_content, footer, pdf_path), daemon=True).start()
+                    email = (originator[1], subject, greeting, body_content, footer, pdf_path)
                 else:
                     logger.warning(f"No originator found for pump {serial_number}")
 
+            document = render_documents([job])
+            if email is not None:
+                queue_email(*email, wait_for=document)
+
+            def document_ready(paths):
+                logger.info(f"Test certificate for pump {serial_number} ready: {paths[0]}")
+
+            def document_failed(error):
+                logger.error(f"Failed to generate test certificate for pump {serial_number}: {str(error)}")
+                Messagebox.show_error("Error", f"Pump {serial_number} submitted for approval, but its test certificate failed: {str(error)}")
+
+            get_runner(parent_frame).watch(document, document_ready, document_failed)
             duration_submitted = True
             refresh_callback()
             test_window.destroy()
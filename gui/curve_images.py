@@ -0,0 +1,117 @@
+import os
+import threading
+from collections import OrderedDict
+from PIL import Image, ImageTk
+from utils.config import get_logger
+
+logger = get_logger("curve_images")
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class CurveImageCache:
+    """Resized pump curve images, keyed by (pump_id, size), with LRU eviction under a memory cap.
+
+    Resized PIL images can be produced on any thread (see prerender). The Tk
+    PhotoImage for an entry is created on first use from the Tk thread and
+    kept with it, so showing a cached curve never touches the disk or the
+    resampler.
+    """
+
+    def __init__(self, curves_dir, max_bytes=DEFAULT_MAX_BYTES):
+        self.curves_dir = curves_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._images = OrderedDict()
+        self._photos = {}
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, pump_id):
+        return os.path.join(self.curves_dir, f"{pump_id}.png")
+
+    @staticmethod
+    def _image_bytes(image):
+        return 0 if image is None else image.width * image.height * len(image.getbands())
+
+    def _render(self, pump_id, size):
+        path = self.path(pump_id)
+        if not os.path.exists(path):
+            logger.warning(f"Pump curve not found: {path}")
+            return None
+        with Image.open(path) as img:
+            img.load()
+            return img.resize(size, Image.Resampling.LANCZOS)
+
+    def get_image(self, pump_id, size):
+        """Return the curve for pump_id resized to size (width, height), or None if there is no curve file."""
+        key = (pump_id, tuple(size))
+        with self._lock:
+            if key in self._images:
+                self._images.move_to_end(key)
+                self.hits += 1
+                return self._images[key]
+            self.misses += 1
+        image = self._render(pump_id, key[1])
+        with self._lock:
+            if key not in self._images:
+                self._images[key] = image
+                self._bytes += self._image_bytes(image)
+                self._evict_locked(keep=key)
+            return self._images[key]
+
+    def get_photo(self, pump_id, size):
+        """Return a PhotoImage of the resized curve, or None. Call from the Tk thread only."""
+        key = (pump_id, tuple(size))
+        image = self.get_image(pump_id, size)
+        if image is None:
+            return None
+        with self._lock:
+            photo = self._photos.get(key)
+        if photo is None:
+            photo = ImageTk.PhotoImage(image)
+            with self._lock:
+                if key in self._images:
+                    self._photos[key] = photo
+        return photo
+
+    def _evict_locked(self, keep=None):
+        while self._bytes > self.max_bytes and len(self._images) > 1:
+            key = next(iter(self._images))
+            if key == keep:
+                self._images.move_to_end(key)
+                key = next(iter(self._images))
+            image = self._images.pop(key)
+            self._photos.pop(key, None)
+            self._bytes -= self._image_bytes(image)
+            logger.debug(f"Evicted pump curve {key[0]} at {key[1][0]}x{key[1][1]} from image cache")
+
+    def prerender(self, pump_ids, size):
+        """Resize the curves for pump_ids in a background thread so later lookups are cache hits."""
+        def worker():
+            for pump_id in pump_ids:
+                try:
+                    self.get_image(pump_id, size)
+                except Exception as e:
+                    logger.error(f"Failed to pre-render pump curve for {pump_id}: {str(e)}")
+            logger.info(f"Pre-rendered {len(pump_ids)} pump curves at {size[0]}x{size[1]}")
+        thread = threading.Thread(target=worker, name="curve-prerender", daemon=True)
+        thread.start()
+        return thread
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._images), "photos": len(self._photos), "bytes": self._bytes,
+                    "hits": self.hits, "misses": self.misses}
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+def get_curve_image_cache(curves_dir):
+    """Return the shared image cache for a pump curve directory."""
+    with _caches_lock:
+        cache = _caches.get(curves_dir)
+        if cache is None:
+            cache = _caches[curves_dir] = CurveImageCache(curves_dir)
+        return cache
@@ -8,71 +8,40 @@ import os
 import sys
 from datetime import datetime
 import json
-import threading
-import time
-from utils.config import get_logger
-from export_utils import send_email, generate_pdf_notification, generate_pump_details_table
-from database import get_db_connection, create_pump
+from utils.config import get_logger, get_document_dir
+from utils.email_outbox import queue_email
+from export_utils import generate_pump_details_table
+from utils.doc_pipeline import render_job, render_documents
+from database import (get_db_connection, create_pump, execute_with_retry, insert_bom_items, fetch_pumps_page,
+                      update_pump_status)
+from utils.bom_utils import get_bom_catalog
+from utils.bom_rules import resolve_bom
+from utils.sizing import get_sizing_engine
+from gui.curve_images import get_curve_image_cache
+from gui.background import Debouncer, get_runner
+from gui.virtual_tree import VirtualTreeview
 
 logger = get_logger("dashboard_gui")
 
 # Constants
 if getattr(sys, 'frozen', False):
     BASE_DIR = sys._MEIPASS
-    CONFIG_DIR = os.path.join(os.getenv('APPDATA'), "GuthPumpRegistry")
-    os.makedirs(CONFIG_DIR, exist_ok=True)
-    CONFIG_PATH = os.path.join(CONFIG_DIR, "config.json")
-    DEFAULT_CONFIG_PATH = os.path.join(BASE_DIR, "config.json")
 else:
     BASE_DIR = r"C:\Users\travism\source\repos\GuthPumpRegistry"
-    CONFIG_PATH = os.path.join(BASE_DIR, "config.json")
-    DEFAULT_CONFIG_PATH = CONFIG_PATH
 
 LOGO_PATH = os.path.join(BASE_DIR, "assets", "logo.png")
 OPTIONS_PATH = os.path.join(BASE_DIR, "assets", "pump_options.json")
 PUMP_CURVES_DIR = os.path.join(BASE_DIR, "assets", "pump_curves")
-PUMP_SIZING_PATH = os.path.join(BASE_DIR, "assets", "pump_sizing.json")
-BOM_PATH = os.path.join(BASE_DIR, "assets", "bom.json")
+CURVE_IMAGE_SIZE = (int(798 * 0.85), int(1140 * 0.85))  # Pump curves are shown shrunk by 15%
+RECOMMENDATION_DELAY_MS = 250  # Quiet period after the last keystroke before re-sizing
+SEARCH_DELAY_MS = 300  # Quiet period after the last keystroke before re-querying a table
+PUMP_LIST_COLUMNS = ("serial_number", "customer", "branch", "pump_model", "configuration", "impeller_size", "connection_type",
+                     "pressure_required", "flow_rate_required", "custom_motor", "flush_seal_housing", "status")
+# "Search by" choices mapped to fetch_pumps_page filters
+SEARCH_FILTERS = {"Serial Number": "serial", "Customer": "customer", "Branch": "branch", "Pump Model": "model"}
 BUILD_NUMBER = "1.0.0"
 STORES_EMAIL = "stores@guth.co.za"
 
-def load_config():
-    """Load configuration from config.json, creating it with defaults if missing."""
-    if os.path.exists(CONFIG_PATH):
-        try:
-            with open(CONFIG_PATH, "r") as f:
-                config = json.load(f)
-            logger.info(f"Loaded user config from {CONFIG_PATH}")
-            return config
-        except Exception as e:
-            logger.error(f"Failed to load config from {CONFIG_PATH}: {e}")
-    elif os.path.exists(DEFAULT_CONFIG_PATH):
-        try:
-            with open(DEFAULT_CONFIG_PATH, "r") as f:
-                config = json.load(f)
-            logger.info(f"Loaded default config from {DEFAULT_CONFIG_PATH}")
-            return config
-        except Exception as e:
-            logger.error(f"Failed to load default config from {DEFAULT_CONFIG_PATH}: {e}")
-    else:
-        config = {
-            "document_dirs": {
-                "certificate": os.path.join(BASE_DIR, "certificates"),
-                "bom": os.path.join(BASE_DIR, "boms"),
-                "confirmation": os.path.join(BASE_DIR, "confirmations"),
-                "reports": os.path.join(BASE_DIR, "reports"),
-                "excel_exports": os.path.join(BASE_DIR, "exports")
-            }
-        }
-        try:
-            with open(CONFIG_PATH, "w") as f:
-                json.dump(config, f, indent=4)
-            logger.info(f"Created default config file at {CONFIG_PATH}")
-        except Exception as e:
-            logger.error(f"Failed to create default config at {CONFIG_PATH}: {e}")
-        logger.warning(f"No config found at {CONFIG_PATH} or {DEFAULT_CONFIG_PATH}, using defaults")
-        return config
-
 def load_options(file_path=OPTIONS_PATH, key=""):
     """Load options from a JSON file."""
     try:
@@ -84,28 +53,6 @@ def load_options(file_path=OPTIONS_PATH, key=""):
         logger.error(f"Failed to load options from {file_path}: {e}")
         return {}
 
-def load_pump_sizing(file_path=PUMP_SIZING_PATH):
-    """Load pump sizing data from pump_sizing.json."""
-    try:
-        with open(file_path, "r") as f:
-            data = json.load(f)
-            logger.info(f"Loaded pump sizing data from {file_path}")
-            return data
-    except Exception as e:
-        logger.error(f"Failed to load pump sizing data from {file_path}: {e}")
-        return []
-
-def load_bom(file_path=BOM_PATH):
-    """Load BOM data from JSON file."""
-    try:
-        with open(file_path, "r") as f:
-            bom_data = json.load(f)
-            logger.debug(f"Loaded BOM from JSON: {bom_data}")
-            return bom_data
-    except Exception as e:
-        logger.error(f"Failed to load BOM: {str(e)}")
-        return {}
-
 class CustomTooltip:
     """Custom tooltip class for widgets."""
     def __init__(self, widget, text):
@@ -128,34 +75,6 @@ class CustomTooltip:
             self.tooltip_window.destroy()
             self.tooltip_window = None
 
-def generate_bom_checklist(serial_number, bom_items, output_path):
-    """Generate a BOM checklist PDF."""
-    title = f"BOM Checklist - Pump {serial_number}"
-    data = {
-        "bom_items": bom_items,
-        "instructions": "Tick the 'Check' column as you pull each item.",
-        "generated_on": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    }
-    try:
-        generate_pdf_notification(serial_number, data, title=title, output_path=output_path)
-        logger.info(f"BOM checklist PDF generated at {output_path}")
-    except Exception as e:
-        logger.error(f"Failed to generate BOM checklist PDF: {e}")
-        raise
-
-def execute_with_retry(cursor, query, params, max_retries=3, delay=1):
-    """Execute a database query with retry logic for transient errors."""
-    for attempt in range(max_retries):
-        try:
-            cursor.execute(query, params)
-            return
-        except pyodbc.Error as e:
-            if attempt == max_retries - 1:
-                logger.error(f"Failed to execute query after {max_retries} attempts: {query}, params: {params}, error: {e}")
-                raise
-            logger.warning(f"Database operation failed, retrying ({attempt+1}/{max_retries}): {e}")
-            time.sleep(delay)
-
 class PumpOriginatorDashboard:
     """Class to manage the Pump Originator dashboard."""
     def __init__(self, root, username, role, logout_callback):
@@ -164,113 +83,47 @@ class PumpOriginatorDashboard:
         self.role = role
         self.logout_callback = logout_callback
         self.options = load_options()
-        self.pump_sizing = load_pump_sizing()
+        self.pump_sizing = get_sizing_engine().pumps()
+        self.curve_images = get_curve_image_cache(PUMP_CURVES_DIR)
+        self.curve_images.prerender([pump["id"] for pump in self.pump_sizing], CURVE_IMAGE_SIZE)
+        self.background = get_runner(root)
         self.main_frame = None
         self.show_dashboard()
 
     def refresh_all_pumps(self):
         """Refresh the All Pumps table with search and filter."""
         logger.debug("Entering refresh_all_pumps")
-        self.all_pumps_tree.delete(*self.all_pumps_tree.get_children())
-        logger.debug("Cleared existing items in All Pumps Treeview")
         search_type = self.search_type_all.get()
         search_term = self.search_entry_all.get().lower()
         filter_status = self.filter_combobox_all.get()
 
-        try:
+        status = None if filter_status == "All" else filter_status
+        search = (SEARCH_FILTERS[search_type], search_term) if search_type in SEARCH_FILTERS else None
+
+        def fetch_page(after, limit):
             with get_db_connection() as conn:
-                logger.debug("Database connection established for All Pumps")
-                cursor = conn.cursor()
-                query = """
-                    SELECT serial_number, customer, branch, pump_model, configuration, impeller_size, connection_type,
-                           pressure_required, flow_rate_required, custom_motor, flush_seal_housing, status
-                    FROM pumps
-                """
-                conditions = []
-                params = []
-                if filter_status != "All":
-                    conditions.append("status = ?")
-                    params.append(filter_status)
-                if search_term and search_type:
-                    if search_type == "Serial Number":
-                        conditions.append("LOWER(serial_number) LIKE ?")
-                    elif search_type == "Customer":
-                        conditions.append("LOWER(customer) LIKE ?")
-                    elif search_type == "Branch":
-                        conditions.append("LOWER(branch) LIKE ?")
-                    elif search_type == "Pump Model":
-                        conditions.append("LOWER(pump_model) LIKE ?")
-                    params.append(f"%{search_term}%")
-
-                if conditions:
-                    query += " WHERE " + " AND ".join(conditions)
-
-                cursor.execute(query, params)
-                pumps = cursor.fetchall()
-                logger.debug(f"Retrieved {len(pumps)} pumps for All Pumps table")
-                for i, pump in enumerate(pumps):
-                    self.all_pumps_tree.insert("", END, values=(pump[0], pump[1], pump[2], pump[3], pump[4], pump[5], pump[6], pump[7], pump[8], pump[9], pump[10], pump[11]))
-                    logger.debug(f"Inserted pump {i+1} into All Pumps Treeview: {pump}")
-            logger.info("Refreshed All Pumps table")
-            # Force the Treeview to update
-            self.all_pumps_tree.update()
-            self.all_pumps_tree.update_idletasks()
-            logger.debug("Forced All Pumps Treeview update")
-        except Exception as e:
-            logger.error(f"Failed to refresh all pumps: {e}")
-            Messagebox.show_error("Error", f"Failed to load pumps: {e}")
+                return fetch_pumps_page(conn.cursor(), PUMP_LIST_COLUMNS, after, limit, status=status, search=search)
+
+        self.all_pumps_view.reload(fetch_page)
+        logger.info(f"Refreshing All Pumps table (status={filter_status}, {search_type}='{search_term}')")
 
     def refresh_stock_pumps(self):
         """Refresh the Pumps in Stock table with search and filter."""
         logger.debug("Entering refresh_stock_pumps")
-        self.stock_tree.delete(*self.stock_tree.get_children())
-        logger.debug("Cleared existing items in Stock Pumps Treeview")
         search_type = self.search_type_stock.get()
         search_term = self.search_entry_stock.get().lower()
         filter_branch = self.filter_combobox_stock.get()
 
-        try:
+        branch = None if filter_branch == "All" else filter_branch
+        search = (SEARCH_FILTERS[search_type], search_term) if search_type in SEARCH_FILTERS else None
+
+        def fetch_page(after, limit):
             with get_db_connection() as conn:
-                logger.debug("Database connection established for Stock Pumps")
-                cursor = conn.cursor()
-                query = """
-                    SELECT serial_number, customer, branch, pump_model, configuration, impeller_size, connection_type,
-                           pressure_required, flow_rate_required, custom_motor, flush_seal_housing, status
-                    FROM pumps WHERE status = 'Stores'
-                """
-                conditions = []
-                params = []
-                if filter_branch != "All":
-                    conditions.append("branch = ?")
-                    params.append(filter_branch)
-                if search_term and search_type:
-                    if search_type == "Serial Number":
-                        conditions.append("LOWER(serial_number) LIKE ?")
-                    elif search_type == "Customer":
-                        conditions.append("LOWER(customer) LIKE ?")
-                    elif search_type == "Branch":
-                        conditions.append("LOWER(branch) LIKE ?")
-                    elif search_type == "Pump Model":
-                        conditions.append("LOWER(pump_model) LIKE ?")
-                    params.append(f"%{search_term}%")
-
-                if conditions:
-                    query += " AND " + " AND ".join(conditions)
-
-                cursor.execute(query, params)
-                pumps = cursor.fetchall()
-                logger.debug(f"Retrieved {len(pumps)} pumps for Stock Pumps table")
-                for i, pump in enumerate(pumps):
-                    self.stock_tree.insert("", END, values=(pump[0], pump[1], pump[2], pump[3], pump[4], pump[5], pump[6], pump[7], pump[8], pump[9], pump[10], pump[11]))
-                    logger.debug(f"Inserted pump {i+1} into Stock Pumps Treeview: {pump}")
-            logger.info("Refreshed Pumps in Stock table")
-            # Force the Treeview to update
-            self.stock_tree.update()
-            self.stock_tree.update_idletasks()
-            logger.debug("Forced Stock Pumps Treeview update")
-        except Exception as e:
-            logger.error(f"Failed to refresh stock pumps: {e}")
-            Messagebox.show_error("Error", f"Failed to load pumps: {e}")
+                return fetch_pumps_page(conn.cursor(), PUMP_LIST_COLUMNS, after, limit, status="Stores", branch=branch,
+                                        search=search)
+
+        self.stock_view.reload(fetch_page)
+        logger.info(f"Refreshing Pumps in Stock table (branch={filter_branch}, {search_type}='{search_term}')")
 
     def find_suitable_pumps(self, flow_rate, pressure):
         """Find pumps that match the specified flow rate (L/hr) and pressure (bar), returning the top 3 best matches."""
@@ -282,36 +135,7 @@ class PumpOriginatorDashboard:
             logger.debug("Invalid flow rate or pressure for pump suggestion")
             return []
 
-        suitable_pumps = []
-        for pump in self.pump_sizing:
-            pump_id = pump["id"]
-            for impeller in pump["impellers"]:
-                dia = impeller["diameter_mm"]
-                capacity_range = impeller["capacity_range_Lhr"]
-                pressure_range = impeller["pressure_range_bar"]
-                if (capacity_range[0] <= flow_rate <= capacity_range[1] and
-                    pressure_range[0] <= pressure <= pressure_range[1]):
-                    # Calculate suitability score based on proximity to the midpoint of ranges
-                    capacity_mid = (capacity_range[1] + capacity_range[0]) / 2
-                    pressure_mid = (pressure_range[1] + pressure_range[0]) / 2
-                    # Normalize the differences (using range spans to scale)
-                    capacity_span = capacity_range[1] - capacity_range[0] if capacity_range[1] != capacity_range[0] else 1
-                    pressure_span = pressure_range[1] - pressure_range[0] if pressure_range[1] != pressure_range[0] else 1
-                    capacity_diff = abs(flow_rate - capacity_mid) / capacity_span
-                    pressure_diff = abs(pressure - pressure_mid) / pressure_span
-                    # Total score (lower is better, meaning closer to midpoint)
-                    score = capacity_diff + pressure_diff
-                    suitable_pumps.append({
-                        "pump_id": pump_id,
-                        "impeller_diameter": dia,
-                        "capacity_range_Lhr": capacity_range,
-                        "pressure_range_bar": pressure_range,
-                        "suitability_score": score
-                    })
-
-        # Sort by suitability score (ascending) and take top 3
-        suitable_pumps.sort(key=lambda x: x["suitability_score"])
-        top_pumps = suitable_pumps[:3]
+        top_pumps = get_sizing_engine().find(flow_rate, pressure, k=3)
         logger.info(f"Top 3 suitable pumps found: {[pump['pump_id'] for pump in top_pumps]}")
         return top_pumps
 
@@ -360,21 +184,16 @@ class PumpOriginatorDashboard:
             mech_seal_combobox.set(mech_seal_combobox["values"][0])
         logger.debug(f"Updated O-ring material options to {o_ring_combobox['values']} and mechanical seal options to {mech_seal_combobox['values']} for {pump_model}")
 
-    def update_recommended_pumps(self, event=None):
-        """Update the recommended pumps panel based on flow rate and pressure, showing only the top 3 best matches."""
-        flow_rate = self.details_entries["flow_rate_required"].get()
-        pressure = self.details_entries["pressure_required"].get()
+    def size_duty_point(self, flow_rate, pressure):
+        """Return the top 3 pumps and the per-model impeller trims for a duty point (runs off the Tk thread)."""
         suitable_pumps = self.find_suitable_pumps(flow_rate, pressure)
-
-        # Clear the current content in the right frame
-        for widget in self.right_frame.winfo_children():
-            widget.destroy()
-
         if not suitable_pumps:
-            ttk.Label(self.right_frame, text="No suitable pumps found for the specified duty.", font=("Roboto", 12)).pack(pady=20)
-            return
+            return suitable_pumps, {}
+        trims = {trim["pump_id"]: trim for trim in get_sizing_engine().trim(float(flow_rate), float(pressure))}
+        return suitable_pumps, trims
 
-        # Create a notebook for tabs with custom styling
+    def build_recommendation_panel(self):
+        """Create the (initially empty) recommended pumps notebook in the right frame."""
         style = Style()
         style.configure("Pump.TNotebook", tabposition="n", background="#f0f0f0")
         style.configure("Pump.TNotebook.Tab", font=("Roboto", 12), padding=[10, 5], background="#d3d3d3", foreground="black")
@@ -383,76 +202,139 @@ class PumpOriginatorDashboard:
                   foreground=[("selected", "white"), ("!selected", "black")],
                   relief=[("selected", "raised"), ("!selected", "flat")])
 
-        pump_notebook = ttk.Notebook(self.right_frame, style="Pump.TNotebook")
-        pump_notebook.pack(fill=BOTH, expand=True, padx=10, pady=10)
-
-        for pump in suitable_pumps:
-            pump_id = pump["pump_id"]
-            impeller_dia = pump["impeller_diameter"]
-            capacity_range = pump["capacity_range_Lhr"]
-            pressure_range = pump["pressure_range_bar"]
-
-            # Create a tab for each pump
-            tab = ttk.Frame(pump_notebook)
-            pump_notebook.add(tab, text=pump_id)
-
-            # Scrollable frame for the tab
-            tab_container = ttk.Frame(tab)
-            tab_container.pack(fill=BOTH, expand=True)
-            canvas_tab = ttk.Canvas(tab_container)
-            canvas_tab.pack(side=LEFT, fill=BOTH, expand=True)
-            scrollbar_tab = ttk.Scrollbar(tab_container, orient=VERTICAL, command=canvas_tab.yview)
-            scrollbar_tab.pack(side=RIGHT, fill=Y)
-            tab_frame = ttk.Frame(canvas_tab)
-            canvas_tab.configure(yscrollcommand=scrollbar_tab.set)
-            canvas_tab.create_window((0, 0), window=tab_frame, anchor="nw")
-            tab_frame.bind("<Configure>", lambda e, c=canvas_tab: c.configure(scrollregion=c.bbox("all")))
-
-            # Mouse wheel binding for the tab
-            def _on_mousewheel_tab(event, canvas=canvas_tab):
-                logger.debug(f"Mouse wheel event on tab for {pump_id}")
-                canvas.yview_scroll(int(-1 * (event.delta / 120)), "units")
-            canvas_tab.bind("<MouseWheel>", _on_mousewheel_tab)
-
-            # Top frame for Pump ID and Select button
-            top_frame = ttk.Frame(tab_frame)
-            top_frame.pack(fill=X, pady=5)
-            ttk.Label(top_frame, text=f"Pump ID: {pump_id}", font=("Roboto", 12, "bold")).pack(side=LEFT, padx=5)
-
-            # Select button (styled like Logoff and Submit)
-            def select_pump(pump_id=pump_id, impeller_dia=impeller_dia):
-                self.fab_entries["pump_model"].set(pump_id)
-                self.update_impeller()  # Update impeller sizes based on selected pump
-                self.fab_entries["impeller_size"].set(str(impeller_dia))
-                self.error_label.config(text=f"Selected {pump_id} with impeller diameter {impeller_dia} mm", bootstyle="success")
-
-            ttk.Button(top_frame, text="Select", command=select_pump, bootstyle="success", style="large.TButton").pack(side=RIGHT, padx=5)
-
-            # Display pump details
-            ttk.Label(tab_frame, text=f"Recommended Impeller Diameter: {impeller_dia} mm", font=("Roboto", 10)).pack(anchor=W, padx=5)
-            ttk.Label(tab_frame, text=f"Capacity Range: {capacity_range[0]} - {capacity_range[1]} L/hr", font=("Roboto", 10)).pack(anchor=W, padx=5)
-            ttk.Label(tab_frame, text=f"Pressure Range: {pressure_range[0]} - {pressure_range[1]} bar", font=("Roboto", 10)).pack(anchor=W, padx=5)
-
-            # Display pump curve (shrunk by 15%)
-            curve_path = os.path.join(PUMP_CURVES_DIR, f"{pump_id}.png")
-            if os.path.exists(curve_path):
-                try:
-                    img = Image.open(curve_path)
-                    new_width = int(798 * 0.85)  # 85% of original width
-                    new_height = int(1140 * 0.85)  # 85% of original height
-                    img_resized = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-                    curve_image = ImageTk.PhotoImage(img_resized)
-                    curve_label = ttk.Label(tab_frame, image=curve_image)
-                    curve_label.pack(pady=10)
-                    curve_label.image = curve_image  # Keep reference
-                    curve_label.bind("<MouseWheel>", lambda e, c=canvas_tab: _on_mousewheel_tab(e, c))
-                    logger.info(f"Displayed pump curve for {pump_id} from {curve_path} at {new_width}x{new_height}")
-                except Exception as e:
-                    logger.error(f"Failed to load pump curve image {curve_path}: {e}")
-                    ttk.Label(tab_frame, text=f"Error loading pump curve: {e}", font=("Roboto", 10)).pack(pady=10)
+        self.pump_notebook = ttk.Notebook(self.right_frame, style="Pump.TNotebook")
+        self.no_pumps_label = ttk.Label(self.right_frame, text="No suitable pumps found for the specified duty.", font=("Roboto", 12))
+        self.recommendation_tabs = {}
+        self.recommendation_duty = None
+        self.recommendation_debouncer = self.debouncer(RECOMMENDATION_DELAY_MS, self.update_recommended_pumps)
+
+    def update_recommended_pumps(self, event=None):
+        """Size the current duty point in the background and refresh the recommended pumps panel."""
+        flow_rate = self.details_entries["flow_rate_required"].get()
+        pressure = self.details_entries["pressure_required"].get()
+        if (flow_rate, pressure) == self.recommendation_duty:
+            return
+        self.recommendation_duty = (flow_rate, pressure)
+        self.background.submit(lambda: self.size_duty_point(flow_rate, pressure), self.show_recommended_pumps,
+                               key="recommendations")
+
+    def show_recommended_pumps(self, result):
+        """Show the top 3 matches, only creating or destroying the tabs whose pump/impeller changed."""
+        suitable_pumps, trims = result
+        wanted = [(pump["pump_id"], pump["impeller_diameter"]) for pump in suitable_pumps]
+        for key in list(self.recommendation_tabs):
+            if key not in wanted:
+                self.recommendation_tabs.pop(key)["frame"].destroy()
+
+        if not suitable_pumps:
+            self.pump_notebook.pack_forget()
+            self.no_pumps_label.pack(pady=20)
+            return
+        self.no_pumps_label.pack_forget()
+        if not self.pump_notebook.winfo_manager():
+            self.pump_notebook.pack(fill=BOTH, expand=True, padx=10, pady=10)
+
+        for position, (key, pump) in enumerate(zip(wanted, suitable_pumps)):
+            tab = self.recommendation_tabs.get(key)
+            if tab is None:
+                tab = self.recommendation_tabs[key] = self.create_recommendation_tab(pump)
+            self.pump_notebook.insert(position, tab["frame"], text=pump["pump_id"])
+            self.update_recommendation_details(tab, pump, trims.get(pump["pump_id"]))
+        if not self.pump_notebook.select():
+            self.pump_notebook.select(0)
+        logger.debug(f"Recommended pump tabs: {wanted}")
+
+    def create_recommendation_tab(self, pump):
+        """Build the tab for one pump/impeller; duty-dependent details are filled by update_recommendation_details."""
+        pump_id = pump["pump_id"]
+        impeller_dia = pump["impeller_diameter"]
+        capacity_range = pump["capacity_range_Lhr"]
+        pressure_range = pump["pressure_range_bar"]
+
+        tab = ttk.Frame(self.pump_notebook)
+
+        # Scrollable frame for the tab
+        tab_container = ttk.Frame(tab)
+        tab_container.pack(fill=BOTH, expand=True)
+        canvas_tab = ttk.Canvas(tab_container)
+        canvas_tab.pack(side=LEFT, fill=BOTH, expand=True)
+        scrollbar_tab = ttk.Scrollbar(tab_container, orient=VERTICAL, command=canvas_tab.yview)
+        scrollbar_tab.pack(side=RIGHT, fill=Y)
+        tab_frame = ttk.Frame(canvas_tab)
+        canvas_tab.configure(yscrollcommand=scrollbar_tab.set)
+        canvas_tab.create_window((0, 0), window=tab_frame, anchor="nw")
+        tab_frame.bind("<Configure>", lambda e, c=canvas_tab: c.configure(scrollregion=c.bbox("all")))
+
+        # Mouse wheel binding for the tab
+        def _on_mousewheel_tab(event, canvas=canvas_tab):
+            logger.debug(f"Mouse wheel event on tab for {pump_id}")
+            canvas.yview_scroll(int(-1 * (event.delta / 120)), "units")
+        canvas_tab.bind("<MouseWheel>", _on_mousewheel_tab)
+
+        # Top frame for Pump ID and Select button
+        top_frame = ttk.Frame(tab_frame)
+        top_frame.pack(fill=X, pady=5)
+        ttk.Label(top_frame, text=f"Pump ID: {pump_id}", font=("Roboto", 12, "bold")).pack(side=LEFT, padx=5)
+
+        # Select button (styled like Logoff and Submit)
+        def select_pump(pump_id=pump_id, impeller_dia=impeller_dia):
+            self.fab_entries["pump_model"].set(pump_id)
+            self.update_impeller()  # Update impeller sizes based on selected pump
+            self.fab_entries["impeller_size"].set(str(impeller_dia))
+            self.error_label.config(text=f"Selected {pump_id} with impeller diameter {impeller_dia} mm", bootstyle="success")
+
+        ttk.Button(top_frame, text="Select", command=select_pump, bootstyle="success", style="large.TButton").pack(side=RIGHT, padx=5)
+
+        # Display pump details
+        ttk.Label(tab_frame, text=f"Recommended Impeller Diameter: {impeller_dia} mm", font=("Roboto", 10)).pack(anchor=W, padx=5)
+        ttk.Label(tab_frame, text=f"Capacity Range: {capacity_range[0]} - {capacity_range[1]} L/hr", font=("Roboto", 10)).pack(anchor=W, padx=5)
+        ttk.Label(tab_frame, text=f"Pressure Range: {pressure_range[0]} - {pressure_range[1]} bar", font=("Roboto", 10)).pack(anchor=W, padx=5)
+        details_frame = ttk.Frame(tab_frame)
+        details_frame.pack(fill=X)
+
+        # Display pump curve (shrunk by 15%)
+        try:
+            curve_image = self.curve_images.get_photo(pump_id, CURVE_IMAGE_SIZE)
+            if curve_image is not None:
+                curve_label = ttk.Label(tab_frame, image=curve_image)
+                curve_label.pack(pady=10)
+                curve_label.image = curve_image  # Keep reference
+                curve_label.bind("<MouseWheel>", lambda e, c=canvas_tab: _on_mousewheel_tab(e, c))
+                logger.debug(f"Displayed pump curve for {pump_id} at {CURVE_IMAGE_SIZE[0]}x{CURVE_IMAGE_SIZE[1]}")
             else:
-                logger.warning(f"Pump curve not found: {curve_path}")
                 ttk.Label(tab_frame, text=f"No pump curve available for {pump_id}", font=("Roboto", 10)).pack(pady=10)
+        except Exception as e:
+            logger.error(f"Failed to load pump curve image for {pump_id}: {e}")
+            ttk.Label(tab_frame, text=f"Error loading pump curve: {e}", font=("Roboto", 10)).pack(pady=10)
+
+        return {"frame": tab, "details": details_frame}
+
+    def update_recommendation_details(self, tab, pump, trim):
+        """Refresh the duty-dependent lines (curve pressure and impeller trim) of a recommendation tab."""
+        details_frame = tab["details"]
+        for widget in details_frame.winfo_children():
+            widget.destroy()
+        ttk.Label(details_frame, text=f"Pressure at Required Flow: {pump['curve_pressure_bar']} bar ({pump['curve_source']} curve)", font=("Roboto", 10)).pack(anchor=W, padx=5)
+        if trim:
+            trim_note = " (smallest listed size)" if trim["min_trim"] else f" (trimmed from {trim['reference_diameter']} mm)"
+            ttk.Label(details_frame, text=f"Trimmed Impeller Diameter: {trim['trimmed_diameter']} mm{trim_note}", font=("Roboto", 10)).pack(anchor=W, padx=5)
+            ttk.Label(details_frame, text=f"Expected Pressure at Trim: {trim['expected_pressure_bar']} bar", font=("Roboto", 10)).pack(anchor=W, padx=5)
+            if trim["headroom_kw"] is not None:
+                ttk.Label(details_frame, text=f"Motor Headroom: {trim['headroom_kw']} kW of {trim['motor_kw']} kW ({trim['headroom_pct']}%, est. shaft {trim['shaft_kw']} kW)", font=("Roboto", 10)).pack(anchor=W, padx=5)
+
+    def debouncer(self, delay_ms, callback):
+        """A Debouncer owned by this dashboard, cancelled when it is torn down."""
+        debouncer = Debouncer(self.main_frame, delay_ms, callback)
+        self.debouncers.append(debouncer)
+        return debouncer
+
+    def teardown(self, event=None):
+        """Cancel pending debounced refreshes when the dashboard's widgets are destroyed (e.g. on logout)."""
+        if event is not None and event.widget is not self.main_frame:
+            return
+        for debouncer in self.debouncers:
+            debouncer.cancel()
+        self.debouncers.clear()
 
     def show_dashboard(self):
         """Display the Pump Originator dashboard."""
@@ -463,6 +345,8 @@ class PumpOriginatorDashboard:
 
         self.main_frame = ttk.Frame(self.root)
         self.main_frame.pack(fill=BOTH, expand=True, padx=10, pady=10)
+        self.debouncers = []
+        self.main_frame.bind("<Destroy>", self.teardown)
         logger.debug("Main frame created and packed")
 
         # Header (shrunk)
@@ -527,6 +411,7 @@ class PumpOriginatorDashboard:
         right_container.grid(row=0, column=1, sticky="nsew", padx=(5, 0))
         self.right_frame = ttk.Frame(right_container)
         self.right_frame.pack(fill=BOTH, expand=True)
+        self.build_recommendation_panel()
         logger.debug("Right frame for recommended pumps created")
 
         # Top frame for Customer Details and Product Details (side by side)
@@ -648,8 +533,8 @@ class PumpOriginatorDashboard:
         # Bind events
         self.fab_entries["pump_model"].bind("<<ComboboxSelected>>", self.update_impeller)
         # Bind pressure and flow rate entries to update recommended pumps
-        self.details_entries["pressure_required"].bind("<KeyRelease>", self.update_recommended_pumps)
-        self.details_entries["flow_rate_required"].bind("<KeyRelease>", self.update_recommended_pumps)
+        self.details_entries["pressure_required"].bind("<KeyRelease>", self.recommendation_debouncer)
+        self.details_entries["flow_rate_required"].bind("<KeyRelease>", self.recommendation_debouncer)
 
         customer_entry = self.customer_entries["customer"]
         send_to_stock_check = self.customer_entries["send_to_stock"]
@@ -691,18 +576,16 @@ class PumpOriginatorDashboard:
 
         columns = ("Serial Number", "Customer", "Branch", "Pump Model", "Configuration", "Impeller Size", "Connection Type",
                    "Pressure Required", "Flow Rate Required", "Custom Motor", "Flush Seal Housing", "Status")
-        self.all_pumps_tree = ttk.Treeview(all_pumps_frame, columns=columns, show="headings", height=12)
+        self.all_pumps_view = VirtualTreeview(all_pumps_frame, columns, height=12, error_message="Failed to load pumps")
+        self.all_pumps_tree = self.all_pumps_view.tree
         for col in columns:
             self.all_pumps_tree.heading(col, text=col, anchor=W)
             self.all_pumps_tree.column(col, width=120, anchor=W)
-        self.all_pumps_tree.pack(side=LEFT, fill=BOTH, expand=True)
-        scrollbar_all = ttk.Scrollbar(all_pumps_frame, orient=VERTICAL, command=self.all_pumps_tree.yview)
-        scrollbar_all.pack(side=RIGHT, fill=Y)
-        self.all_pumps_tree.configure(yscrollcommand=scrollbar_all.set)
+        self.all_pumps_view.pack(fill=BOTH, expand=True)
         logger.debug("All Pumps Treeview created and packed")
 
         self.search_type_all.bind("<<ComboboxSelected>>", lambda event: self.refresh_all_pumps())
-        self.search_entry_all.bind("<KeyRelease>", lambda event: self.refresh_all_pumps())
+        self.search_entry_all.bind("<KeyRelease>", self.debouncer(SEARCH_DELAY_MS, self.refresh_all_pumps))
         self.filter_combobox_all.bind("<<ComboboxSelected>>", lambda event: self.refresh_all_pumps())
         self.all_pumps_tree.bind("<Double-1>", lambda event: self.edit_pump_window(self.all_pumps_tree))
         self.refresh_all_pumps()
@@ -735,18 +618,16 @@ class PumpOriginatorDashboard:
         CustomTooltip(self.filter_combobox_stock, "Filter pumps by branch")
         logger.debug("Search and filter frame for Pumps in Stock created")
 
-        self.stock_tree = ttk.Treeview(stock_frame, columns=columns, show="headings", height=12)
+        self.stock_view = VirtualTreeview(stock_frame, columns, height=12, error_message="Failed to load pumps")
+        self.stock_tree = self.stock_view.tree
         for col in columns:
             self.stock_tree.heading(col, text=col, anchor=W)
             self.stock_tree.column(col, width=120, anchor=W)
-        self.stock_tree.pack(side=LEFT, fill=BOTH, expand=True)
-        scrollbar_stock = ttk.Scrollbar(stock_frame, orient=VERTICAL, command=self.stock_tree.yview)
-        scrollbar_stock.pack(side=RIGHT, fill=Y)
-        self.stock_tree.configure(yscrollcommand=scrollbar_stock.set)
+        self.stock_view.pack(fill=BOTH, expand=True)
         logger.debug("Pumps in Stock Treeview created and packed")
 
         self.search_type_stock.bind("<<ComboboxSelected>>", lambda event: self.refresh_stock_pumps())
-        self.search_entry_stock.bind("<KeyRelease>", lambda event: self.refresh_stock_pumps())
+        self.search_entry_stock.bind("<KeyRelease>", self.debouncer(SEARCH_DELAY_MS, self.refresh_stock_pumps))
         self.filter_combobox_stock.bind("<<ComboboxSelected>>", lambda event: self.refresh_stock_pumps())
         self.stock_tree.bind("<Double-1>", lambda event: self.edit_pump_window(self.stock_tree))
         self.refresh_stock_pumps()
@@ -784,86 +665,15 @@ class PumpOriginatorDashboard:
         # Remove spaces from field names in data
         data = {k.replace(" ", "_"): v for k, v in data.items()}
 
-        # Load BOM data
-        bom_data = load_bom()
+        # Load BOM data and apply the option rules (flush seal housing, O-ring material, mechanical seals)
         pump_model = data["pump_model"]
         configuration = data["configuration"] or "Standard"
-        bom_items = bom_data.get(pump_model, {}).get(configuration, [])
-        logger.debug(f"Loaded BOM for {pump_model} with configuration {configuration}: {bom_items}")
-
-        if not bom_items:
+        if not get_bom_catalog().get_bom(pump_model, configuration):
             self.error_label.config(text=f"No BOM found for {pump_model} with configuration {configuration}", bootstyle="danger")
             logger.error(f"No BOM found for {pump_model} with configuration {configuration}")
             return
-
-        # Dynamically update BOM based on selected options
-        updated_bom_items = bom_items.copy()
-        logger.debug(f"Initial BOM items: {updated_bom_items}")
-
-        # Flush Seal Housing
-        if data["flush_seal_housing"] == "Yes":
-            flush_seal_part = None
-            if pump_model.startswith("P1"):
-                flush_seal_part = {"part_code": "10.55.10009", "part_name": "P1 - 2 FLUSH ARRANGEMENT SEAL", "quantity": 1}
-            elif pump_model.startswith("PS"):
-                flush_seal_part = {"part_code": "10.55.10010", "part_name": "PS FLUSH ARRANGEMENT SEAL", "quantity": 1}
-            elif pump_model.startswith("P2"):
-                flush_seal_part = {"part_code": "10.55.10009", "part_name": "P1 - 2 FLUSH ARRANGEMENT SEAL", "quantity": 1}
-            if flush_seal_part:
-                # Update quantity if the part exists in the BOM, otherwise append it
-                found = False
-                for item in updated_bom_items:
-                    if item["part_code"] == flush_seal_part["part_code"]:
-                        item["quantity"] = 1
-                        found = True
-                        break
-                if not found:
-                    updated_bom_items.append(flush_seal_part)
-                logger.debug(f"Added flush seal part: {flush_seal_part}")
-
-        # O-ring Material
-        o_ring_part = None
-        if pump_model.startswith("P1"):
-            if data["o_ring_material"] == "Nitrile":
-                o_ring_part = {"part_code": "10.55.09005", "part_name": "P1 FRONT COVER 'O' RING NITRILE", "quantity": 1}
-            elif data["o_ring_material"] == "Viton":
-                o_ring_part = {"part_code": "10.55.09013", "part_name": "P1 FRONT COVER 'O' RING VITON", "quantity": 1}
-        elif pump_model.startswith("PS"):
-            if data["o_ring_material"] == "Nitrile":
-                o_ring_part = {"part_code": "10.55.09000", "part_name": "PS FRONT COVER 'O' RING NITRILE", "quantity": 1}
-        elif pump_model.startswith("P2"):
-            if data["o_ring_material"] == "Nitrile":
-                o_ring_part = {"part_code": "10.55.09010", "part_name": "P2 FRONT COVER 'O' RING NITRILE", "quantity": 1}
-
-        if o_ring_part:
-            # Remove the default O-ring part
-            updated_bom_items = [item for item in updated_bom_items if "Front cover 'O' ring" not in item["part_name"]]
-            updated_bom_items.append(o_ring_part)
-            logger.debug(f"Updated O-ring part: {o_ring_part}")
-
-        # Mechanical Seal
-        mech_seal_part = None
-        if pump_model.startswith("P1"):
-            if data["mechanical_seals"] == "SC/SC":
-                mech_seal_part = {"part_code": "10.55.10000", "part_name": "P1 MECH SEAL S/C VS S/C - EPDM ELASTOMER", "quantity": 1}
-            elif data["mechanical_seals"] == "TC/TC":
-                mech_seal_part = {"part_code": "10.55.10001", "part_name": "P1 MECH SEAL T/C VS T/C - EPDM ELASTOMER", "quantity": 1}
-            elif data["mechanical_seals"] == "C/SS":
-                mech_seal_part = {"part_code": "10.55.10002", "part_name": "P1 - 2 MECH SEAL S/ST - CARBON EPDM ELASTOMER", "quantity": 1}
-        elif pump_model.startswith("PS"):
-            if data["mechanical_seals"] == "Standard":
-                mech_seal_part = {"part_code": "10.55.100047", "part_name": "Mechanical shaft seal", "quantity": 1}
-        elif pump_model.startswith("P2"):
-            if data["mechanical_seals"] == "Viton":
-                mech_seal_part = {"part_code": "10.55.10004", "part_name": "Mechanical shaft seal VITON", "quantity": 1}
-
-        if mech_seal_part:
-            # Remove the default mechanical seal part
-            updated_bom_items = [item for item in updated_bom_items if "Mechanical shaft seal" not in item["part_name"]]
-            updated_bom_items.append(mech_seal_part)
-            logger.debug(f"Updated mechanical seal part: {mech_seal_part}")
-
-        logger.debug(f"Final updated BOM items: {updated_bom_items}")
+        updated_bom_items = resolve_bom(pump_model, configuration, data)
+        logger.debug(f"Resolved {len(updated_bom_items)} BOM items for {pump_model}/{configuration}")
 
         # Validate required fields
         assembly_key = f"{data['pump_model']}_{data['configuration']}"
@@ -911,24 +721,11 @@ class PumpOriginatorDashboard:
             execute_with_retry(cursor, update_query, update_params)
             logger.debug(f"Updated pump details for serial number: {serial}")
 
-            # Step 3: Insert BOM items
-            for item in updated_bom_items:
-                if item["quantity"] > 0:
-                    insert_query = """
-                        INSERT INTO bom_items (serial_number, part_code, part_name, quantity)
-                        VALUES (?, ?, ?, ?)
-                    """
-                    insert_params = (serial, item["part_code"], item["part_name"], item["quantity"])
-                    logger.debug(f"Executing INSERT query: {insert_query} with params: {insert_params}")
-                    execute_with_retry(cursor, insert_query, insert_params)
-                    logger.debug(f"Inserted BOM item for {serial}: {item}")
-
-            # Step 4: Retrieve BOM items for the checklist
-            cursor.execute("SELECT part_code, part_name, quantity FROM bom_items WHERE serial_number = ?", (serial,))
-            bom_items = [{"part_code": row[0], "part_name": row[1], "quantity": row[2]} for row in cursor.fetchall()]
-            logger.debug(f"Retrieved BOM items for {serial}: {bom_items}")
+            # Step 3: Insert BOM items in one batch; the rows written double as the checklist, so no read-back is needed
+            bom_items = insert_bom_items(cursor, serial, updated_bom_items)
+            logger.debug(f"Inserted BOM items for {serial}: {bom_items}")
 
-            # Step 5: Commit the transaction
+            # Step 4: Commit the transaction
             conn.commit()
             logger.info(f"Pump assembly {serial} created by {self.username}")
 
@@ -940,26 +737,27 @@ class PumpOriginatorDashboard:
             pump_data["requested_by"] = self.username
 
             # Generate PDFs
-            config = load_config()
             notifications_dir = os.path.join(BASE_DIR, "docs", "Notifications")
             os.makedirs(notifications_dir, exist_ok=True)
             for dir_key in ["confirmation", "bom"]:
-                dir_path = config["document_dirs"][dir_key]
+                dir_path = get_document_dir(dir_key)
                 os.makedirs(dir_path, exist_ok=True)
 
             pdf_path = os.path.join(notifications_dir, f"new_pump_notification_{serial}.pdf")
-            bom_pdf_path = os.path.join(config["document_dirs"]["bom"], f"bom_checklist_{serial}.pdf")
-            confirmation_path = os.path.join(config["document_dirs"]["confirmation"], f"confirmation_pump_created_{serial}.pdf")
+            bom_pdf_path = os.path.join(get_document_dir("bom"), f"bom_checklist_{serial}.pdf")
+            confirmation_path = os.path.join(get_document_dir("confirmation"), f"confirmation_pump_created_{serial}.pdf")
 
-            # Generate PDFs
-            generate_pdf_notification(serial, pump_data, title="New Pump Assembly Notification", output_path=pdf_path)
-            os.startfile(pdf_path, "print")
-            generate_bom_checklist(serial, bom_items, output_path=bom_pdf_path)
-            os.startfile(bom_pdf_path, "print")
+            # Build the three PDFs in parallel on the document pipeline; printing and the email wait for all of them
             confirmation_data = {"serial_number": serial, "assembly_part_number": data["assembly_part_number"], "status": data["status"], "created_by": self.username, "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
-            generate_pdf_notification(serial, confirmation_data, title=f"Confirmation - Pump Created {serial}", output_path=confirmation_path)
+            jobs = [
+                render_job("notification", serial, pump_data, title="New Pump Assembly Notification", output_path=pdf_path),
+                render_job("bom_checklist", serial, bom_items, output_path=bom_pdf_path),
+                render_job("notification", serial, confirmation_data, title=f"Confirmation - Pump Created {serial}", output_path=confirmation_path),
+            ]
 
-            # Send email notification
+            documents = render_documents(jobs)
+
+            # Queued now, so a logout or exit before the PDFs finish cannot lose it; the outbox holds it until they exist
             subject = f"New Pump Assembly Created: {serial}"
             body_content = f"""
                 <p>A new pump assembly has been created and requires stock to be booked out of Sage and pulled.</p>
@@ -967,7 +765,19 @@ class PumpOriginatorDashboard:
                 {generate_pump_details_table(pump_data)}
                 <p>The BOM checklist is attached.</p>
             """
-            threading.Thread(target=send_email, args=(STORES_EMAIL, subject, "Dear Stores Team,", body_content, "Regards,<br>Guth Pump Registry", pdf_path, confirmation_path, bom_pdf_path), daemon=True).start()
+            queue_email(STORES_EMAIL, subject, "Dear Stores Team,", body_content, "Regards,<br>Guth Pump Registry", pdf_path, confirmation_path, bom_pdf_path,
+                        digest_details=pump_data, wait_for=documents)
+
+            def documents_ready(paths):
+                os.startfile(pdf_path, "print")
+                os.startfile(bom_pdf_path, "print")
+
+            def documents_failed(error):
+                logger.error(f"Failed to generate documents for pump {serial}: {error}")
+                if self.error_label.winfo_exists():
+                    self.error_label.config(text=f"Pump created: {serial}, but its documents failed: {error}", bootstyle="danger")
+
+            get_runner(self.root).watch(documents, documents_ready, documents_failed)
 
             self.error_label.config(text=f"Pump created: {serial}", bootstyle="success")
             self.refresh_all_pumps()
@@ -1146,11 +956,10 @@ class PumpOriginatorDashboard:
             try:
                 with get_db_connection() as conn:
                     cursor = conn.cursor()
-                    cursor.execute("UPDATE pumps SET status = 'Testing' WHERE serial_number = ?", (serial_number,))
+                    update_pump_status(cursor, serial_number, "Testing", self.username)
                     conn.commit()
 
-                    config = load_config()
-                    confirmation_dir = config["document_dirs"]["confirmation"]
+                    confirmation_dir = get_document_dir("confirmation")
                     os.makedirs(confirmation_dir, exist_ok=True)
                     confirmation_path = os.path.join(confirmation_dir, f"confirmation_retest_{serial_number}.pdf")
                     confirmation_data = {
@@ -1160,7 +969,8 @@ class PumpOriginatorDashboard:
                         "action_by": self.username,
                         "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
                     }
-                    generate_pdf_notification(serial_number, confirmation_data, title=f"Confirmation - Retest {serial_number}", output_path=confirmation_path)
+                    document = render_documents([render_job("notification", serial_number, confirmation_data,
+                                                            title=f"Confirmation - Retest {serial_number}", output_path=confirmation_path)])
 
                     subject = f"Pump {serial_number} Sent for Retest"
                     body_content = f"""
@@ -1168,7 +978,19 @@ class PumpOriginatorDashboard:
                         <h3 style="color: #34495e;">Pump Details</h3>
                         {generate_pump_details_table(pump)}
                     """
-                    threading.Thread(target=send_email, args=(STORES_EMAIL, subject, "Dear Stores Team,", body_content, "Regards,<br>Guth Pump Registry", confirmation_path), daemon=True).start()
+                    queue_email(STORES_EMAIL, subject, "Dear Stores Team,", body_content, "Regards,<br>Guth Pump Registry", confirmation_path,
+                                digest_details=pump, wait_for=document)
+
+                def document_ready(paths):
+                    logger.info(f"Retest confirmation for pump {serial_number} ready: {paths[0]}")
+
+                def document_failed(error):
+                    logger.error(f"Failed to generate retest confirmation for pump {serial_number}: {error}")
+                    if self.error_label.winfo_exists():
+                        self.error_label.config(text=f"Pump {serial_number} sent for retest, but its confirmation failed: {error}",
+                                                bootstyle="danger")
+
+                get_runner(self.root).watch(document, document_ready, document_failed)
 
                 self.refresh_all_pumps()
                 self.refresh_stock_pumps()
@@ -2,7 +2,7 @@ import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 from ttkbootstrap.tooltip import ToolTip
 from PIL import Image, ImageTk
-from utils.config import get_logger
+from utils.config import get_logger, get_email_settings
 import os
 import sys
 import json
@@ -17,37 +17,14 @@ if getattr(sys, 'frozen', False):
     BASE_DIR = sys._MEIPASS
     CONFIG_DIR = os.path.join(os.getenv('APPDATA'), "GuthPumpRegistry")
     os.makedirs(CONFIG_DIR, exist_ok=True)
-    CONFIG_PATH = os.path.join(CONFIG_DIR, "config.json")
     DETAILS_PATH = os.path.join(CONFIG_DIR, "login_details.json")
 else:
     BASE_DIR = r"C:\Users\travism\source\repos\GuthPumpRegistry"
-    CONFIG_PATH = os.path.join(BASE_DIR, "config.json")
     DETAILS_PATH = os.path.join(BASE_DIR, "login_details.json")
 
 LOGO_PATH = os.path.join(BASE_DIR, "assets", "logo.png")
 BUILD_NUMBER = "1.0.0"
 
-def load_config():
-    """Load configuration from config.json."""
-    if os.path.exists(CONFIG_PATH):
-        try:
-            with open(CONFIG_PATH, "r") as f:
-                config = json.load(f)
-            logger.debug(f"Loaded config from {CONFIG_PATH}")
-            return config
-        except Exception as e:
-            logger.error(f"Failed to load config from {CONFIG_PATH}: {str(e)}")
-    return {
-        "email_settings": {
-            "smtp_host": "smtp.gmail.com",
-            "smtp_port": "587",
-            "smtp_username": "",
-            "smtp_password": "",
-            "sender_email": "",
-            "use_tls": True
-        }
-    }
-
 def load_login_details():
     """Load saved login details if they exist."""
     if os.path.exists(DETAILS_PATH):
@@ -207,8 +184,7 @@ def forgot_password_window(root, username):
                     return
                 email = user[0]
 
-            config = load_config()
-            email_settings = config.get("email_settings", {})
+            email_settings = get_email_settings()
             smtp_host = email_settings.get("smtp_host", "smtp.gmail.com")
             smtp_port = int(email_settings.get("smtp_port", 587))
             smtp_username = email_settings.get("smtp_username", "")
@@ -2,43 +2,31 @@ import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 from ttkbootstrap.dialogs import Messagebox
 from ttkbootstrap.tooltip import ToolTip
-from database import get_db_connection, create_pump
+from database import get_db_connection, create_pump, fetch_pumps_page
 import pyodbc
 import os
 import sys
 import json
 from utils.config import get_logger
+from gui.virtual_tree import VirtualTreeview
 
 logger = get_logger("pump_originator")
 
 # Determine the base directory for bundled resources
 if getattr(sys, 'frozen', False):
     BASE_DIR = sys._MEIPASS
-    CONFIG_DIR = os.path.join(os.getenv('APPDATA'), "GuthPumpRegistry")
-    os.makedirs(CONFIG_DIR, exist_ok=True)
-    CONFIG_PATH = os.path.join(CONFIG_DIR, "config.json")
-    DEFAULT_CONFIG_PATH = os.path.join(BASE_DIR, "config.json")
 else:
     BASE_DIR = r"C:\Users\travism\source\repos\GuthPumpRegistry"
-    CONFIG_PATH = os.path.join(BASE_DIR, "config.json")
-    DEFAULT_CONFIG_PATH = CONFIG_PATH
 
 BUILD_NUMBER = "1.0.0"
 OPTIONS_PATH = os.path.join(BASE_DIR, "assets", "pump_options.json")
 ASSEMBLY_PART_NUMBERS_PATH = os.path.join(BASE_DIR, "assets", "assembly_part_numbers.json")
+PUMP_LIST_COLUMNS = ("serial_number", "assembly_part_number", "customer", "branch", "pump_model", "configuration",
+                     "created_at", "status", "pressure_required", "flow_rate_required")
 
-def load_config():
-    """Load configuration from config.json."""
-    if os.path.exists(CONFIG_PATH):
-        try:
-            with open(CONFIG_PATH, "r") as f:
-                config = json.load(f)
-            logger.debug(f"Loaded config from {CONFIG_PATH}")
-            return config
-        except Exception as e:
-            logger.error(f"Failed to load config from {CONFIG_PATH}: {str(e)}")
-    logger.warning(f"Using default config as {CONFIG_PATH} not found")
-    return {"document_dirs": {"certificate": os.path.join(BASE_DIR, "certificates")}}
+def pump_row_values(pump):
+    """Treeview values for a PUMP_LIST_COLUMNS row."""
+    return (pump[0], pump[1] or "N/A") + tuple(pump[2:])
 
 def load_options(file_path, key=""):
     """Load options from a JSON file."""
@@ -176,31 +164,21 @@ def show_pump_originator_gui(root, username, logout_callback):
     all_pumps_frame.pack(fill=BOTH, expand=True, padx=10, pady=10)
 
     columns = ("Serial Number", "Assembly Part Number", "Customer", "Branch", "Pump Model", "Configuration", "Created At", "Status", "Pressure Required", "Flow Rate Required")
-    all_pumps_tree = ttk.Treeview(all_pumps_frame, columns=columns, show="headings", height=15)
+    all_pumps_view = VirtualTreeview(all_pumps_frame, columns, height=15, to_values=pump_row_values,
+                                     error_message="Failed to load pumps")
     for col in columns:
-        all_pumps_tree.heading(col, text=col, anchor=W)
-        all_pumps_tree.column(col, width=150, anchor=W)
-    all_pumps_tree.pack(side=LEFT, fill=BOTH, expand=True)
-    scrollbar_all = ttk.Scrollbar(all_pumps_frame, orient=VERTICAL, command=all_pumps_tree.yview)
-    scrollbar_all.pack(side=RIGHT, fill=Y)
-    all_pumps_tree.configure(yscrollcommand=scrollbar_all.set)
+        all_pumps_view.tree.heading(col, text=col, anchor=W)
+        all_pumps_view.tree.column(col, width=150, anchor=W)
+    all_pumps_view.pack(fill=BOTH, expand=True)
+
+    def fetch_all_page(after, limit):
+        with get_db_connection() as conn:
+            return fetch_pumps_page(conn.cursor(), PUMP_LIST_COLUMNS, after, limit)
 
     def refresh_all_pumps():
         """Refresh the All Pumps table."""
-        all_pumps_tree.delete(*all_pumps_tree.get_children())
-        try:
-            with get_db_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT serial_number, assembly_part_number, customer, branch, pump_model, configuration, created_at, status, pressure_required, flow_rate_required
-                    FROM pumps
-                """)
-                for pump in cursor.fetchall():
-                    all_pumps_tree.insert("", END, values=(pump[0], pump[1] or "N/A", pump[2], pump[3], pump[4], pump[5], pump[6], pump[7], pump[8], pump[9]))
-            logger.info("Refreshed All Pumps table")
-        except Exception as e:
-            logger.error(f"Failed to refresh all pumps: {str(e)}")
-            Messagebox.show_error("Error", f"Failed to load pumps: {str(e)}")
+        all_pumps_view.reload(fetch_all_page)
+        logger.info("Refreshing All Pumps table")
 
     refresh_all_pumps()
     ttk.Button(all_pumps_frame, text="Refresh", command=refresh_all_pumps, bootstyle="info", style="large.TButton").pack(pady=5)
@@ -211,31 +189,21 @@ def show_pump_originator_gui(root, username, logout_callback):
     stores_frame = ttk.LabelFrame(stores_tab, text="Pumps in Stores", padding=10)
     stores_frame.pack(fill=BOTH, expand=True, padx=10, pady=10)
 
-    stores_tree = ttk.Treeview(stores_frame, columns=columns, show="headings", height=15)
+    stores_view = VirtualTreeview(stores_frame, columns, height=15, to_values=pump_row_values,
+                                  error_message="Failed to load pumps")
     for col in columns:
-        stores_tree.heading(col, text=col, anchor=W)
-        stores_tree.column(col, width=150, anchor=W)
-    stores_tree.pack(side=LEFT, fill=BOTH, expand=True)
-    scrollbar_stores = ttk.Scrollbar(stores_frame, orient=VERTICAL, command=stores_tree.yview)
-    scrollbar_stores.pack(side=RIGHT, fill=Y)
-    stores_tree.configure(yscrollcommand=scrollbar_stores.set)
+        stores_view.tree.heading(col, text=col, anchor=W)
+        stores_view.tree.column(col, width=150, anchor=W)
+    stores_view.pack(fill=BOTH, expand=True)
+
+    def fetch_stores_page(after, limit):
+        with get_db_connection() as conn:
+            return fetch_pumps_page(conn.cursor(), PUMP_LIST_COLUMNS, after, limit, status="Stores")
 
     def refresh_stores_pumps():
         """Refresh the Pumps in Stores table."""
-        stores_tree.delete(*stores_tree.get_children())
-        try:
-            with get_db_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT serial_number, assembly_part_number, customer, branch, pump_model, configuration, created_at, status, pressure_required, flow_rate_required
-                    FROM pumps WHERE status = 'Stores'
-                """)
-                for pump in cursor.fetchall():
-                    stores_tree.insert("", END, values=(pump[0], pump[1] or "N/A", pump[2], pump[3], pump[4], pump[5], pump[6], pump[7], pump[8], pump[9]))
-            logger.info("Refreshed Pumps in Stores table")
-        except Exception as e:
-            logger.error(f"Failed to refresh stores pumps: {str(e)}")
-            Messagebox.show_error("Error", f"Failed to load pumps: {str(e)}")
+        stores_view.reload(fetch_stores_page)
+        logger.info("Refreshing Pumps in Stores table")
 
     refresh_stores_pumps()
     ttk.Button(stores_frame, text="Refresh", command=refresh_stores_pumps, bootstyle="info", style="large.TButton").pack(pady=5)
@@ -2,13 +2,14 @@ import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 from ttkbootstrap.dialogs import Messagebox
 from PIL import Image, ImageTk
-from database import get_db_connection, pull_bom_item
+from database import (get_db_connection, pull_bom_item, fetch_pumps_page, log_audit_event, update_pump_status,
+                      EVENT_PART_NOT_PULLED)
 import os
 import sys
-from datetime import datetime
-import threading
 from utils.config import get_logger
-from export_utils import send_email, generate_pump_details_table, generate_bom_table
+from gui.virtual_tree import VirtualTreeview
+from utils.email_outbox import queue_email
+from export_utils import generate_pump_details_table, generate_bom_table
 
 # Initialize logger before using it
 logger = get_logger("stores_gui")
@@ -95,32 +96,25 @@ def show_stores_dashboard(root, username, role, logout_callback):
     pump_list_frame = ttk.LabelFrame(main_frame, text="Pumps in Stores", padding=10)
     pump_list_frame.pack(fill=BOTH, expand=True, padx=10, pady=10)
     columns = ("Serial Number", "Assembly Part Number", "Customer", "Branch", "Created At")
-    tree = ttk.Treeview(pump_list_frame, columns=columns, show="headings", height=15)
+    # pump is a tuple: (serial_number, assembly_part_number, customer, branch, created_at)
+    pump_view = VirtualTreeview(pump_list_frame, columns, height=15,
+                                to_values=lambda pump: (pump[0], pump[1] or "N/A", pump[2], pump[3], pump[4]),
+                                error_message="Failed to load pumps")
+    tree = pump_view.tree
     for col in columns:
         tree.heading(col, text=col, anchor=W)
         tree.column(col, width=150, anchor=W)
-    tree.pack(side=LEFT, fill=BOTH, expand=True)
-    scrollbar = ttk.Scrollbar(pump_list_frame, orient=VERTICAL, command=tree.yview)
-    scrollbar.pack(side=RIGHT, fill=Y)
-    tree.configure(yscrollcommand=scrollbar.set)
+    pump_view.pack(fill=BOTH, expand=True)
+
+    def fetch_page(after, limit):
+        with get_db_connection() as conn:
+            return fetch_pumps_page(conn.cursor(), ("serial_number", "assembly_part_number", "customer", "branch", "created_at"),
+                                    after, limit, status="Stores")
 
     def refresh_pump_list():
         """Refresh the list of pumps in Stores."""
-        tree.delete(*tree.get_children())
-        try:
-            with get_db_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT serial_number, assembly_part_number, customer, branch, created_at
-                    FROM pumps WHERE status = 'Stores'
-                """)
-                for pump in cursor.fetchall():
-                    # pump is a tuple: (serial_number, assembly_part_number, customer, branch, created_at)
-                    tree.insert("", END, values=(pump[0], pump[1] or "N/A", pump[2], pump[3], pump[4]))
-            logger.info("Refreshed Pumps in Stores table")
-        except Exception as e:
-            logger.error(f"Failed to refresh pump list: {str(e)}")
-            Messagebox.show_error("Error", f"Failed to load pumps: {str(e)}")
+        pump_view.reload(fetch_page)
+        logger.info("Refreshing Pumps in Stores table")
 
     refresh_pump_list()
     tree.bind("<Double-1>", lambda event: show_bom_window(main_frame, tree, username, refresh_pump_list))
@@ -326,14 +320,15 @@ def show_bom_window(parent_frame, tree, username, refresh_callback):
                     quantity = next(item[2] for item in bom_items if item[1] == part_code)  # quantity
                     bom_items_list.append({"part_name": part_name, "part_code": part_code, "quantity": quantity, "pulled": "Yes" if pulled else "No", "reason": reason})
                     if reason:
-                        cursor.execute("INSERT INTO audit_log (timestamp, username, action) VALUES (?, ?, ?)",
-                                       (datetime.now(), username, f"Reason for not pulling {part_code} on {serial_number}: {reason}"))
+                        log_audit_event(cursor, username, EVENT_PART_NOT_PULLED,
+                                        f"Reason for not pulling {part_code} on {serial_number}: {reason}",
+                                        serial_number=serial_number, part_code=part_code, reason=reason)
                 
                 # Get the notes from the text field
                 notes = notes_text.get("1.0", ttk.END).strip()
                 
                 # Update the pumps table with the notes and status
-                cursor.execute("UPDATE pumps SET status = ?, notes = ? WHERE serial_number = ?", ("Assembler", notes, serial_number))
+                update_pump_status(cursor, serial_number, "Assembler", username, {"notes": notes})
                 conn.commit()
                 logger.info(f"BOM submitted for {serial_number} by {username}, moved to Assembler")
 
@@ -351,9 +346,9 @@ def show_bom_window(parent_frame, tree, username, refresh_callback):
 
                 if originator:
                     pump_data = {k: pump.get(k, "") for k in ["serial_number", "assembly_part_number", "customer", "branch", "pump_model", "configuration", "impeller_size", "connection_type", "pressure_required", "flow_rate_required", "custom_motor", "flush_seal_housing"]}
-                    threading.Thread(target=send_email, args=(originator[1], f"Pump {serial_number} Moved to Assembly", f"Dear {originator[0]},",
-                                                              f"<p>All items for pump {serial_number} pulled, moved to Assembly.</p><h3 style='color: #34495e;'>Pump Details</h3>{generate_pump_details_table(pump_data)}{generate_bom_table(bom_items_list)}",
-                                                              "Regards,<br>Stores Team"), daemon=True).start()
+                    queue_email(originator[1], f"Pump {serial_number} Moved to Assembly", f"Dear {originator[0]},",
+                                f"<p>All items for pump {serial_number} pulled, moved to Assembly.</p><h3 style='color: #34495e;'>Pump Details</h3>{generate_pump_details_table(pump_data)}{generate_bom_table(bom_items_list)}",
+                                "Regards,<br>Stores Team")
                 else:
                     logger.warning(f"No originator found for pump {serial_number}")
 
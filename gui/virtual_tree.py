@@ -0,0 +1,242 @@
+from collections import OrderedDict
+import ttkbootstrap as ttk
+from ttkbootstrap.constants import *
+from ttkbootstrap.dialogs import Messagebox
+from gui.background import get_runner
+from utils.config import get_logger
+
+logger = get_logger("virtual_tree")
+
+PAGE_SIZE = 200
+# Pages kept in memory; the view only ever needs one or two, the rest make scrolling back cheap
+MAX_CACHED_PAGES = 8
+WHEEL_ROWS = 3
+LOADING_TEXT = "Loading..."
+PLACEHOLDER_TAG = "placeholder"
+
+
+class VirtualTreeview(ttk.Frame):
+    """A Treeview that materializes only the rows in view, paging them in from a keyset query.
+
+    fetch_page(after, limit) runs on a worker thread and returns (rows, next_key):
+    up to limit rows following the key `after` (None for the first page) and the
+    key to continue from, or None when there are no more rows. The Treeview holds
+    one item per visible row; scrolling rewrites those items from a small LRU of
+    fetched pages, fetching the next page as the view approaches it. Memory and
+    refresh time therefore depend on the window height, not the table size.
+
+    The scrollbar extent grows as pages are discovered, since the total row
+    count is only known once the last page has been fetched. Use `tree` for
+    headings, column widths and bindings; the selected item's values are the
+    selected row as usual. The "Loading..." placeholder row cannot be selected,
+    and clicks on it never reach the tree's own bindings.
+    """
+
+    def __init__(self, master, columns, height=20, page_size=PAGE_SIZE, to_values=tuple,
+                 error_message="Failed to load data", **kwargs):
+        super().__init__(master, **kwargs)
+        self.page_size = page_size
+        self.to_values = to_values
+        self.error_message = error_message
+        self.tree = ttk.Treeview(self, columns=columns, show="headings", height=height, selectmode="browse")
+        self.scrollbar = ttk.Scrollbar(self, orient=VERTICAL, command=self._on_scrollbar)
+        self.scrollbar.pack(side=RIGHT, fill=Y)
+        self.tree.pack(side=LEFT, fill=BOTH, expand=True)
+        self._runner = get_runner(self)
+        self._fetch_page = None
+        self._generation = 0
+        self._visible = height
+        self._items = []
+        self._reset()
+
+        # Runs before the tree's own bindings, so a handler bound later to <Double-1> never sees a placeholder
+        guard = f"{self.tree}.placeholder_guard"
+        self.tree.bindtags((guard,) + self.tree.bindtags())
+        self.tree.bind_class(guard, "<Button-1>", self._on_placeholder_click)
+        self.tree.bind_class(guard, "<Double-1>", self._on_placeholder_click)
+        self.tree.bind("<Configure>", self._on_configure)
+        self.tree.bind("<<TreeviewSelect>>", self._on_select)
+        self.tree.bind("<MouseWheel>", lambda event: self._scroll_rows(-(event.delta // 120) * WHEEL_ROWS))
+        self.tree.bind("<Button-4>", lambda event: self._scroll_rows(-WHEEL_ROWS))
+        self.tree.bind("<Button-5>", lambda event: self._scroll_rows(WHEEL_ROWS))
+        self.tree.bind("<Up>", lambda event: self._move_selection(-1))
+        self.tree.bind("<Down>", lambda event: self._move_selection(1))
+        self.tree.bind("<Prior>", lambda event: self._move_selection(-self._visible))
+        self.tree.bind("<Next>", lambda event: self._move_selection(self._visible))
+
+    def _reset(self):
+        self._offset = 0
+        self._selected = None
+        self._total = None
+        self._page_keys = [None]  # Start key of every page whose start is known
+        self._pages = OrderedDict()
+        self._pending = set()
+
+    def reload(self, fetch_page=None):
+        """Drop all cached rows and show the first page of fetch_page (or of the current source)."""
+        if fetch_page is not None:
+            self._fetch_page = fetch_page
+        self._generation += 1
+        self._reset()
+        self._render()
+
+    def extent(self):
+        """Rows the scrollbar currently spans: the total if known, else one page past the known pages."""
+        if self._total is not None:
+            return self._total
+        return len(self._page_keys) * self.page_size
+
+    def is_placeholder(self, item):
+        """True if a tree item is the loading placeholder rather than a row."""
+        return PLACEHOLDER_TAG in self.tree.item(item, "tags")
+
+    def _on_placeholder_click(self, event):
+        item = self.tree.identify_row(event.y)
+        if item and self.is_placeholder(item):
+            return "break"
+        return None
+
+    def selected_row(self):
+        """Return the selected row as fetched, or None."""
+        if self._selected is None:
+            return None
+        return self._row(self._selected)
+
+    def _row(self, index):
+        page, position = divmod(index, self.page_size)
+        rows = self._pages.get(page)
+        if rows is None:
+            self._request(page)
+            return None
+        self._pages.move_to_end(page)
+        return rows[position] if position < len(rows) else None
+
+    def _request(self, page):
+        if self._fetch_page is None or page in self._pending or page >= len(self._page_keys):
+            return
+        self._pending.add(page)
+        self.tree.configure(cursor="watch")
+        generation = self._generation
+        fetch_page, after, limit = self._fetch_page, self._page_keys[page], self.page_size
+        self._runner.submit(lambda: fetch_page(after, limit),
+                            lambda result: self._on_page(generation, page, result),
+                            lambda error: self._on_error(generation, page, error),
+                            key=("virtual_tree", str(self), page))
+
+    def _on_page(self, generation, page, result):
+        if generation != self._generation or not self.winfo_exists():
+            return
+        rows, next_key = result
+        self._pending.discard(page)
+        self._pages[page] = list(rows)
+        if next_key is None:
+            self._total = page * self.page_size + len(rows)
+            del self._page_keys[page + 1:]
+        elif page + 1 == len(self._page_keys):
+            self._page_keys.append(next_key)
+        self._evict()
+        logger.debug(f"Loaded page {page} ({len(rows)} rows), {len(self._pages)} pages cached")
+        self._render()
+        self.after_idle(self._on_configure)
+
+    def _on_error(self, generation, page, error):
+        if generation != self._generation or not self.winfo_exists():
+            return
+        self._pending.discard(page)
+        self.tree.configure(cursor="")
+        logger.error(f"{self.error_message}: {str(error)}")
+        Messagebox.show_error("Error", f"{self.error_message}: {str(error)}")
+
+    def _evict(self):
+        in_view = set(range(self._offset // self.page_size, (self._offset + self._visible) // self.page_size + 1))
+        for page in list(self._pages):
+            if len(self._pages) <= MAX_CACHED_PAGES:
+                break
+            if page not in in_view:
+                del self._pages[page]
+
+    def _render(self):
+        extent = self.extent()
+        self._offset = max(0, min(self._offset, extent - self._visible))
+        end = min(self._offset + self._visible, extent)
+        values = []
+        placeholder = False
+        for index in range(self._offset, end):
+            row = self._row(index)
+            if row is None:
+                # One placeholder while the page is fetched (or nothing past the last row)
+                if self._total is None or index < self._total:
+                    values.append((LOADING_TEXT,))
+                    placeholder = True
+                break
+            values.append(self.to_values(row))
+        if self._total is None:
+            # Prefetch the next page before the view reaches it
+            self._row(min(end + self.page_size // 2, extent - 1))
+
+        while len(self._items) < len(values):
+            self._items.append(self.tree.insert("", END))
+        if len(self._items) > len(values):
+            self.tree.delete(*self._items[len(values):])
+            del self._items[len(values):]
+        for item, row_values in zip(self._items, values):
+            self.tree.item(item, values=row_values, tags=())
+        if placeholder:
+            self.tree.item(self._items[-1], tags=(PLACEHOLDER_TAG,))
+
+        # A selected row that is still loading is selected once it arrives
+        position = None if self._selected is None else self._selected - self._offset
+        if position is not None and 0 <= position < len(self._items) and not self.is_placeholder(self._items[position]):
+            if self.tree.selection() != (self._items[position],):
+                self.tree.selection_set(self._items[position])
+        elif self.tree.selection():
+            self.tree.selection_remove(*self.tree.selection())
+        if not self._pending:
+            self.tree.configure(cursor="")
+        if extent:
+            self.scrollbar.set(self._offset / extent, min(1.0, (self._offset + self._visible) / extent))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def _on_configure(self, event=None):
+        bbox = self.tree.bbox(self._items[0]) if self._items else ""
+        if not bbox:
+            return
+        top, row_height = bbox[1], bbox[3]
+        visible = max(1, (self.tree.winfo_height() - top) // max(1, row_height))
+        if visible != self._visible:
+            self._visible = visible
+            self._render()
+
+    def _on_select(self, event=None):
+        selection = self.tree.selection()
+        if selection and self.is_placeholder(selection[0]):
+            self.tree.selection_remove(*selection)
+        elif selection and selection[0] in self._items:
+            self._selected = self._offset + self._items.index(selection[0])
+
+    def _scroll_rows(self, rows):
+        self._offset += rows
+        self._render()
+        return "break"
+
+    def _move_selection(self, rows):
+        if self._selected is None:
+            return None
+        last = self.extent() - 1
+        self._selected = max(0, min(self._selected + rows, last))
+        if self._selected < self._offset:
+            self._offset = self._selected
+        elif self._selected >= self._offset + self._visible:
+            self._offset = self._selected - self._visible + 1
+        self._render()
+        self.tree.event_generate("<<TreeviewSelect>>")
+        return "break"
+
+    def _on_scrollbar(self, *args):
+        if args[0] == "moveto":
+            self._offset = int(float(args[1]) * self.extent())
+        elif args[0] == "scroll":
+            step = self._visible if args[2] == "pages" else 1
+            self._offset += int(args[1]) * step
+        self._render()
@@ -0,0 +1,194 @@
+"""Re-issue pump test certificates for Completed pumps without starting the GUI.
+
+Selects Completed pumps by completion date, model and customer, reads their
+stored test data in one query and renders the certificates across all
+cores with the document pipeline. An index file in the output directory
+(certificate_index.json) records each certificate's input hash: the test
+data plus utils.certificate.CERTIFICATE_VERSION. Pumps whose hash and file
+are unchanged are skipped, so after a layout change (and a version bump)
+only the affected certificates are rebuilt, and an interrupted run picks
+up where it stopped.
+
+    python regenerate_certificates.py --since 2024-01-01 --until 2024-12-31
+    python regenerate_certificates.py --model "P1 3.0KW" --customer "Acme" --force
+
+Certificates go to the configured certificate directory unless --output is
+given.
+
+The completion date is when the pump entered Completed in its stage history.
+Pumps approved before status changes were audited have no recorded entry
+time; for them the approval_date in their test data (or the pump's
+test_date) is used instead, which is only as precise as a day. A pump with
+neither falls back to the history backfill's estimate, which may be well
+before its real approval, so date-bounded runs can miss or include such
+pumps; select them by --model/--customer instead.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import as_completed
+from datetime import datetime, timedelta
+
+project_root = os.path.dirname(os.path.abspath(__file__))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from database import get_db_connection, query_completed_test_data
+from utils.config import get_logger, get_document_dir
+from utils.certificate import CERTIFICATE_VERSION, certificate_filename
+from utils.doc_pipeline import DocumentPipeline, render_job
+from utils.streaming_export import fetch_batches
+
+logger = get_logger("regenerate_certificates")
+
+INDEX_NAME = "certificate_index.json"
+INDEX_SAVE_EVERY = 100  # Certificates rendered between index checkpoints
+
+
+def input_hash(serial_number, test_data):
+    """Hash of everything a certificate is rendered from, including the layout version."""
+    payload = json.dumps({"version": CERTIFICATE_VERSION, "serial_number": serial_number, "test_data": test_data},
+                         sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def load_index(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except ValueError as e:
+        logger.warning(f"Ignoring unreadable certificate index {path}: {str(e)}")
+        return {}
+
+
+def save_index(path, index):
+    """Write the index atomically, so an interrupted run never leaves it half written."""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=1, sort_keys=True)
+    os.replace(temp_path, path)
+
+
+def plan_certificates(rows, output_dir, index, force=False):
+    """Return (jobs, skipped, invalid) for (serial_number, pump_model, customer, completed_at, test_data) rows.
+
+    jobs is a list of (serial_number, test_data, output_path, index_entry)
+    for the certificates that are missing or whose input hash changed.
+    """
+    jobs = []
+    skipped = invalid = 0
+    for serial_number, pump_model, customer, completed_at, raw_test_data in rows:
+        try:
+            test_data = json.loads(raw_test_data)
+            if not isinstance(test_data, dict):
+                raise ValueError("test_data is not a JSON object")
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Skipping pump {serial_number}: invalid test data ({str(e)})")
+            invalid += 1
+            continue
+        digest = input_hash(serial_number, test_data)
+        filename = certificate_filename(serial_number)
+        output_path = os.path.join(output_dir, filename)
+        entry = index.get(serial_number)
+        if not force and entry and entry.get("hash") == digest and os.path.exists(output_path):
+            skipped += 1
+            continue
+        jobs.append((serial_number, test_data, output_path, {
+            "file": filename,
+            "hash": digest,
+            "version": CERTIFICATE_VERSION,
+            "pump_model": pump_model,
+            "customer": customer,
+            "completed_at": completed_at.isoformat(sep=" ", timespec="seconds") if completed_at else None,
+        }))
+    return jobs, skipped, invalid
+
+
+def render_certificates(jobs, index, index_path, workers, progress=None):
+    """Render the planned certificates across worker processes, updating the index; returns (rendered, failed)."""
+    rendered = failed = 0
+    pipeline = DocumentPipeline(workers)
+    futures = {}
+    try:
+        for serial_number, test_data, output_path, entry in jobs:
+            future = pipeline.submit(render_job("certificate", test_data, serial_number, output_path=output_path))
+            futures[future] = (serial_number, entry)
+        for future in as_completed(futures):
+            serial_number, entry = futures.pop(future)
+            try:
+                future.result()
+            except Exception as e:
+                logger.error(f"Failed to render certificate for pump {serial_number}: {str(e)}")
+                failed += 1
+                continue
+            entry["generated_at"] = datetime.now().isoformat(sep=" ", timespec="seconds")
+            index[serial_number] = entry
+            rendered += 1
+            if rendered % INDEX_SAVE_EVERY == 0:
+                save_index(index_path, index)
+            if progress is not None:
+                progress(rendered + failed, len(jobs))
+    finally:
+        for future in futures:
+            future.cancel()  # Only left over if interrupted
+        pipeline.shutdown()
+        save_index(index_path, index)
+    return rendered, failed
+
+
+def _date(text):
+    try:
+        return datetime.strptime(text, "%Y-%m-%d")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM-DD, got {text!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Regenerate test certificates for Completed pumps.")
+    parser.add_argument("--since", type=_date, help="First completion date to include (YYYY-MM-DD)")
+    parser.add_argument("--until", type=_date, help="Last completion date to include (YYYY-MM-DD)")
+    parser.add_argument("--model", action="append", help="Pump model to include (repeatable)")
+    parser.add_argument("--customer", action="append", help="Customer to include (repeatable)")
+    parser.add_argument("--output", help="Directory for the certificates and index (default: the certificate directory)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes (default: one per core)")
+    parser.add_argument("--force", action="store_true", help="Re-render even when the input hash is unchanged")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be rendered")
+    args = parser.parse_args()
+
+    output_dir = args.output or get_document_dir("certificate")
+    os.makedirs(output_dir, exist_ok=True)
+    index_path = os.path.join(output_dir, INDEX_NAME)
+    index = load_index(index_path)
+    until = args.until + timedelta(days=1) if args.until else None
+
+    start = time.perf_counter()
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            query_completed_test_data(cursor, args.since, until, args.model, args.customer)
+            rows = (row for batch in fetch_batches(cursor) for row in batch)
+            jobs, skipped, invalid = plan_certificates(rows, output_dir, index, args.force)
+    except Exception as e:
+        logger.error(f"Failed to read Completed pumps: {str(e)}")
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(f"{len(jobs)} certificates to render, {skipped} unchanged, {invalid} with invalid test data")
+    if args.dry_run or not jobs:
+        return 0
+
+    def progress(done, total):
+        if done % 50 == 0 or done == total:
+            print(f"{done}/{total} certificates ({time.perf_counter() - start:.1f}s)")
+
+    rendered, failed = render_certificates(jobs, index, index_path, max(1, args.workers), progress)
+    print(f"Rendered {rendered} certificates, {failed} failed, in {time.perf_counter() - start:.2f}s -> {output_dir}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
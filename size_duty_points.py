@@ -0,0 +1,155 @@
+"""Size a spreadsheet of duty points without starting the GUI.
+
+Reads (flow L/h, pressure bar) duty points from a CSV or XLSX file, sizes
+them in vectorized chunks against the pump curves (assets/pump_curves.csv,
+falling back to assets/pump_sizing.json), and writes each
+input row followed by the best k pump models, impeller diameters and
+suitability scores (lower is better) to a CSV or XLSX file.
+
+    python size_duty_points.py quote_points.xlsx sized.csv --top 3
+
+The flow and pressure columns are found by header name ("flow" / "pressure")
+unless --flow-column / --pressure-column are given (a header name or a
+1-based column number). Rows whose flow or pressure is not a number are
+written back with empty recommendations. XLSX files need openpyxl.
+"""
+import argparse
+import csv
+import os
+import sys
+import time
+import numpy as np
+
+project_root = os.path.dirname(os.path.abspath(__file__))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from utils.config import get_logger
+from utils.sizing import get_sizing_engine, DEFAULT_TOP_K, DEFAULT_CHUNK_SIZE
+from utils.streaming_export import RowWriter, is_xlsx
+
+logger = get_logger("size_duty_points")
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def read_rows(path, sheet=None):
+    """Yield the header and then each row of a CSV or XLSX file as a list of values."""
+    if is_xlsx(path):
+        from openpyxl import load_workbook
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            worksheet = workbook[sheet] if sheet else workbook.active
+            for row in worksheet.iter_rows(values_only=True):
+                yield list(row)
+        finally:
+            workbook.close()
+    else:
+        with open(path, "r", newline="", encoding="utf-8-sig") as f:
+            for row in csv.reader(f):
+                yield row
+
+
+def find_column(header, requested, keyword, default):
+    """Return the 0-based index of a column given by name, 1-based number or header keyword."""
+    names = [str(name).strip().lower() if name is not None else "" for name in header]
+    if requested:
+        if requested.isdigit():
+            return int(requested) - 1
+        if requested.strip().lower() in names:
+            return names.index(requested.strip().lower())
+        raise ValueError(f"Column '{requested}' not found in header {header}")
+    for index, name in enumerate(names):
+        if keyword in name:
+            return index
+    return default
+
+
+def size_file(input_path, output_path, k=DEFAULT_TOP_K, flow_column=None, pressure_column=None,
+              sheet=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Size every duty point in input_path and write the recommendations to output_path.
+
+    Returns the number of rows sized.
+    """
+    engine = get_sizing_engine()
+    arrays = engine.arrays()
+    pumps = engine.pumps()
+    # One trailing empty label so that index -1 (no match) looks up as blank
+    pump_labels = np.array([pumps[i]["id"] for i in arrays["model_index"]] + [""], dtype=object)
+    diameter_labels = np.array([int(d) if float(d).is_integer() else float(d) for d in arrays["diameter"]] + [""], dtype=object)
+
+    rows = read_rows(input_path, sheet)
+    header = next(rows, None)
+    if header is None:
+        raise ValueError(f"{input_path} is empty")
+    flow_index = find_column(header, flow_column, "flow", 0)
+    pressure_index = find_column(header, pressure_column, "pressure", 1)
+    logger.info(f"Sizing {input_path}: flow from column {flow_index + 1}, pressure from column {pressure_index + 1}, top {k}")
+
+    writer = RowWriter(output_path, "Sizing")
+    total = 0
+    try:
+        extra = []
+        for rank in range(1, k + 1):
+            extra += [f"Pump {rank}", f"Impeller {rank} (mm)", f"Score {rank}"]
+        writer.writerows([list(header) + extra])
+
+        def flush(chunk):
+            flows = np.fromiter((_to_float(row[flow_index]) if flow_index < len(row) else np.nan for row in chunk),
+                                dtype=np.float64, count=len(chunk))
+            pressures = np.fromiter((_to_float(row[pressure_index]) if pressure_index < len(row) else np.nan for row in chunk),
+                                    dtype=np.float64, count=len(chunk))
+            indices, scores = engine.find_batch(flows, pressures, k, chunk_size)
+            models = pump_labels[indices]
+            diameters = diameter_labels[indices]
+            scores = np.round(scores, 4).astype(object)
+            scores[indices < 0] = ""
+            recommendations = np.stack([models, diameters, scores], axis=2).reshape(len(chunk), 3 * k).tolist()
+            writer.writerows([row + recommendation for row, recommendation in zip(chunk, recommendations)])
+
+        chunk = []
+        for row in rows:
+            chunk.append(list(row))
+            if len(chunk) >= chunk_size:
+                flush(chunk)
+                total += len(chunk)
+                chunk = []
+        if chunk:
+            flush(chunk)
+            total += len(chunk)
+    finally:
+        writer.close()
+    logger.info(f"Wrote recommendations for {total} duty points to {output_path}")
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recommend pumps and impellers for a spreadsheet of duty points.")
+    parser.add_argument("input", help="CSV or XLSX file of duty points (first row is the header)")
+    parser.add_argument("output", help="CSV or XLSX file to write")
+    parser.add_argument("-k", "--top", type=int, default=DEFAULT_TOP_K, help="Recommendations per duty point")
+    parser.add_argument("--flow-column", help="Flow (L/h) column name or 1-based number")
+    parser.add_argument("--pressure-column", help="Pressure (bar) column name or 1-based number")
+    parser.add_argument("--sheet", help="Worksheet to read from an XLSX file (default: the active sheet)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Rows read and sized per pass")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    try:
+        total = size_file(args.input, args.output, args.top, args.flow_column, args.pressure_column,
+                          args.sheet, args.chunk_size)
+    except (OSError, ValueError, KeyError) as e:
+        logger.error(f"Batch sizing failed: {str(e)}")
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(f"Sized {total} duty points in {time.perf_counter() - start:.2f}s -> {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+from datetime import datetime
+import numpy as np
+
+# Production stages in the order a pump moves through them; Completed is terminal and has no lead time
+STAGES = ("Stores", "Assembler", "Testing", "Pending Approval")
+PERCENTILES = (50, 90, 95)
+# Upper bounds (days) of the WIP aging buckets; the last bucket is open-ended
+AGE_BUCKETS_DAYS = (1, 2, 7)
+
+
+def _hours(delta):
+    return delta.total_seconds() / 3600.0
+
+
+def _summary(values, percentiles):
+    if not values:
+        return {"count": 0, "mean": None, "max": None, **{f"p{p}": None for p in percentiles}}
+    array = np.asarray(values, dtype=np.float64)
+    points = np.percentile(array, percentiles)
+    summary = {"count": len(array), "mean": float(array.mean()), "max": float(array.max())}
+    summary.update({f"p{p}": float(value) for p, value in zip(percentiles, points)})
+    return summary
+
+
+def _bucket_labels():
+    labels = []
+    lower = 0
+    for upper in AGE_BUCKETS_DAYS:
+        labels.append(f"{lower}-{upper}d")
+        lower = upper
+    labels.append(f">{lower}d")
+    return labels
+
+
+def stage_statistics(rows, now=None, percentiles=PERCENTILES):
+    """Compute per-stage lead times and WIP aging from (status, entered_at, exited_at) rows in one pass.
+
+    Closed stages contribute their duration to the stage's lead time; open
+    stages (exited_at None) are work in progress and contribute their age.
+    Returns {stage: {"lead_time_hours": summary, "wip_age_hours": summary,
+    "wip_age_buckets": {label: count}}}, where a summary has count, mean, max
+    and the requested percentiles. Stages outside STAGES are ignored.
+    """
+    now = now or datetime.now()
+    labels = _bucket_labels()
+    bounds = np.array(AGE_BUCKETS_DAYS, dtype=np.float64) * 24.0
+    lead_times = {stage: [] for stage in STAGES}
+    ages = {stage: [] for stage in STAGES}
+    for status, entered_at, exited_at in rows:
+        if status not in lead_times or entered_at is None:
+            continue
+        if exited_at is None:
+            ages[status].append(_hours(now - entered_at))
+        else:
+            lead_times[status].append(_hours(exited_at - entered_at))
+
+    stats = {}
+    for stage in STAGES:
+        buckets = np.bincount(np.searchsorted(bounds, ages[stage], side="right"), minlength=len(labels))
+        stats[stage] = {
+            "lead_time_hours": _summary(lead_times[stage], percentiles),
+            "wip_age_hours": _summary(ages[stage], percentiles),
+            "wip_age_buckets": dict(zip(labels, (int(count) for count in buckets))),
+        }
+    return stats
+
+
+def bottleneck(stats):
+    """Return the stage with the longest median lead time, or None if no stage has completed pumps."""
+    timed = [(summary["lead_time_hours"]["p50"], stage) for stage, summary in stats.items()
+             if summary["lead_time_hours"]["count"]]
+    return max(timed)[1] if timed else None
+
+
+if __name__ == "__main__":
+    from datetime import timedelta
+    start = datetime(2025, 1, 6, 8)
+    demo_rows = []
+    for i in range(200):
+        entered = start + timedelta(hours=6 * i)
+        demo_rows.append(("Stores", entered, entered + timedelta(hours=4 + i % 20)))
+        demo_rows.append(("Assembler", entered + timedelta(hours=24), entered + timedelta(hours=24 + 10 + (i % 7) * 8)))
+    demo_rows.append(("Testing", start, None))
+    demo_stats = stage_statistics(demo_rows, now=start + timedelta(days=60))
+    for stage, summary in demo_stats.items():
+        print(stage, summary)
+    print("Bottleneck:", bottleneck(demo_stats))
@@ -0,0 +1,175 @@
+import json
+import os
+import sys
+import threading
+from functools import lru_cache
+from utils.config import get_logger
+from utils.bom_utils import get_bom_catalog
+
+logger = get_logger("bom_rules")
+
+# Determine the base directory for bundled resources
+if getattr(sys, 'frozen', False):
+    BASE_DIR = sys._MEIPASS
+else:
+    BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BOM_RULES_PATH = os.path.join(BASE_DIR, "assets", "bom_rules.json")
+OPERATIONS = ("add", "replace", "remove", "set_quantity")
+# Keys of a rule's "when" block that match the pump itself rather than one of its options
+PUMP_KEYS = ("model", "model_prefix", "configuration")
+
+
+class BomRuleError(ValueError):
+    """Raised when bom_rules.json contains an invalid rule."""
+
+
+def _as_tuple(value):
+    return tuple(value) if isinstance(value, (list, tuple)) else (value,)
+
+
+class _Rule:
+    """A rule from bom_rules.json with its conditions and operations pre-parsed."""
+
+    __slots__ = ("name", "models", "model_prefixes", "configurations", "options", "ops")
+
+    def __init__(self, spec):
+        when = spec.get("when", {})
+        self.name = spec.get("name", "unnamed rule")
+        self.models = _as_tuple(when["model"]) if "model" in when else None
+        self.model_prefixes = _as_tuple(when["model_prefix"]) if "model_prefix" in when else None
+        self.configurations = _as_tuple(when["configuration"]) if "configuration" in when else None
+        self.options = tuple((key, frozenset(_as_tuple(value))) for key, value in when.items() if key not in PUMP_KEYS)
+        self.ops = tuple(self._compile_op(op) for op in spec.get("ops", []))
+
+    def _compile_op(self, op):
+        kind = op.get("op")
+        if kind not in OPERATIONS:
+            raise BomRuleError(f"Rule '{self.name}': unknown operation {kind!r}")
+        if kind == "remove":
+            return (kind, frozenset(op["targets"]), None)
+        line = (op["part_code"], op.get("part_name"), int(op.get("quantity", 1)))
+        if kind == "add" and line[1] is None:
+            raise BomRuleError(f"Rule '{self.name}': 'add' needs a part_name")
+        targets = frozenset(op.get("targets", (op["part_code"],)))
+        return (kind, targets, line)
+
+    def applies_to(self, pump_model, configuration, options):
+        if self.models is not None and pump_model not in self.models:
+            return False
+        if self.model_prefixes is not None and not pump_model.startswith(self.model_prefixes):
+            return False
+        if self.configurations is not None and configuration not in self.configurations:
+            return False
+        return all(options.get(key) in values for key, values in self.options)
+
+
+class BomRuleSet:
+    """Data-driven BOM option rules, compiled once and resolved per (model, configuration, options).
+
+    Rules are applied in file order to a copy of the base BOM's lines, keeping
+    duplicate part codes as separate lines like the hard-coded logic they replace
+    (utils/bom_rules_check.py compares the two). Resolved BOMs are memoized and
+    invalidated when either bom_rules.json or bom.json changes.
+    """
+
+    def __init__(self, path=BOM_RULES_PATH, catalog=None, cache_size=1024):
+        self.path = path
+        self.catalog = catalog or get_bom_catalog()
+        self._lock = threading.Lock()
+        self._signature = None
+        self._rules = ()
+        self._option_keys = ()
+        self.version = 0
+        self._resolve_cached = lru_cache(maxsize=cache_size)(self._resolve)
+
+    def _refresh(self):
+        try:
+            st = os.stat(self.path)
+            signature = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            signature = None
+        if signature == self._signature and self.version:
+            return
+        with self._lock:
+            if signature == self._signature and self.version:
+                return
+            rules = ()
+            if signature is None:
+                logger.warning(f"BOM rules file not found: {self.path}, BOMs will not be adjusted for options")
+            else:
+                try:
+                    with open(self.path, "r") as f:
+                        rules = tuple(_Rule(spec) for spec in json.load(f).get("rules", []))
+                    logger.info(f"Loaded {len(rules)} BOM rules from {self.path}")
+                except (OSError, ValueError, KeyError, TypeError) as e:
+                    logger.error(f"Failed to load BOM rules from {self.path}: {str(e)}")
+                    if self.version:
+                        return  # Keep the last good rule set
+            self._rules = rules
+            self._option_keys = tuple(sorted({key for rule in rules for key, _ in rule.options}))
+            self._signature = signature
+            self.version += 1
+            self._resolve_cached.cache_clear()
+
+    def resolve(self, pump_model, configuration, options=None):
+        """Return the BOM for a pump with its option rules applied, as a list of fresh dicts."""
+        self._refresh()
+        # Check bom.json before keying on its version, or a cache hit would outlive an edit to it
+        catalog_version = self.catalog.refresh()
+        options = options or {}
+        # Only the options some rule looks at go into the cache key
+        option_key = tuple((key, options.get(key)) for key in self._option_keys)
+        lines = self._resolve_cached(pump_model, configuration, option_key, catalog_version)
+        return [{"part_code": code, "part_name": name, "quantity": quantity} for code, name, quantity in lines]
+
+    def _resolve(self, pump_model, configuration, option_key, catalog_version):
+        options = dict(option_key)
+        lines = [(item.part_code, item.part_name, item.quantity) for item in self.catalog.get_bom(pump_model, configuration)]
+
+        for rule in self._rules:
+            if not rule.applies_to(pump_model, configuration, options):
+                continue
+            for kind, targets, line in rule.ops:
+                if kind == "add":
+                    # Switch on the first line with this part code (listed with quantity 0), otherwise add it
+                    for i, (code, name, _) in enumerate(lines):
+                        if code == line[0]:
+                            lines[i] = (code, name, line[2])
+                            break
+                    else:
+                        lines.append(line)
+                elif kind == "set_quantity":
+                    lines = [(code, name, line[2] if code in targets else quantity) for code, name, quantity in lines]
+                else:
+                    lines = [current for current in lines if current[0] not in targets]
+                    if kind == "replace":
+                        lines.append(line)
+                logger.debug(f"Applied BOM rule '{rule.name}' ({kind}) to {pump_model}/{configuration}")
+        return tuple(lines)
+
+    def cache_info(self):
+        return self._resolve_cached.cache_info()
+
+
+_rule_set = None
+_rule_set_lock = threading.Lock()
+
+def get_bom_rules():
+    """Return the shared BOM rule set."""
+    global _rule_set
+    if _rule_set is None:
+        with _rule_set_lock:
+            if _rule_set is None:
+                _rule_set = BomRuleSet()
+    return _rule_set
+
+def resolve_bom(pump_model, configuration, options=None):
+    """Return the BOM for a pump model/configuration adjusted for the selected options."""
+    return get_bom_rules().resolve(pump_model, configuration, options)
+
+if __name__ == "__main__":
+    options = {"flush_seal_housing": "Yes", "o_ring_material": "Viton", "mechanical_seals": "TC/TC"}
+    for item in resolve_bom("P1 3.0KW", "Standard", options):
+        print(item)
+    print(get_bom_rules().cache_info())
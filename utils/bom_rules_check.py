@@ -0,0 +1,117 @@
+import itertools
+import sys
+from utils.config import get_logger
+from utils.bom_utils import get_bom_catalog
+from utils.bom_rules import get_bom_rules
+
+logger = get_logger("bom_rules_check")
+
+# Every value the dashboard can submit for the options the rules look at, including ones no rule matches
+OPTION_VALUES = {
+    "flush_seal_housing": ("Yes", "No"),
+    "o_ring_material": ("Nitrile", "Viton", ""),
+    "mechanical_seals": ("SC/SC", "TC/TC", "C/SS", "Standard", "Viton", "Custom seal", ""),
+}
+P1_MECH_SEALS = ("10.55.10000", "10.55.10001", "10.55.10002")
+
+
+def legacy_bom(pump_model, configuration, data, fix_p1_seals=True, catalog=None):
+    """Return the BOM the hard-coded option logic in submit_pump built before bom_rules.json replaced it.
+
+    The old code removed the default mechanical seal by matching "Mechanical shaft seal"
+    in the part name, which no P1 seal has, so P1 BOMs listed two seals. The rules remove
+    it by part code on purpose; fix_p1_seals applies the same fix here so the comparison
+    only reports unintended differences.
+    """
+    catalog = catalog or get_bom_catalog()
+    updated_bom_items = catalog.get_items(pump_model, configuration)
+
+    # Flush Seal Housing
+    if data["flush_seal_housing"] == "Yes":
+        flush_seal_part = None
+        if pump_model.startswith("P1"):
+            flush_seal_part = {"part_code": "10.55.10009", "part_name": "P1 - 2 FLUSH ARRANGEMENT SEAL", "quantity": 1}
+        elif pump_model.startswith("PS"):
+            flush_seal_part = {"part_code": "10.55.10010", "part_name": "PS FLUSH ARRANGEMENT SEAL", "quantity": 1}
+        elif pump_model.startswith("P2"):
+            flush_seal_part = {"part_code": "10.55.10009", "part_name": "P1 - 2 FLUSH ARRANGEMENT SEAL", "quantity": 1}
+        if flush_seal_part:
+            for item in updated_bom_items:
+                if item["part_code"] == flush_seal_part["part_code"]:
+                    item["quantity"] = 1
+                    break
+            else:
+                updated_bom_items.append(flush_seal_part)
+
+    # O-ring Material
+    o_ring_part = None
+    if pump_model.startswith("P1"):
+        if data["o_ring_material"] == "Nitrile":
+            o_ring_part = {"part_code": "10.55.09005", "part_name": "P1 FRONT COVER 'O' RING NITRILE", "quantity": 1}
+        elif data["o_ring_material"] == "Viton":
+            o_ring_part = {"part_code": "10.55.09013", "part_name": "P1 FRONT COVER 'O' RING VITON", "quantity": 1}
+    elif pump_model.startswith("PS"):
+        if data["o_ring_material"] == "Nitrile":
+            o_ring_part = {"part_code": "10.55.09000", "part_name": "PS FRONT COVER 'O' RING NITRILE", "quantity": 1}
+    elif pump_model.startswith("P2"):
+        if data["o_ring_material"] == "Nitrile":
+            o_ring_part = {"part_code": "10.55.09010", "part_name": "P2 FRONT COVER 'O' RING NITRILE", "quantity": 1}
+    if o_ring_part:
+        updated_bom_items = [item for item in updated_bom_items if "Front cover 'O' ring" not in item["part_name"]]
+        updated_bom_items.append(o_ring_part)
+
+    # Mechanical Seal
+    mech_seal_part = None
+    if pump_model.startswith("P1"):
+        if data["mechanical_seals"] == "SC/SC":
+            mech_seal_part = {"part_code": "10.55.10000", "part_name": "P1 MECH SEAL S/C VS S/C - EPDM ELASTOMER", "quantity": 1}
+        elif data["mechanical_seals"] == "TC/TC":
+            mech_seal_part = {"part_code": "10.55.10001", "part_name": "P1 MECH SEAL T/C VS T/C - EPDM ELASTOMER", "quantity": 1}
+        elif data["mechanical_seals"] == "C/SS":
+            mech_seal_part = {"part_code": "10.55.10002", "part_name": "P1 - 2 MECH SEAL S/ST - CARBON EPDM ELASTOMER", "quantity": 1}
+    elif pump_model.startswith("PS"):
+        if data["mechanical_seals"] == "Standard":
+            mech_seal_part = {"part_code": "10.55.100047", "part_name": "Mechanical shaft seal", "quantity": 1}
+    elif pump_model.startswith("P2"):
+        if data["mechanical_seals"] == "Viton":
+            mech_seal_part = {"part_code": "10.55.10004", "part_name": "Mechanical shaft seal VITON", "quantity": 1}
+    if mech_seal_part:
+        replaced = P1_MECH_SEALS if fix_p1_seals and pump_model.startswith("P1") else ()
+        updated_bom_items = [item for item in updated_bom_items
+                             if "Mechanical shaft seal" not in item["part_name"] and item["part_code"] not in replaced]
+        updated_bom_items.append(mech_seal_part)
+
+    return updated_bom_items
+
+
+def compare_with_legacy(fix_p1_seals=True, catalog=None, rule_set=None):
+    """Resolve every model, configuration and option combination both ways.
+
+    Returns a list of (model, configuration, options, legacy BOM, rules BOM) for
+    each combination where the two differ; an empty list means the rules match.
+    """
+    catalog = catalog or get_bom_catalog()
+    rule_set = rule_set or get_bom_rules()
+    keys = tuple(OPTION_VALUES)
+    mismatches = []
+    for pump_model in catalog.models():
+        for configuration in catalog.configurations(pump_model):
+            for values in itertools.product(*(OPTION_VALUES[key] for key in keys)):
+                options = dict(zip(keys, values))
+                expected = legacy_bom(pump_model, configuration, options, fix_p1_seals, catalog)
+                actual = rule_set.resolve(pump_model, configuration, options)
+                if actual != expected:
+                    mismatches.append((pump_model, configuration, options, expected, actual))
+    return mismatches
+
+
+if __name__ == "__main__":
+    mismatches = compare_with_legacy(fix_p1_seals="--strict" not in sys.argv)
+    for pump_model, configuration, options, expected, actual in mismatches:
+        print(f"{pump_model}/{configuration} {options}")
+        print(f"  legacy: {[(item['part_code'], item['quantity']) for item in expected]}")
+        print(f"  rules:  {[(item['part_code'], item['quantity']) for item in actual]}")
+    catalog = get_bom_catalog()
+    combinations = sum(len(catalog.configurations(model)) for model in catalog.models())
+    print(f"{len(mismatches)} mismatches across {combinations} BOMs")
+    sys.exit(1 if mismatches else 0)
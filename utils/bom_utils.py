@@ -1,63 +1,166 @@
 import json
 import os
 import sys
-from utils.config import get_logger
+import threading
+from utils.config import get_logger, get_config_service
 
 logger = get_logger("bom_utils")
 
 # Determine the base directory for bundled resources
 if getattr(sys, 'frozen', False):
     BASE_DIR = sys._MEIPASS
-    CONFIG_DIR = os.path.join(os.getenv('APPDATA'), "GuthPumpRegistry")
-    os.makedirs(CONFIG_DIR, exist_ok=True)
-    CONFIG_PATH = os.path.join(CONFIG_DIR, "config.json")
-    DEFAULT_CONFIG_PATH = os.path.join(BASE_DIR, "config.json")
 else:
     BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    CONFIG_PATH = os.path.join(BASE_DIR, "config.json")
-    DEFAULT_CONFIG_PATH = CONFIG_PATH
 
-def load_config():
-    """Load configuration from config.json, falling back to defaults if missing."""
-    if os.path.exists(CONFIG_PATH):
-        try:
-            with open(CONFIG_PATH, "r") as f:
-                config = json.load(f)
-            logger.debug(f"Loaded config from {CONFIG_PATH}")
-            return config
-        except Exception as e:
-            logger.error(f"Failed to load config from {CONFIG_PATH}: {str(e)}")
-    if os.path.exists(DEFAULT_CONFIG_PATH):
+DEFAULT_BOM = [{"part_name": "Impeller", "part_code": "IMP-001", "quantity": 1},
+               {"part_name": "Motor", "part_code": "MTR-3.0kW", "quantity": 1}]
+
+class BomItem:
+    """A single BOM line; identical lines are shared between BOMs, so treat instances as read-only."""
+
+    __slots__ = ("part_code", "part_name", "quantity")
+
+    def __init__(self, part_code, part_name, quantity):
+        self.part_code = part_code
+        self.part_name = part_name
+        self.quantity = quantity
+
+    def to_dict(self):
+        return {"part_code": self.part_code, "part_name": self.part_name, "quantity": self.quantity}
+
+    def __repr__(self):
+        return f"BomItem({self.part_code!r}, {self.part_name!r}, {self.quantity!r})"
+
+class BomCatalog:
+    """bom.json parsed once and indexed by (model, configuration) and by part_code.
+
+    The file's mtime/size is checked on each lookup and the catalog is rebuilt
+    only when it changes, so pump creation never parses JSON.
+    """
+
+    def __init__(self, path=None):
+        self._path = path
+        self._lock = threading.RLock()
+        self._signature = None
+        self._boms = {}
+        self._parts = {}
+        self._where_used = {}
+        self._loaded = False
+        self.version = 0
+
+    @property
+    def path(self):
+        return self._path or get_config_service().get_bom_path()
+
+    def _refresh(self):
+        path = self.path
         try:
-            with open(DEFAULT_CONFIG_PATH, "r") as f:
-                config = json.load(f)
-            logger.debug(f"Loaded default config from {DEFAULT_CONFIG_PATH}")
-            return config
-        except Exception as e:
-            logger.error(f"Failed to load default config from {DEFAULT_CONFIG_PATH}: {str(e)}")
-    logger.warning(f"No config found at {CONFIG_PATH} or {DEFAULT_CONFIG_PATH}, using defaults")
-    return {"bom_path": os.path.join(BASE_DIR, "assets", "bom.json")}
+            st = os.stat(path)
+            signature = (path, st.st_mtime_ns, st.st_size)
+        except OSError:
+            signature = (path, None, None)
+        if signature == self._signature:
+            return
+        with self._lock:
+            if signature == self._signature:
+                return
+            self._signature = signature
+            if signature[1] is None:
+                logger.error(f"BOM file not found: {path}")
+                self._index({})
+                self._loaded = False
+            else:
+                try:
+                    with open(path, "r") as f:
+                        self._index(json.load(f))
+                    self._loaded = True
+                    logger.info(f"Loaded BOM catalog from {path}: {len(self._boms)} BOMs, {len(self._parts)} part codes")
+                except (OSError, ValueError) as e:
+                    # Keep serving the previous catalog until the file is fixed (its mtime changes again)
+                    logger.error(f"Failed to load BOM from {path}: {str(e)}")
+                    return
+            self.version += 1
+
+    def refresh(self):
+        """Reload bom.json if it changed since the last check; returns the catalog version."""
+        self._refresh()
+        return self.version
+
+    def _index(self, bom_data):
+        interned = {}
+        boms = {}
+        parts = {}
+        where_used = {}
+        for model, configurations in bom_data.items():
+            for configuration, items in configurations.items():
+                lines = []
+                for item in items:
+                    key = (item["part_code"], item["part_name"], item["quantity"])
+                    line = interned.get(key)
+                    if line is None:
+                        line = interned[key] = BomItem(*key)
+                    lines.append(line)
+                    parts.setdefault(line.part_code, line)
+                    where_used.setdefault(line.part_code, []).append((model, configuration))
+                boms[(model, configuration)] = tuple(lines)
+        self._boms, self._parts, self._where_used = boms, parts, where_used
+
+    def get_bom(self, pump_model, configuration):
+        """Return the BOM lines for a model/configuration as a tuple of shared BomItem objects."""
+        self._refresh()
+        return self._boms.get((pump_model, configuration), ())
+
+    def get_items(self, pump_model, configuration):
+        """Return the BOM for a model/configuration as a list of fresh dicts the caller may modify."""
+        return [line.to_dict() for line in self.get_bom(pump_model, configuration)]
+
+    def has_bom(self, pump_model, configuration):
+        self._refresh()
+        return (pump_model, configuration) in self._boms
+
+    def get_part(self, part_code):
+        """Return the first BomItem seen for a part code, or None."""
+        self._refresh()
+        return self._parts.get(part_code)
+
+    def where_used(self, part_code):
+        """Return the (model, configuration) pairs whose BOM contains a part code."""
+        self._refresh()
+        return list(self._where_used.get(part_code, ()))
+
+    def models(self):
+        self._refresh()
+        return sorted({model for model, _ in self._boms})
+
+    def configurations(self, pump_model):
+        self._refresh()
+        return sorted(configuration for model, configuration in self._boms if model == pump_model)
+
+    def is_loaded(self):
+        self._refresh()
+        return self._loaded
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+def get_bom_catalog():
+    """Return the shared BOM catalog."""
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = BomCatalog()
+    return _catalog
 
 def generate_bom(pump_model, configuration):
     """Generate BOM for a pump based on model and configuration from bom.json."""
-    config = load_config()
-    bom_path = config.get("bom_path", os.path.join(BASE_DIR, "assets", "bom.json"))
-    
-    if not os.path.exists(bom_path):
-        logger.warning(f"BOM file not found at {bom_path}, returning default BOM")
-        return [{"part_name": "Impeller", "part_code": "IMP-001", "quantity": 1},
-                {"part_name": "Motor", "part_code": "MTR-3.0kW", "quantity": 1}]
-    
-    try:
-        with open(bom_path, "r") as f:
-            bom_data = json.load(f)
-            items = bom_data.get(pump_model, {}).get(configuration, [])
-            logger.debug(f"Generated BOM for {pump_model}/{configuration}: {items}")
-            return items
-    except (json.JSONDecodeError, Exception) as e:
-        logger.error(f"Failed to load BOM from {bom_path}: {str(e)}")
-        return [{"part_name": "Impeller", "part_code": "IMP-001", "quantity": 1},
-                {"part_name": "Motor", "part_code": "MTR-3.0kW", "quantity": 1}]
+    catalog = get_bom_catalog()
+    if not catalog.is_loaded():
+        logger.warning(f"BOM file not available at {catalog.path}, returning default BOM")
+        return [dict(item) for item in DEFAULT_BOM]
+    return catalog.get_items(pump_model, configuration)
 
 if __name__ == "__main__":
-    print(generate_bom("P1 3.0KW", "Standard"))
\ No newline at end of file
+    print(generate_bom("P1 3.0KW", "Standard"))
+    catalog = get_bom_catalog()
+    print(f"{len(catalog.models())} models, 10.55.10009 used in {len(catalog.where_used('10.55.10009'))} BOMs")
@@ -0,0 +1,139 @@
+import os
+import traceback
+from reportlab.lib.pagesizes import A4
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table
+from reportlab.lib.units import inch
+from utils.config import get_logger, get_document_dir, BASE_DIR
+from utils.pdf_resources import register_fonts, get_pdf_styles, get_table_styles, image_flowable
+from utils.graphs import graph_flowable, plot_flow_curve
+
+logger = get_logger("certificate")
+
+PDF_LOGO_PATH = os.path.join(BASE_DIR, "assets", "guth_logo.png")
+# Bump whenever the certificate layout changes so regenerate_certificates.py re-issues existing certificates
+CERTIFICATE_VERSION = "2025-04-10_v1"
+
+# Certificates need the Roboto fonts; fail at import rather than on the first approval
+register_fonts()
+
+
+def certificate_filename(serial_number):
+    return f"Pump_Test_Report_{serial_number}.pdf"
+
+
+def generate_certificate(data, serial_number, output_path=None):
+    """Generate a pump test certificate PDF; returns its path (the certificate directory unless output_path is given)."""
+    if output_path:
+        pdf_path = output_path
+    else:
+        cert_dir = get_document_dir("certificate")
+        os.makedirs(cert_dir, exist_ok=True)
+        pdf_path = os.path.join(cert_dir, certificate_filename(serial_number))
+    doc = SimpleDocTemplate(pdf_path, pagesize=A4, rightMargin=36, leftMargin=36, topMargin=36, bottomMargin=36)
+    styles = get_pdf_styles()
+    table_styles = get_table_styles()
+    heading_style = styles["certificate_heading"]
+    subheading_style = styles["certificate_subheading"]
+
+    story = []
+    logo = image_flowable(PDF_LOGO_PATH, 120, 60, "RIGHT")
+    if logo is not None:
+        story.append(logo)
+        story.append(Spacer(1, 3))
+
+    story.append(Paragraph("PUMP TEST REPORT", heading_style))
+    story.append(Spacer(1, 3))
+
+    top_data = [
+        ["Invoice Number:", data.get("invoice_number", "N/A")],
+        ["Customer:", data.get("customer", "N/A")],
+        ["Job Number:", data.get("job_number", "N/A")]
+    ]
+    top_table = Table(top_data, colWidths=[125, 375], style=table_styles["certificate_info"])
+    story.append(top_table)
+    story.append(Spacer(1, 3))
+
+    fab_data = [
+        ["FABRICATION", ""],
+        ["Assembly Number:", data.get("assembly_part_number", "N/A")],
+        ["Pump Model:", data.get("pump_model", "N/A")],
+        ["Serial Number:", serial_number],
+        ["Impeller Diameter:", data.get("impeller_diameter", "N/A")],
+        ["Assembled By:", data.get("assembled_by", "N/A")],
+    ]
+    fab_table = Table(fab_data, colWidths=[80, 170], style=table_styles["certificate_section"])
+
+    hydro_data = [
+        ["HYDRAULIC TEST", ""],
+        ["Date of Test:", data.get("date_of_test", "N/A")],
+        ["Duration of Test:", data.get("duration_of_test", "N/A")],
+        ["Test Medium:", data.get("test_medium", "N/A")],
+        ["Tested By:", data.get("tested_by", "N/A")],
+    ]
+    hydro_table = Table(hydro_data, colWidths=[80, 170], style=table_styles["certificate_section"])
+
+    side_by_side_table = Table([[fab_table, hydro_table]], colWidths=[250, 250], style=table_styles["certificate_columns"])
+    story.append(side_by_side_table)
+    story.append(Spacer(1, 3))
+
+    details_data = [
+        ["DETAILS", "", "", ""],
+        ["Motor Size:", data.get("motor_size", "N/A"), "Frequency:", data.get("frequency", "N/A")],
+        ["Motor Speed:", data.get("motor_speed", "N/A"), "Pump Housing:", data.get("pump_housing", "N/A")],
+        ["Motor Volts:", data.get("motor_volts", "N/A"), "Pump Connection:", data.get("pump_connection", "N/A")],
+        ["Motor Enclosure:", data.get("motor_enclosure", "N/A"), "Suction:", data.get("suction", "N/A")],
+        ["Mechanical Seal:", data.get("mechanical_seal", "N/A"), "Discharge:", data.get("discharge", "N/A")],
+        ["", "", "Flush Arrangement:", data.get("flush_arrangement", "N/A")],
+    ]
+    details_table = Table(details_data, colWidths=[125, 125, 125, 125], style=table_styles["certificate_banner"])
+    story.append(details_table)
+    story.append(Spacer(1, 3))
+
+    story.append(Paragraph("TEST RESULTS", subheading_style))
+    story.append(Spacer(1, 3))
+
+    test_results_data = [["Test", "Flowrate (L/h)", "Pressure (bar)", "Amperage (A)"]]
+    for i in range(5):
+        test_results_data.append([
+            f"Test {i+1}",
+            data["flowrate"][i] if i < len(data["flowrate"]) else "",
+            data["pressure"][i] if i < len(data["pressure"]) else "",
+            data["amperage"][i] if i < len(data["amperage"]) else ""
+        ])
+    test_results_table = Table(test_results_data, colWidths=[125, 125, 125, 125], style=table_styles["certificate_results"])
+    story.append(test_results_table)
+    story.append(Spacer(1, 3))
+
+    # Graph is rendered in memory and embedded straight from the buffer
+    graph = graph_flowable(plot_flow_curve, data, 6*inch, 3*inch)
+    if graph is not None:
+        graph_table = Table([[graph]], colWidths=[6*inch], style=table_styles["certificate_graph"])
+        story.append(graph_table)
+        story.append(Spacer(1, 3))
+    else:
+        logger.warning(f"No graph generated for certificate at {pdf_path}")
+
+    approval_data = [
+        ["APPROVAL", "", "", ""],
+        ["Approved By:", data.get("approved_by", "N/A"), "", ""],
+        ["Date:", data.get("approval_date", "N/A"), "", ""],
+    ]
+    approval_table = Table(approval_data, colWidths=[125, 125, 125, 125], style=table_styles["certificate_banner"])
+    story.append(approval_table)
+
+    try:
+        logger.debug(f"Building PDF at {pdf_path}")
+        doc.build(story)
+        logger.info(f"Certificate generated: {pdf_path}")
+        return pdf_path
+    except Exception as e:
+        logger.error(f"Failed to generate certificate: {str(e)}\n{traceback.format_exc()}")
+        raise
+
+
+if __name__ == "__main__":
+    import tempfile
+    demo = {"invoice_number": "INV-001", "customer": "Demo Customer", "job_number": "J-001", "pump_model": "P1 3.0KW",
+            "flowrate": ["1200", "900", "600", "300", "0"], "pressure": ["0.5", "1.2", "1.9", "2.4", "2.8"],
+            "amperage": ["3.1", "2.9", "2.6", "2.2", "1.9"], "approved_by": "demo", "approval_date": "2025-01-01"}
+    print(generate_certificate(demo, "DEMO 001", os.path.join(tempfile.gettempdir(), certificate_filename("DEMO 001"))))
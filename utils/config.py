@@ -1,6 +1,9 @@
+import copy
+import json
 import logging
 import os
 import sys
+import threading
 from datetime import datetime
 from logging.handlers import TimedRotatingFileHandler
 
@@ -10,9 +13,14 @@ if getattr(sys, 'frozen', False):
     CONFIG_DIR = os.path.join(os.getenv('APPDATA'), "GuthPumpRegistry")
     os.makedirs(CONFIG_DIR, exist_ok=True)
     LOG_DIR = os.path.join(CONFIG_DIR, "logs")
+    CONFIG_PATH = os.path.join(CONFIG_DIR, "config.json")
+    DEFAULT_CONFIG_PATH = os.path.join(BASE_DIR, "config.json")
 else:
     BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    CONFIG_DIR = BASE_DIR
     LOG_DIR = os.path.join(BASE_DIR, "logs")
+    CONFIG_PATH = os.path.join(BASE_DIR, "config.json")
+    DEFAULT_CONFIG_PATH = CONFIG_PATH
 
 os.makedirs(LOG_DIR, exist_ok=True)
 
@@ -64,6 +72,175 @@ def get_logger(name):
     logger.setLevel(logging.DEBUG)  # Default level, can be overridden
     return logger
 
+# Default directories (relative to BASE_DIR for default, but will be overridden by config)
+DEFAULT_DIRS = {
+    "certificate": os.path.join(BASE_DIR, "certificates"),
+    "bom": os.path.join(BASE_DIR, "boms"),
+    "confirmation": os.path.join(BASE_DIR, "confirmations"),
+    "reports": os.path.join(BASE_DIR, "reports"),
+    "excel_exports": os.path.join(BASE_DIR, "exports")
+}
+
+# Default email settings (Gmail)
+DEFAULT_EMAIL_SETTINGS = {
+    "smtp_host": "smtp.gmail.com",
+    "smtp_port": "587",
+    "smtp_username": "",
+    "smtp_password": "",
+    "sender_email": "",
+    "use_tls": True,
+    "digest_window_minutes": "0"  # Minutes to collect per-recipient digests for; 0 sends every notification at once
+}
+
+class ConfigService:
+    """In-memory config.json that is only re-read when the file's mtime or size changes."""
+
+    def __init__(self, path=CONFIG_PATH, default_path=DEFAULT_CONFIG_PATH):
+        self.path = path
+        self.default_path = default_path
+        self._lock = threading.RLock()
+        self._config = None
+        self._source = None
+        self._signature = None
+        self._create_failed = False
+        self.reloads = 0
+
+    @staticmethod
+    def _stat(path):
+        try:
+            st = os.stat(path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def _read(self, path):
+        logger = get_logger("config")
+        try:
+            with open(path, "r") as f:
+                config = json.load(f)
+            logger.info(f"Loaded config from {path}")
+            return config
+        except Exception as e:
+            logger.error(f"Failed to load config from {path}: {str(e)}")
+            return {}
+
+    @staticmethod
+    def _apply_defaults(config):
+        config.setdefault("connection_string", None)
+        config.setdefault("document_dirs", DEFAULT_DIRS.copy())
+        config.setdefault("email_settings", DEFAULT_EMAIL_SETTINGS.copy())
+        for key, default in DEFAULT_DIRS.items():
+            config["document_dirs"].setdefault(key, default)
+        for key, default in DEFAULT_EMAIL_SETTINGS.items():
+            config["email_settings"].setdefault(key, default)
+        return config
+
+    def _current(self):
+        """Return the cached config, re-reading the file only if it changed on disk."""
+        with self._lock:
+            signature = self._stat(self.path)
+            source = self.path
+            if signature is None:
+                # Fall back to the bundled default config until the user config exists
+                signature = self._stat(self.default_path)
+                source = self.default_path
+            if self._config is not None and (source, signature) == (self._source, self._signature):
+                return self._config
+
+            if signature is None:
+                get_logger("config").warning(f"No config found at {self.path} or {self.default_path}, using defaults")
+                config = {}
+            else:
+                config = self._read(source)
+            self._config = self._apply_defaults(config)
+            self._source, self._signature = source, signature
+            self.reloads += 1
+
+            # If user config didn't exist, create it with defaults
+            if (source != self.path or signature is None) and not self._create_failed:
+                try:
+                    self._write(self._config)
+                    get_logger("config").info(f"Created default config file at {self.path}")
+                except Exception as e:
+                    self._create_failed = True
+                    get_logger("config").error(f"Failed to create default config at {self.path}: {str(e)}")
+            return self._config
+
+    def _write(self, config):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(config, f, indent=4)
+        os.replace(tmp_path, self.path)
+        self._config = self._apply_defaults(copy.deepcopy(config))
+        self._source, self._signature = self.path, self._stat(self.path)
+
+    def load_config(self):
+        """Return a private copy of the config that callers may modify."""
+        with self._lock:
+            return copy.deepcopy(self._current())
+
+    def save_config(self, config):
+        """Save configuration to config.json in a writable location."""
+        with self._lock:
+            try:
+                self._write(config)
+                get_logger("config").info(f"Saved config to {self.path}")
+            except Exception as e:
+                get_logger("config").error(f"Failed to save config to {self.path}: {str(e)}")
+                raise
+
+    def get(self, key, default=None):
+        """Return a top-level config value (copied if mutable)."""
+        with self._lock:
+            return copy.deepcopy(self._current().get(key, default))
+
+    def get_connection_string(self):
+        with self._lock:
+            return self._current().get("connection_string")
+
+    def get_document_dir(self, doc_type, default=None):
+        with self._lock:
+            path = self._current()["document_dirs"].get(doc_type)
+        return path or default or DEFAULT_DIRS.get(doc_type)
+
+    def get_document_dirs(self):
+        with self._lock:
+            return dict(self._current()["document_dirs"])
+
+    def get_email_settings(self):
+        with self._lock:
+            return dict(self._current()["email_settings"])
+
+    def get_bom_path(self):
+        with self._lock:
+            return self._current().get("bom_path") or os.path.join(BASE_DIR, "assets", "bom.json")
+
+_config_service = ConfigService()
+
+def get_config_service():
+    """Return the process-wide config service."""
+    return _config_service
+
+def load_config():
+    """Load configuration from config.json (cached; re-read only when the file changes)."""
+    return _config_service.load_config()
+
+def save_config(config):
+    """Save configuration to config.json and refresh the cached copy."""
+    _config_service.save_config(config)
+
+def get_connection_string():
+    """Return the configured database connection string, or None."""
+    return _config_service.get_connection_string()
+
+def get_document_dir(doc_type, default=None):
+    """Return the configured output directory for a document type."""
+    return _config_service.get_document_dir(doc_type, default)
+
+def get_email_settings():
+    """Return a copy of the SMTP settings."""
+    return _config_service.get_email_settings()
+
 if __name__ == "__main__":
     logger = get_logger("test_config")
     logger.debug("This is a debug message")
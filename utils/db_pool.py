@@ -0,0 +1,299 @@
+import threading
+import time
+from collections import deque
+from utils.config import get_logger
+
+logger = get_logger("db_pool")
+
+# SQLSTATE class '08' covers connection exceptions (link failure, server went away, etc.)
+BROKEN_CONNECTION_STATES = ("08",)
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no pooled connection becomes available within the checkout timeout."""
+
+
+class PooledConnection:
+    """Proxy around a DB-API connection checked out from a ConnectionPool.
+
+    Behaves like the underlying pyodbc connection, except that close() and the
+    end of a `with` block hand the connection back to the pool instead of
+    dropping it. The end of a nested `with` block on the same thread neither
+    commits nor rolls back: the transaction belongs to the outermost block.
+    """
+
+    def __init__(self, pool, holder):
+        object.__setattr__(self, "_pool", pool)
+        object.__setattr__(self, "_holder", holder)
+        object.__setattr__(self, "_conn", holder.conn)
+        object.__setattr__(self, "_released", False)
+
+    def __getattr__(self, name):
+        if self._released:
+            raise RuntimeError("Connection has already been returned to the pool")
+        return getattr(self._conn, name)
+
+    def __setattr__(self, name, value):
+        if self._released:
+            raise RuntimeError("Connection has already been returned to the pool")
+        setattr(self._conn, name, value)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # Same semantics as pyodbc's own context manager: commit on success, rollback on error.
+        # Only the outermost checkout on a thread ends the transaction; a nested block shares it.
+        try:
+            if not self._released and self._holder.depth == 1:
+                if exc_type is None:
+                    if not self._conn.autocommit:
+                        self._conn.commit()
+                else:
+                    self._pool._rollback_quietly(self._conn)
+        finally:
+            self.close(error=exc_value)
+        return False
+
+    def close(self, error=None):
+        """Return the connection to the pool."""
+        if self._released:
+            return
+        object.__setattr__(self, "_released", True)
+        self._pool._release(self._holder, error)
+
+
+class _PoolEntry:
+    """Book-keeping for an idle connection."""
+
+    __slots__ = ("conn", "last_used", "last_checked")
+
+    def __init__(self, conn):
+        now = time.monotonic()
+        self.conn = conn
+        self.last_used = now
+        self.last_checked = now  # A clean release proves the connection was alive
+
+
+class _Checkout:
+    """A connection held by one thread, shared by nested checkouts on that thread."""
+
+    __slots__ = ("conn", "depth")
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.depth = 1
+
+
+class ConnectionPool:
+    """Bounded, thread-aware pool of database connections.
+
+    Each thread gets its own connection; nested checkouts on the same thread
+    re-use it, so a `with get_db_connection()` inside another one does not
+    tie up a second connection. Idle connections are health-checked before
+    reuse, reaped after `idle_timeout` seconds, and re-opened if broken.
+    """
+
+    def __init__(self, connect, max_size=5, idle_timeout=300, checkout_timeout=30,
+                 health_check_interval=30, health_check_query="SELECT 1"):
+        self._connect = connect
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self.health_check_interval = health_check_interval
+        self.health_check_query = health_check_query
+        self._idle = deque()
+        self._in_use = 0
+        self._closed = False
+        self._cond = threading.Condition(threading.Lock())
+        self._local = threading.local()
+        self._stats = {
+            "checkouts": 0,
+            "reentrant_checkouts": 0,
+            "handshakes": 0,
+            "handshakes_saved": 0,
+            "health_check_failures": 0,
+            "discarded": 0,
+            "reaped": 0,
+            "waits": 0,
+            "total_wait_seconds": 0.0,
+            "max_wait_seconds": 0.0,
+        }
+
+    def connection(self):
+        """Check out a connection for the current thread."""
+        holder = getattr(self._local, "holder", None)
+        if holder is not None and holder.depth > 0:
+            holder.depth += 1
+            with self._cond:
+                self._stats["reentrant_checkouts"] += 1
+            return PooledConnection(self, holder)
+
+        holder = _Checkout(self._acquire())
+        self._local.holder = holder
+        return PooledConnection(self, holder)
+
+    def _acquire(self):
+        start = time.monotonic()
+        deadline = start + self.checkout_timeout
+        waited = False
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed")
+                self._reap_idle_locked()
+                if self._idle:
+                    entry = self._idle.pop()  # Most recently used first; keeps the idle tail cold for reaping
+                    self._in_use += 1
+                    break
+                if self._in_use < self.max_size:
+                    entry = None
+                    self._in_use += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._record_wait_locked(time.monotonic() - start, waited)
+                    raise PoolTimeoutError(
+                        f"No database connection available after {self.checkout_timeout}s "
+                        f"({self.max_size} in use)")
+                waited = True
+                self._cond.wait(remaining)
+            self._stats["checkouts"] += 1
+            self._record_wait_locked(time.monotonic() - start, waited)
+
+        # Handshakes and health checks happen outside the lock so other threads are not blocked
+        try:
+            if entry is not None:
+                if self._is_healthy(entry):
+                    entry.last_used = time.monotonic()
+                    with self._cond:
+                        self._stats["handshakes_saved"] += 1
+                    return entry.conn
+                self._close_quietly(entry.conn)
+                with self._cond:
+                    self._stats["health_check_failures"] += 1
+                    self._stats["discarded"] += 1
+                logger.warning("Pooled connection failed health check, reconnecting")
+            return self._open()
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+    def _open(self):
+        conn = self._connect()
+        with self._cond:
+            self._stats["handshakes"] += 1
+        logger.debug("Opened new pooled database connection")
+        return conn
+
+    def _is_healthy(self, entry):
+        if time.monotonic() - entry.last_checked < self.health_check_interval:
+            return True
+        try:
+            cursor = entry.conn.cursor()
+            cursor.execute(self.health_check_query)
+            cursor.fetchall()
+            cursor.close()
+            entry.last_checked = time.monotonic()
+            return True
+        except Exception as e:
+            logger.debug(f"Health check failed: {str(e)}")
+            return False
+
+    def _release(self, holder, error=None):
+        holder.depth -= 1
+        if holder.depth > 0:
+            return
+        # When released from a different thread, the owner's stale holder is skipped by its depth of 0
+        if getattr(self._local, "holder", None) is holder:
+            self._local.holder = None
+        conn = holder.conn
+
+        keep = not self._closed and not self._is_broken(error)
+        if keep:
+            # Leave no open transaction or autocommit tweak behind for the next borrower
+            try:
+                if conn.autocommit:
+                    conn.autocommit = False
+                else:
+                    conn.rollback()
+            except Exception as e:
+                logger.warning(f"Discarding connection that could not be reset: {str(e)}")
+                keep = False
+
+        with self._cond:
+            self._in_use -= 1
+            if keep and not self._closed:
+                self._idle.append(_PoolEntry(conn))
+            else:
+                self._stats["discarded"] += 1
+            self._cond.notify()
+        if not keep:
+            self._close_quietly(conn)
+
+    def _reap_idle_locked(self):
+        if not self.idle_timeout:
+            return
+        cutoff = time.monotonic() - self.idle_timeout
+        while self._idle and self._idle[0].last_used < cutoff:
+            entry = self._idle.popleft()
+            self._close_quietly(entry.conn)
+            self._stats["reaped"] += 1
+
+    def _record_wait_locked(self, wait, waited):
+        self._stats["total_wait_seconds"] += wait
+        if wait > self._stats["max_wait_seconds"]:
+            self._stats["max_wait_seconds"] = wait
+        if waited:
+            self._stats["waits"] += 1
+
+    @staticmethod
+    def _is_broken(error):
+        if error is None:
+            return False
+        state = error.args[0] if getattr(error, "args", None) else ""
+        return isinstance(state, str) and state.startswith(BROKEN_CONNECTION_STATES)
+
+    @staticmethod
+    def _rollback_quietly(conn):
+        try:
+            conn.rollback()
+        except Exception as e:
+            logger.debug(f"Rollback failed: {str(e)}")
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception as e:
+            logger.debug(f"Error closing pooled connection: {str(e)}")
+
+    def grow(self, count):
+        """Allow count more connections at once, e.g. for a new pool of worker threads."""
+        with self._cond:
+            self.max_size += count
+            self._cond.notify_all()
+
+    def stats(self):
+        """Return a snapshot of the pool counters."""
+        with self._cond:
+            snapshot = dict(self._stats)
+            snapshot["idle"] = len(self._idle)
+            snapshot["in_use"] = self._in_use
+            snapshot["max_size"] = self.max_size
+        checkouts = snapshot["checkouts"]
+        snapshot["avg_wait_seconds"] = snapshot["total_wait_seconds"] / checkouts if checkouts else 0.0
+        return snapshot
+
+    def close(self):
+        """Close all idle connections; checked-out ones are closed as they come back."""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._cond.notify_all()
+        for entry in idle:
+            self._close_quietly(entry.conn)
+        logger.info(f"Connection pool closed: {self.stats()}")
@@ -0,0 +1,176 @@
+import importlib
+import os
+import threading
+from collections import namedtuple
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from utils.config import get_logger
+
+logger = get_logger("doc_pipeline")
+
+# Leave a core for the Tk thread and the database; one pump's documents rarely need more than three workers
+PIPELINE_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+
+# Renderer name -> "module:function"; each returns the path of the PDF it wrote
+RENDERERS = {
+    "notification": "export_utils:generate_pdf_notification",
+    "bom_checklist": "export_utils:generate_bom_checklist",
+    "certificate": "utils.certificate:generate_certificate",
+}
+
+RenderJob = namedtuple("RenderJob", ["renderer", "args", "kwargs"])
+
+
+def render_job(renderer, *args, **kwargs):
+    """Describe a call to RENDERERS[renderer](*args, **kwargs) for the pipeline."""
+    if renderer not in RENDERERS:
+        raise ValueError(f"Unknown renderer: {renderer}")
+    return RenderJob(renderer, args, kwargs)
+
+
+def _renderer(name):
+    module_name, function_name = RENDERERS[name].split(":")
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def _warm_up():
+    """Worker initializer: import every renderer and load the shared fonts, styles and logos before the first job."""
+    try:
+        from utils.pdf_resources import get_pdf_styles, get_table_styles, image_size
+        import export_utils
+        import utils.certificate
+        for name in RENDERERS:
+            _renderer(name)
+        get_pdf_styles()
+        get_table_styles()
+        image_size(export_utils.LOGO_PATH)
+        image_size(utils.certificate.PDF_LOGO_PATH)
+    except Exception as e:
+        # The job that needs the missing piece reports the error itself
+        logger.error(f"Document worker warm-up failed: {str(e)}")
+
+
+def _ping():
+    return os.getpid()
+
+
+def _run(job):
+    return _renderer(job.renderer)(*job.args, **job.kwargs)
+
+
+class DocumentPipeline:
+    """Render PDFs in worker processes so ReportLab and matplotlib never block the Tk thread.
+
+    Jobs are RenderJobs naming one of RENDERERS, and everything in them must
+    be picklable (plain dicts, lists and strings). Workers import ReportLab,
+    matplotlib, the fonts and the logos once when they start, so a job only
+    pays for its own layout. GUI code hands the futures to
+    BackgroundRunner.watch to get its callbacks on the Tk thread. The pool
+    starts on first use and is replaced if a worker dies.
+    """
+
+    def __init__(self, max_workers=PIPELINE_WORKERS):
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_warm_up)
+                logger.info(f"Document pipeline started with {self.max_workers} workers")
+            return self._executor
+
+    def _reset(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+
+    def start(self):
+        """Start the workers now (they warm up in the background) instead of on the first job."""
+        executor = self._get_executor()
+        for _ in range(self.max_workers):
+            executor.submit(_ping)
+        return self
+
+    def submit(self, job):
+        """Queue one RenderJob; returns a Future of the written PDF's path."""
+        executor = self._get_executor()
+        try:
+            return executor.submit(_run, job)
+        except BrokenProcessPool:
+            logger.warning("Document pipeline workers died; starting new ones")
+            self._reset(executor)
+            return self._get_executor().submit(_run, job)
+
+    def render(self, jobs):
+        """Queue several jobs to build in parallel; returns their futures in the same order."""
+        return [self.submit(job) for job in jobs]
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+def gather(futures):
+    """Return a Future of the list of results of futures, failing with the first error once all have finished."""
+    futures = list(futures)
+    combined = Future()
+    remaining = [len(futures)]
+    lock = threading.Lock()
+
+    def finished(_):
+        with lock:
+            remaining[0] -= 1
+            if remaining[0]:
+                return
+        errors = [f.exception() for f in futures if not f.cancelled() and f.exception() is not None]
+        if any(f.cancelled() for f in futures):
+            combined.cancel()
+        elif errors:
+            combined.set_exception(errors[0])
+        else:
+            combined.set_result([f.result() for f in futures])
+
+    if not futures:
+        combined.set_result([])
+    for future in futures:
+        future.add_done_callback(finished)
+    return combined
+
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def get_document_pipeline():
+    """Return the pipeline shared by the whole application."""
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                _pipeline = DocumentPipeline()
+    return _pipeline
+
+
+def render_documents(jobs):
+    """Build jobs on the shared pipeline; returns a Future of their output paths, in order."""
+    return gather(get_document_pipeline().render(jobs))
+
+
+if __name__ == "__main__":
+    import tempfile
+    import time
+    demo = {"customer": "Demo Customer", "pump_model": "P1 3.0KW", "flowrate": ["1200", "900", "600", "300", "0"],
+            "pressure": ["0.5", "1.2", "1.9", "2.4", "2.8"], "amperage": ["3.1", "2.9", "2.6", "2.2", "1.9"]}
+    demo_jobs = [render_job("notification", f"DEMO {i:03d}", demo, output_path=os.path.join(tempfile.gettempdir(), f"demo_{i}.pdf"))
+                 for i in range(12)]
+    pipeline = get_document_pipeline().start()
+    start = time.perf_counter()
+    for path in render_documents(demo_jobs).result():
+        os.remove(path)
+    print(f"Built {len(demo_jobs)} documents on {pipeline.max_workers} workers in {time.perf_counter() - start:.2f}s")
+    pipeline.shutdown()
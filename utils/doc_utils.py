@@ -1,66 +1,27 @@
 import os
 import sys
 from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib import colors
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table
 import smtplib
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.application import MIMEApplication
-from utils.config import get_logger
+from utils.config import get_logger, get_email_settings, get_document_dir
+from utils.pdf_resources import get_pdf_styles, get_table_styles, image_flowable
 import time
 from datetime import datetime
-import json
 
 logger = get_logger("doc_utils")
 
 # Determine the base directory for bundled resources
 if getattr(sys, 'frozen', False):
     BASE_DIR = sys._MEIPASS
-    CONFIG_DIR = os.path.join(os.getenv('APPDATA'), "GuthPumpRegistry")
-    os.makedirs(CONFIG_DIR, exist_ok=True)
-    CONFIG_PATH = os.path.join(CONFIG_DIR, "config.json")
-    DEFAULT_CONFIG_PATH = os.path.join(BASE_DIR, "config.json")
 else:
     BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    CONFIG_PATH = os.path.join(BASE_DIR, "config.json")
-    DEFAULT_CONFIG_PATH = CONFIG_PATH
 
 LOGO_PATH = os.path.join(BASE_DIR, "assets", "logo.png")
 BUILD_NUMBER = "1.0.0"
 
-def load_config():
-    """Load configuration from config.json, falling back to defaults if missing."""
-    if os.path.exists(CONFIG_PATH):
-        try:
-            with open(CONFIG_PATH, "r") as f:
-                config = json.load(f)
-            logger.debug(f"Loaded config from {CONFIG_PATH}")
-            return config
-        except Exception as e:
-            logger.error(f"Failed to load config from {CONFIG_PATH}: {str(e)}")
-    if os.path.exists(DEFAULT_CONFIG_PATH):
-        try:
-            with open(DEFAULT_CONFIG_PATH, "r") as f:
-                config = json.load(f)
-            logger.debug(f"Loaded default config from {DEFAULT_CONFIG_PATH}")
-            return config
-        except Exception as e:
-            logger.error(f"Failed to load default config from {DEFAULT_CONFIG_PATH}: {str(e)}")
-    logger.warning(f"No config found at {CONFIG_PATH} or {DEFAULT_CONFIG_PATH}, using defaults")
-    return {
-        "document_dirs": {"notifications": os.path.join(BASE_DIR, "data")},
-        "email_settings": {
-            "smtp_host": "smtp.gmail.com",
-            "smtp_port": "587",
-            "smtp_username": "",
-            "smtp_password": "",
-            "sender_email": "",
-            "use_tls": True
-        }
-    }
-
 def generate_html_email(subject, greeting, body_content, footer=""):
     """Generate a styled HTML email template."""
     return f"""
@@ -159,54 +120,40 @@ def generate_test_data_table(test_data):
 
 def generate_pdf_notification(serial_number, data, title="Pump Assembly Notification", output_path=None):
     """Generate a PDF notification document."""
-    config = load_config()
     if output_path is None:
-        output_dir = config.get("document_dirs", {}).get("notifications", os.path.join(BASE_DIR, "data"))
+        output_dir = get_document_dir("notifications", os.path.join(BASE_DIR, "data"))
         os.makedirs(output_dir, exist_ok=True)
         output_path = os.path.join(output_dir, f"notification_{serial_number}.pdf")
     
     doc = SimpleDocTemplate(output_path, pagesize=A4, rightMargin=36, leftMargin=36, topMargin=36, bottomMargin=36)
-    styles = getSampleStyleSheet()
+    styles = get_pdf_styles()
+    table_styles = get_table_styles()
     story = []
 
-    if os.path.exists(LOGO_PATH):
-        try:
-            logo = Image(LOGO_PATH, width=120, height=60)
-            logo.hAlign = 'RIGHT'
-            story.append(logo)
-            story.append(Spacer(1, 12))
-        except Exception as e:
-            logger.error(f"Failed to add logo to PDF: {str(e)}")
+    logo = image_flowable(LOGO_PATH, 120, 60, "RIGHT")
+    if logo is not None:
+        story.append(logo)
+        story.append(Spacer(1, 12))
 
-    story.append(Paragraph(title, styles['Heading1']))
+    story.append(Paragraph(title, styles['heading1']))
     story.append(Spacer(1, 12))
 
     table_data = [[key.replace('_', ' ').title(), str(value)] for key, value in data.items() if value and key != "bom_items"]
     if "bom_items" in data and data["bom_items"]:
-        story.append(Paragraph("Bill of Materials", styles['Heading2']))
+        story.append(Paragraph("Bill of Materials", styles['heading2']))
         story.append(Spacer(1, 6))
         bom_data = [["Part Name", "Part Code", "Quantity"]] + [[item["part_name"], item["part_code"], item["quantity"]] for item in data["bom_items"]]
-        bom_table = Table(bom_data, colWidths=[150, 150, 50], style=[
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-            ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-        ])
+        bom_table = Table(bom_data, colWidths=[150, 150, 50], style=table_styles['summary_list'])
         story.append(bom_table)
         story.append(Spacer(1, 12))
     else:
         table_data.append(["Bill of Materials", "Not included"])
 
-    table = Table(table_data, colWidths=[150, 350], style=[
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
-    ])
+    table = Table(table_data, colWidths=[150, 350], style=table_styles['summary_fields'])
     story.append(table)
     story.append(Spacer(1, 12))
 
-    story.append(Paragraph(f"© Guth South Africa | Build {BUILD_NUMBER}", styles['Normal']))
+    story.append(Paragraph(f"© Guth South Africa | Build {BUILD_NUMBER}", styles['normal']))
     try:
         doc.build(story)
         logger.info(f"PDF notification generated: {output_path}")
@@ -217,8 +164,7 @@ def generate_pdf_notification(serial_number, data, title="Pump Assembly Notifica
 
 def send_email(to_email, subject, greeting, body_content, footer="", *attachment_paths, smtp_retries=3):
     """Send an email with multiple optional attachments."""
-    config = load_config()
-    email_settings = config.get("email_settings", {})
+    email_settings = get_email_settings()
     smtp_server = email_settings.get("smtp_host", "smtp.gmail.com")
     smtp_port = int(email_settings.get("smtp_port", 587))
     smtp_user = email_settings.get("smtp_username", "")
@@ -0,0 +1,542 @@
+import json
+import os
+import smtplib
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing
+from utils.config import get_logger, get_email_settings, CONFIG_DIR
+from export_utils import build_email_message, open_smtp_session, generate_digest_table
+
+logger = get_logger("email_outbox")
+
+# Next to config.json, so queued mail survives restarts and belongs to the same user profile
+OUTBOX_PATH = os.path.join(CONFIG_DIR, "email_outbox.db")
+SEND_BATCH_SIZE = 50
+MAX_ATTEMPTS = 8
+RETRY_BASE_SECONDS = 30  # Backoff after the first failure; doubles per attempt
+RETRY_MAX_SECONDS = 3600
+SESSION_IDLE_SECONDS = 60  # An idle SMTP session is kept this long for the next message before it is closed
+SENT_RETENTION_DAYS = 30
+HEARTBEAT_SECONDS = 60  # How often a running sender records that it (and the mail it holds) is alive
+OWNER_STALE_SECONDS = 300  # Mail held by an instance silent this long is released: its documents will never arrive
+DEFAULT_DIGEST_WINDOW_MINUTES = 0  # Digests are off unless email_settings["digest_window_minutes"] is set
+
+STATUS_PENDING = "pending"
+STATUS_SENT = "sent"
+STATUS_FAILED = "failed"
+
+
+class SmtpUnavailable(Exception):
+    """Raised when no SMTP session can be opened: the server is unreachable, refuses the login or is not configured."""
+
+
+def retry_delay(attempts):
+    """Seconds to wait before retrying a message that has failed `attempts` times."""
+    return min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+
+
+def digest_window_seconds(email_settings=None):
+    """The configured digest window in seconds (0 when digests are off)."""
+    email_settings = email_settings or get_email_settings()
+    try:
+        minutes = float(email_settings.get("digest_window_minutes") or DEFAULT_DIGEST_WINDOW_MINUTES)
+    except (TypeError, ValueError):
+        minutes = DEFAULT_DIGEST_WINDOW_MINUTES
+    return max(0.0, minutes * 60)
+
+
+def is_permanent_error(error):
+    """True if retrying cannot help: the server rejected the recipient, sender or message outright."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return True
+    return isinstance(error, smtplib.SMTPResponseException) and 500 <= error.smtp_code < 600
+
+
+class EmailOutbox:
+    """Durable queue of notification emails in a local SQLite file.
+
+    Messages are stored as the parts send_email takes (not rendered MIME), so
+    they can be rebuilt with the current sender settings when they are sent.
+    Digest messages also carry the pump details they are about; they are held
+    until their recipient's digest window closes and then sent together. A
+    message queued with held=True is stored but not sent until release(), so a
+    notification can be made durable before its attachments have been built.
+    Held messages belong to the outbox instance (owner) that queued them; other
+    application instances sharing the file release them only once that owner
+    has stopped sending heartbeats. Senders claim messages before sending them,
+    so instances sharing the file never send the same message twice; the
+    claims of an owner that stops are dropped with its holds.
+    Each method opens its own short-lived connection, so the outbox can be
+    used from the Tk thread and the sender thread at once.
+    """
+
+    def __init__(self, path=OUTBOX_PATH):
+        self.path = path
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    to_email TEXT NOT NULL,
+                    subject TEXT NOT NULL,
+                    greeting TEXT NOT NULL DEFAULT '',
+                    body_content TEXT NOT NULL DEFAULT '',
+                    footer TEXT NOT NULL DEFAULT '',
+                    attachments TEXT NOT NULL DEFAULT '[]',
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at REAL NOT NULL,
+                    last_error TEXT,
+                    created_at REAL NOT NULL,
+                    sent_at REAL,
+                    digest_details TEXT,
+                    held INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            # Outboxes created before digests existed
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(outbox)")]
+            if "digest_details" not in columns:
+                conn.execute("ALTER TABLE outbox ADD COLUMN digest_details TEXT")
+            if "held" not in columns:
+                conn.execute("ALTER TABLE outbox ADD COLUMN held INTEGER NOT NULL DEFAULT 0")
+            if "owner" not in columns:
+                conn.execute("ALTER TABLE outbox ADD COLUMN owner TEXT")
+            if "claimed_by" not in columns:
+                conn.execute("ALTER TABLE outbox ADD COLUMN claimed_by TEXT")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS outbox_owners (
+                    owner TEXT PRIMARY KEY,
+                    heartbeat_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_status_due ON outbox (status, next_attempt_at)")
+
+    def _connect(self):
+        return closing(sqlite3.connect(self.path, timeout=30, isolation_level=None))
+
+    def enqueue(self, to_email, subject, greeting, body_content, footer="", attachment_paths=(),
+                digest_details=None, digest_window=0, held=False):
+        """Queue a message for sending; returns its id.
+
+        With digest_details (the pump details the message is about) and a
+        digest_window in seconds, the message joins the recipient's open digest,
+        or opens one that is sent digest_window seconds from now. A held message
+        is not sent before release() is called for it, or this outbox's owner
+        stops sending heartbeats.
+        """
+        now = time.time()
+        send_at = now
+        digest = digest_details is not None and digest_window > 0
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            if held:
+                self._heartbeat(conn, now)
+            if digest:
+                open_digest = conn.execute("""
+                    SELECT MIN(next_attempt_at) FROM outbox
+                    WHERE status = ? AND to_email = ? AND digest_details IS NOT NULL AND attempts = 0
+                """, (STATUS_PENDING, to_email)).fetchone()[0]
+                send_at = open_digest if open_digest is not None and open_digest > now else now + digest_window
+            cursor = conn.execute("""
+                INSERT INTO outbox (to_email, subject, greeting, body_content, footer, attachments, next_attempt_at, created_at,
+                                    digest_details, held, owner)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (to_email, subject, greeting, body_content, footer, json.dumps(list(attachment_paths)), send_at, now,
+                  json.dumps(digest_details, default=str) if digest else None, int(held), self.owner if held else None))
+            message_id = cursor.lastrowid
+            conn.execute("COMMIT")
+        logger.info(f"Queued email {message_id} to {to_email} with subject '{subject}'"
+                    + (f", in the digest sent in {send_at - now:.0f}s" if digest else "")
+                    + (", held for its attachments" if held else ""))
+        return message_id
+
+    def claim_due(self, now=None, limit=SEND_BATCH_SIZE):
+        """Claim up to limit pending, unheld, unclaimed messages whose next attempt is due; returns them oldest first, as dicts.
+
+        Claimed messages are left to this owner until mark_sent,
+        mark_failed_attempt or defer, or until it stops sending heartbeats.
+        """
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute("""
+                SELECT * FROM outbox WHERE status = ? AND held = 0 AND claimed_by IS NULL AND next_attempt_at <= ?
+                ORDER BY next_attempt_at, id LIMIT ?
+            """, (STATUS_PENDING, now if now is not None else time.time(), limit)).fetchall()
+            conn.executemany("UPDATE outbox SET claimed_by = ? WHERE id = ?", [(self.owner, row["id"]) for row in rows])
+            conn.execute("COMMIT")
+        messages = []
+        for row in rows:
+            message = dict(row)
+            message["attachments"] = json.loads(message["attachments"])
+            if message["digest_details"] is not None:
+                message["digest_details"] = json.loads(message["digest_details"])
+            messages.append(message)
+        return messages
+
+    def next_due_at(self):
+        """Time of the earliest pending attempt, or None if nothing is pending."""
+        with self._connect() as conn:
+            return conn.execute("SELECT MIN(next_attempt_at) FROM outbox WHERE status = ? AND held = 0 AND claimed_by IS NULL",
+                                (STATUS_PENDING,)).fetchone()[0]
+
+    def release(self, message_ids):
+        """Let held messages be sent; returns how many were released."""
+        with self._connect() as conn:
+            return sum(conn.execute("UPDATE outbox SET held = 0 WHERE id = ? AND held = 1", (message_id,)).rowcount
+                       for message_id in message_ids)
+
+    def _heartbeat(self, conn, now):
+        conn.execute("INSERT OR REPLACE INTO outbox_owners (owner, heartbeat_at) VALUES (?, ?)", (self.owner, now))
+
+    def heartbeat(self):
+        """Record that this outbox's owner is alive, so other instances leave the mail it holds alone."""
+        with self._connect() as conn:
+            self._heartbeat(conn, time.time())
+
+    def retire(self):
+        """Forget this owner's heartbeat, so mail it still holds is released without waiting for it to go stale."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM outbox_owners WHERE owner = ?", (self.owner,))
+
+    def release_stale(self, stale_after=OWNER_STALE_SECONDS):
+        """Release held and claimed mail whose owner has stopped sending heartbeats; returns how many holds were released.
+
+        Held mail was waiting for documents an instance that has exited was
+        building, so they will not arrive; it is sent with whichever
+        attachments exist. Claimed mail may or may not have been sent before
+        the claimant stopped, and is sent again (delivery is at-least-once).
+        """
+        cutoff = time.time() - stale_after
+        live = "SELECT owner FROM outbox_owners WHERE heartbeat_at >= ?"
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            released = conn.execute(f"""
+                UPDATE outbox SET held = 0
+                WHERE held = 1 AND (owner IS NULL OR owner NOT IN ({live}))
+            """, (cutoff,)).rowcount
+            conn.execute(f"UPDATE outbox SET claimed_by = NULL WHERE claimed_by IS NOT NULL AND claimed_by NOT IN ({live})",
+                         (cutoff,))
+            conn.execute("DELETE FROM outbox_owners WHERE heartbeat_at < ?", (cutoff,))
+            conn.execute("COMMIT")
+        return released
+
+    def mark_sent(self, message_ids):
+        with self._connect() as conn:
+            now = time.time()
+            conn.executemany("UPDATE outbox SET status = ?, sent_at = ?, last_error = NULL, claimed_by = NULL WHERE id = ?",
+                             [(STATUS_SENT, now, message_id) for message_id in message_ids])
+
+    def mark_failed_attempt(self, message_ids, error, permanent=False):
+        """Record a failed attempt of messages sent together, rescheduling them with backoff or giving up.
+
+        Returns the new status of the first message. Messages sent together are
+        rescheduled together, so a digest is retried as one.
+        """
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            placeholders = ", ".join("?" * len(message_ids))
+            attempts = conn.execute(f"SELECT MAX(attempts) FROM outbox WHERE id IN ({placeholders})",
+                                    list(message_ids)).fetchone()[0] + 1
+            status = STATUS_FAILED if permanent or attempts >= MAX_ATTEMPTS else STATUS_PENDING
+            conn.execute(f"""
+                UPDATE outbox SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?, claimed_by = NULL
+                WHERE id IN ({placeholders})
+            """,
+                         [status, attempts, time.time() + retry_delay(attempts), str(error)[:1000], *message_ids])
+            conn.execute("COMMIT")
+        return status
+
+    def defer(self, message_ids, error=None):
+        """Hand claimed messages back without counting an attempt, noting error if the server, not the message, failed.
+
+        They stay due, so they are retried first once the worker's own backoff ends.
+        """
+        with self._connect() as conn:
+            conn.executemany("UPDATE outbox SET last_error = COALESCE(?, last_error), claimed_by = NULL WHERE id = ?",
+                             [(str(error)[:1000] if error is not None else None, message_id) for message_id in message_ids])
+
+    def counts(self):
+        """Return {status: number of messages}."""
+        with self._connect() as conn:
+            return dict(conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+
+    def purge_sent(self, days=SENT_RETENTION_DAYS):
+        """Delete messages sent more than `days` ago; returns how many were removed."""
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM outbox WHERE status = ? AND sent_at < ?",
+                                (STATUS_SENT, time.time() - days * 86400)).rowcount
+
+
+class SmtpSession:
+    """One SMTP connection reused for consecutive messages, opened on first use."""
+
+    def __init__(self, settings_provider=get_email_settings):
+        self.settings_provider = settings_provider
+        self.server = None
+        self.sender_email = None
+        self.last_used = 0.0
+        self.connects = 0
+
+    def _open(self):
+        try:
+            self.server, self.sender_email = open_smtp_session(self.settings_provider())
+        except Exception as e:
+            self.server = None
+            raise SmtpUnavailable(str(e)) from e
+        self.connects += 1
+
+    def send(self, build_message):
+        """Send the message returned by build_message(sender_email), reconnecting once if the server dropped us.
+
+        Raises SmtpUnavailable if no session can be opened; any other error is
+        about this message (building it, or the server's reply to it).
+        """
+        for attempt in (1, 2):
+            reused = self.server is not None
+            if not reused:
+                self._open()
+            msg = build_message(self.sender_email)
+            try:
+                self.server.send_message(msg)
+                self.last_used = time.monotonic()
+                return
+            except smtplib.SMTPServerDisconnected:
+                self.server = None
+                if not reused or attempt == 2:
+                    raise
+                logger.debug("SMTP session dropped by the server, reconnecting")
+
+    def close(self):
+        if self.server is None:
+            return
+        try:
+            self.server.quit()
+        except Exception:
+            self.server.close()
+        self.server = None
+
+
+class EmailSender:
+    """The single background worker that drains the outbox over one reused SMTP session.
+
+    Delivery is at-least-once: a message is marked sent only after the server
+    accepted it, so a crash in between sends it again once the crashed
+    instance's claims are released (see EmailOutbox.release_stale).
+    A message that fails is retried with exponential backoff and given up
+    after MAX_ATTEMPTS, without holding up the rest of the batch. When no SMTP
+    session can be opened at all (server unreachable, login refused, settings
+    missing) the worker backs off as a whole without counting an attempt
+    against any message, so an outage of any length loses no mail. Due digest
+    messages are grouped per recipient and sent as one email.
+    """
+
+    def __init__(self, outbox=None, settings_provider=get_email_settings):
+        self.outbox = outbox or EmailOutbox()
+        self.session = SmtpSession(settings_provider)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._backoff_attempts = 0
+        self._heartbeat_at = 0.0
+        self.sent = 0
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self.outbox.purge_sent()
+        self._beat()
+        self._thread = threading.Thread(target=self._run, name="email-sender", daemon=True)
+        self._thread.start()
+        logger.info(f"Email sender started, outbox: {self.outbox.counts()}")
+
+    def wake(self):
+        """Tell the worker new mail is queued."""
+        self._wake.set()
+
+    def stop(self, timeout=10):
+        """Finish the message in progress, close the SMTP session and stop the worker."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.outbox.retire()
+
+    def _release_stale(self):
+        self._beat()
+        released = self.outbox.release_stale()
+        if released:
+            logger.warning(f"Released {released} emails held for attachments by an instance that has exited")
+
+    def _run(self):
+        next_pass = 0.0
+        while not self._stop.is_set():
+            try:
+                self._release_stale()
+            except Exception as e:
+                logger.error(f"Email sender heartbeat failed: {str(e)}")
+            if time.monotonic() >= next_pass:
+                try:
+                    delay = self._send_due()
+                except Exception as e:
+                    logger.error(f"Email sender error: {str(e)}")
+                    delay = retry_delay(1)
+                if delay is None:
+                    continue  # More mail is already due
+                next_pass = time.monotonic() + delay
+            # Wake at least every HEARTBEAT_SECONDS to keep this instance's held and claimed mail its own
+            if self._wake.wait(max(0.0, min(next_pass - time.monotonic(), HEARTBEAT_SECONDS))):
+                next_pass = 0.0
+            self._wake.clear()
+            if self.session.server is not None and time.monotonic() - self.session.last_used >= SESSION_IDLE_SECONDS:
+                self.session.close()
+        self.session.close()
+        logger.info("Email sender stopped")
+
+    def _send_due(self):
+        """Send one batch of due mail; returns seconds to wait before the next pass, or None to continue at once."""
+        messages = self.outbox.claim_due()
+        groups = group_digests(messages)
+        for position, group in enumerate(groups):
+            if self._stop.is_set():
+                self._unclaim(groups[position:])
+                return 0
+            if not self._send(group):
+                self._unclaim(groups[position + 1:])
+                self._backoff_attempts += 1
+                return retry_delay(self._backoff_attempts)
+            if time.monotonic() - self._heartbeat_at >= HEARTBEAT_SECONDS:
+                self._beat()  # A slow batch must not let this instance's claims look abandoned
+        if len(messages) == SEND_BATCH_SIZE:
+            return None
+        next_due = self.outbox.next_due_at()
+        wait = SESSION_IDLE_SECONDS if next_due is None else max(0.0, next_due - time.time())
+        if self.session.server is not None:
+            wait = min(wait, SESSION_IDLE_SECONDS)
+        return wait
+
+    def _unclaim(self, groups):
+        ids = [message["id"] for group in groups for message in group]
+        if ids:
+            self.outbox.defer(ids)
+
+    def _beat(self):
+        self.outbox.heartbeat()
+        self._heartbeat_at = time.monotonic()
+
+    def _send(self, messages):
+        """Send one message, or one digest of several; returns False if the server could not be reached."""
+        first = messages[0]
+        ids = [message["id"] for message in messages]
+        if len(messages) == 1:
+            subject = first["subject"]
+
+            def build(sender_email):
+                return build_email_message(sender_email, first["to_email"], subject, first["greeting"],
+                                           first["body_content"], first["footer"], first["attachments"])
+        else:
+            subject = f"{len(messages)} Pump Notifications"
+
+            def build(sender_email):
+                return build_digest_message(sender_email, messages)
+
+        try:
+            self.session.send(build)
+        except SmtpUnavailable as e:
+            # An outage or missing settings must not use up the message's attempts
+            self.outbox.defer(ids, e)
+            logger.error(f"Could not send email {', '.join(map(str, ids))} to {first['to_email']}, "
+                         f"server unavailable: {str(e)}")
+            return False
+        except Exception as e:
+            # Start the next message on a clean connection, whatever state this one left it in
+            self.session.close()
+            status = self.outbox.mark_failed_attempt(ids, e, permanent=is_permanent_error(e))
+            logger.error(f"Failed to send email {', '.join(map(str, ids))} to {first['to_email']} "
+                         f"(attempt {first['attempts'] + 1}, now {status}): {str(e)}")
+            return True
+        self.outbox.mark_sent(ids)
+        self._backoff_attempts = 0
+        self.sent += 1
+        logger.info(f"Email {', '.join(map(str, ids))} sent to {first['to_email']} with subject '{subject}'")
+        return True
+
+
+def group_digests(messages):
+    """Split due messages into send groups: each digest recipient's messages together, everything else alone."""
+    groups = []
+    digests = {}
+    for message in messages:
+        if message.get("digest_details") is None:
+            groups.append([message])
+        elif message["to_email"] in digests:
+            digests[message["to_email"]].append(message)
+        else:
+            digests[message["to_email"]] = [message]
+            groups.append(digests[message["to_email"]])
+    return groups
+
+
+def build_digest_message(sender_email, messages):
+    """One email for several queued notifications: a combined pump details table and each attachment once."""
+    attachments = []
+    for message in messages:
+        attachments.extend(path for path in message["attachments"] if path not in attachments)
+    first = messages[0]
+    since = time.strftime("%Y-%m-%d %H:%M", time.localtime(min(message["created_at"] for message in messages)))
+    body_content = f"""
+        <p>{len(messages)} pump notifications since {since}:</p>
+        {generate_digest_table([(message["subject"], message["digest_details"]) for message in messages])}
+    """
+    return build_email_message(sender_email, first["to_email"], f"{len(messages)} Pump Notifications", first["greeting"],
+                               body_content, first["footer"], attachments)
+
+
+_sender = None
+_sender_lock = threading.Lock()
+
+def get_email_sender():
+    """Return the process-wide email sender, starting it on first use."""
+    global _sender
+    if _sender is None:
+        with _sender_lock:
+            if _sender is None:
+                _sender = EmailSender()
+                _sender.start()
+    return _sender
+
+def queue_email(to_email, subject, greeting, body_content, footer="", *attachment_paths, digest_details=None,
+                wait_for=None):
+    """Queue a notification email (same arguments as export_utils.send_email) and return at once.
+
+    The message is written to the outbox before this returns, so it is sent
+    even if the application closes first. Pass the pump details the message is
+    about as digest_details to let it be combined with the recipient's other
+    notifications when a digest window is configured. Pass the Future of the
+    documents it attaches as wait_for to hold it until they are built; if they
+    fail, or the application closes first, it is sent with the ones that exist.
+    """
+    sender = get_email_sender()
+    message_id = sender.outbox.enqueue(to_email, subject, greeting, body_content, footer, attachment_paths,
+                                       digest_details, digest_window_seconds(), held=wait_for is not None)
+    if wait_for is None:
+        sender.wake()
+    else:
+        def attachments_done(_):
+            sender.outbox.release([message_id])
+            sender.wake()
+        wait_for.add_done_callback(attachments_done)
+    return message_id
+
+
+if __name__ == "__main__":
+    import tempfile
+    demo_outbox = EmailOutbox(os.path.join(tempfile.gettempdir(), "email_outbox_demo.db"))
+    demo_id = demo_outbox.enqueue("stores@example.com", "Demo", "Hello,", "<p>Queued message</p>")
+    print(f"Queued {demo_id}; claimed: {[m['id'] for m in demo_outbox.claim_due()]}; counts: {demo_outbox.counts()}")
+    print("Retry delays:", [retry_delay(attempt) for attempt in range(1, MAX_ATTEMPTS + 1)])
@@ -0,0 +1,146 @@
+import io
+import threading
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from reportlab.platypus import Image
+from utils.config import get_logger
+
+logger = get_logger("graphs")
+
+GRAPH_DPI = 100
+CERTIFICATE_GRAPH_SIZE = (6, 3)  # Inches, as drawn into the PDF
+PREVIEW_GRAPH_SIZE = (4, 2)
+PRESSURE_COLOR = (100/255, 149/255, 237/255)  # #6495ED
+AMPERAGE_COLOR = (255/255, 99/255, 71/255)    # #FF6347
+
+_local = threading.local()
+
+
+def _values(test_data, key):
+    return [float(x) if x.strip() else 0.0 for x in test_data.get(key, [""] * 5)]
+
+
+def flow_curve_points(test_data):
+    """Return the (flowrate, pressure, amperage) readings sorted by flowrate, skipping empty rows; [] if none."""
+    points = [(f, p, a) for f, p, a in zip(_values(test_data, "flowrate"), _values(test_data, "pressure"),
+                                           _values(test_data, "amperage")) if f or p or a]
+    return sorted(points, key=lambda x: x[0])
+
+
+def _axis_limits(values, default_max, default_range):
+    positive = [v for v in values if v > 0]
+    low = min(positive) if positive else 0
+    high = max(values) if values else default_max
+    span = high - low if high > low else default_range
+    return max(0, low - span * 0.1), high + span * 0.1
+
+
+def plot_flow_curve(fig, test_data):
+    """Draw pressure and amperage against flowrate (the certificate graph) on fig; returns False if there is no data."""
+    points = flow_curve_points(test_data)
+    if not points:
+        return False
+    flowrate, pressure, amperage = zip(*points)
+
+    ax1 = fig.add_subplot(111)
+    ax1.plot(flowrate, pressure, marker='o', color=PRESSURE_COLOR, label='Pressure (bar)', linewidth=1.5)
+    ax1.set_xlabel("Flowrate (l/h)", fontsize=8)
+    ax1.set_ylabel("Pressure (bar)", color=PRESSURE_COLOR, fontsize=8)
+    ax1.tick_params(axis='y', labelcolor=PRESSURE_COLOR, labelsize=6)
+    ax1.tick_params(axis='x', labelsize=6)
+    ax1.grid(True, linestyle='--', alpha=0.7)
+
+    ax2 = ax1.twinx()
+    ax2.plot(flowrate, amperage, marker='s', color=AMPERAGE_COLOR, label='Amperage (A)', linewidth=1.5)
+    ax2.set_ylabel("Amperage (A)", color=AMPERAGE_COLOR, fontsize=8)
+    ax2.tick_params(axis='y', labelcolor=AMPERAGE_COLOR, labelsize=6)
+
+    ax1.set_xlim(*_axis_limits(flowrate, 1000, 100))
+    ax1.set_ylim(*_axis_limits(pressure, 5, 1))
+    ax2.set_ylim(*_axis_limits(amperage, 10, 1))
+
+    ax1.set_title("Pump Test Results", fontsize=10, pad=5)
+    lines1, labels1 = ax1.get_legend_handles_labels()
+    lines2, labels2 = ax2.get_legend_handles_labels()
+    ax1.legend(lines1 + lines2, labels1 + labels2, loc='best', fontsize=6)
+    fig.tight_layout()
+    return True
+
+
+def plot_test_series(fig, test_data):
+    """Draw amperage and pressure per test number (the notification graph) on fig; returns False if there is no data."""
+    tests = [i + 1 for i, x in enumerate(test_data["amperage"]) if x.strip()]
+    amperage = [float(x) for x in test_data["amperage"] if x.strip()]
+    pressure = [float(x) for x in test_data["pressure"] if x.strip()]
+    if not amperage and not pressure:
+        return False
+
+    ax = fig.add_subplot(111)
+    if amperage:
+        ax.plot(tests, amperage, label="Amperage (A)", color="blue", marker="o")
+    if pressure:
+        ax.plot(range(1, len(pressure) + 1), pressure, label="Pressure (bar)", color="red", marker="o")
+    ax.set_xlabel("Test Number")
+    ax.set_ylabel("Value")
+    ax.set_title("Pump Test Results")
+    ax.legend()
+    ax.grid(True)
+    return True
+
+
+def _render_figure():
+    """This thread's reusable off-screen figure; pyplot is never involved, so threads do not share state."""
+    fig = getattr(_local, "figure", None)
+    if fig is None:
+        fig = Figure()
+        FigureCanvasAgg(fig)
+        _local.figure = fig
+    return fig
+
+
+def render_graph_png(plot, test_data, size=CERTIFICATE_GRAPH_SIZE, dpi=GRAPH_DPI):
+    """Render plot(fig, test_data) to PNG in memory; returns a BytesIO positioned at 0, or None if there was nothing to plot."""
+    fig = _render_figure()
+    fig.clear()
+    fig.set_size_inches(*size)
+    try:
+        if not plot(fig, test_data):
+            logger.debug("No valid data to plot")
+            return None
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format="png", dpi=dpi, bbox_inches="tight")
+        buffer.seek(0)
+        return buffer
+    except Exception as e:
+        logger.error(f"Graph rendering failed: {str(e)}")
+        return None
+    finally:
+        fig.clear()  # Drop the artists (and the data they reference) until the next render
+
+
+def graph_flowable(plot, test_data, width, height, size=CERTIFICATE_GRAPH_SIZE):
+    """Return an Image flowable of the rendered graph for a ReportLab story, or None if there was nothing to plot."""
+    buffer = render_graph_png(plot, test_data, size)
+    if buffer is None:
+        return None
+    return Image(buffer, width=width, height=height)
+
+
+def preview_figure(test_data, size=PREVIEW_GRAPH_SIZE):
+    """Return a new Figure of the certificate graph for embedding in Tk (FigureCanvasTkAgg), or None if there is no data."""
+    fig = Figure(figsize=size)
+    return fig if plot_flow_curve(fig, test_data) else None
+
+
+if __name__ == "__main__":
+    import time
+    from reportlab.lib.units import inch
+    from reportlab.platypus import SimpleDocTemplate
+    demo = {"flowrate": ["1200", "900", "600", "300", "0"], "pressure": ["0.5", "1.2", "1.9", "2.4", "2.8"],
+            "amperage": ["3.1", "2.9", "2.6", "2.2", "1.9"]}
+    start = time.perf_counter()
+    for i in range(20):
+        output = io.BytesIO()
+        SimpleDocTemplate(output).build([graph_flowable(plot_flow_curve, demo, 6*inch, 3*inch),
+                                         graph_flowable(plot_test_series, demo, 6*inch, 3*inch)])
+    print(f"Built 20 documents with 2 graphs each in {time.perf_counter() - start:.2f}s")
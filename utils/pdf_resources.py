@@ -0,0 +1,230 @@
+import os
+import threading
+from types import MappingProxyType
+from reportlab.lib import colors
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.platypus import Flowable, TableStyle
+from utils.config import get_logger, BASE_DIR
+
+logger = get_logger("pdf_resources")
+
+FONT_PATHS = {
+    "Roboto": os.path.join(BASE_DIR, "assets", "Roboto-Regular.ttf"),
+    "Roboto-Black": os.path.join(BASE_DIR, "assets", "Roboto-Black.ttf"),
+}
+CERTIFICATE_GOLD = colors.Color(188/255, 161/255, 4/255)
+
+_lock = threading.Lock()
+_fonts_registered = False
+_styles = None
+_table_styles = None
+_images = {}
+
+
+def register_fonts():
+    """Register the Roboto fonts with ReportLab (once per process); raises if a font cannot be loaded."""
+    global _fonts_registered
+    with _lock:
+        if _fonts_registered:
+            return
+        try:
+            for name, path in FONT_PATHS.items():
+                pdfmetrics.registerFont(TTFont(name, path))
+        except Exception as e:
+            logger.error(f"Failed to register fonts: {str(e)}")
+            raise Exception(f"Failed to register fonts: {str(e)}")
+        _fonts_registered = True
+        logger.info("Roboto fonts registered successfully")
+
+
+def _build_styles():
+    sample = getSampleStyleSheet()
+    return MappingProxyType({
+        "title": ParagraphStyle(name="CenteredTitle", parent=sample["Heading1"], alignment=1),
+        "heading1": sample["Heading1"],
+        "heading2": sample["Heading2"],
+        "normal": sample["Normal"],
+        "cell": ParagraphStyle(name="CellStyle", fontSize=10, leading=12, wordWrap="CJK", alignment=0),
+        "footer": ParagraphStyle(name="Footer", fontSize=10, alignment=1, textColor=colors.grey),
+        "certificate_heading": ParagraphStyle(name="Heading", fontName="Roboto-Black", fontSize=14, alignment=0),
+        "certificate_subheading": ParagraphStyle(name="Subheading", fontName="Roboto-Black", fontSize=9, alignment=1),
+    })
+
+
+def _certificate_header(last_column, span=False):
+    """Gold, bold header row over a Roboto 7.5pt grid; span merges the header across all columns."""
+    commands = [
+        ("FONTNAME", (0, 0), (-1, -1), "Roboto"),
+        ("FONTSIZE", (0, 0), (-1, -1), 7.5),
+        ("LEADING", (0, 0), (-1, -1), 8),
+        ("FONTNAME", (0, 0), (last_column, 0), "Roboto-Black"),
+        ("FONTSIZE", (0, 0), (last_column, 0), 9),
+    ]
+    if span:
+        commands += [("SPAN", (0, 0), (last_column, 0)), ("ALIGN", (0, 0), (last_column, 0), "CENTER")]
+    commands += [
+        ("VALIGN", (0, 0), (-1, -1), "TOP"),
+        ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+        ("BACKGROUND", (0, 0), (last_column, 0), CERTIFICATE_GOLD),
+    ]
+    return TableStyle(commands)
+
+
+def _build_table_styles():
+    return MappingProxyType({
+        # export_utils notifications and BOM checklists
+        "notification": TableStyle([
+            ("BACKGROUND", (0, 0), (-1, 0), colors.grey),
+            ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
+            ("ALIGN", (0, 0), (-1, -1), "LEFT"),
+            ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+            ("FONTSIZE", (0, 0), (-1, -1), 10),
+            ("BOTTOMPADDING", (0, 0), (-1, 0), 12),
+            ("BACKGROUND", (0, 1), (-1, -1), colors.beige),
+            ("GRID", (0, 0), (-1, -1), 1, colors.black),
+            ("VALIGN", (0, 0), (-1, -1), "TOP"),
+        ]),
+        # utils.doc_utils notifications: a header row (lists) or a header column (fields)
+        "summary_list": TableStyle([
+            ("FONTNAME", (0, 0), (-1, -1), "Helvetica"),
+            ("FONTSIZE", (0, 0), (-1, -1), 10),
+            ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+            ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
+        ]),
+        "summary_fields": TableStyle([
+            ("FONTNAME", (0, 0), (-1, -1), "Helvetica"),
+            ("FONTSIZE", (0, 0), (-1, -1), 10),
+            ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+            ("BACKGROUND", (0, 0), (0, -1), colors.lightgrey),
+        ]),
+        # Test certificates
+        "certificate_info": TableStyle([
+            ("FONTNAME", (0, 0), (-1, -1), "Roboto"),
+            ("FONTSIZE", (0, 0), (-1, -1), 7.5),
+            ("LEADING", (0, 0), (-1, -1), 8),
+            ("VALIGN", (0, 0), (-1, -1), "TOP"),
+            ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+            ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
+        ]),
+        "certificate_section": _certificate_header(1),
+        "certificate_banner": _certificate_header(3, span=True),
+        "certificate_results": TableStyle([
+            ("FONTNAME", (0, 0), (-1, -1), "Roboto"),
+            ("FONTSIZE", (0, 0), (-1, -1), 7.5),
+            ("LEADING", (0, 0), (-1, -1), 8),
+            ("FONTSIZE", (0, 0), (3, 0), 8),
+            ("VALIGN", (0, 0), (-1, -1), "TOP"),
+            ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+            ("BACKGROUND", (0, 0), (3, 0), CERTIFICATE_GOLD),
+        ]),
+        "certificate_columns": TableStyle([
+            ("VALIGN", (0, 0), (-1, -1), "TOP"),
+            ("ALIGN", (0, 0), (-1, -1), "LEFT"),
+            ("LEFTPADDING", (0, 0), (-1, -1), 0),
+            ("RIGHTPADDING", (0, 0), (-1, -1), 0),
+        ]),
+        "certificate_graph": TableStyle([
+            ("BOX", (0, 0), (-1, -1), 0.5, colors.grey),
+            ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+            ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+        ]),
+    })
+
+
+def get_pdf_styles():
+    """Return the shared, read-only {name: ParagraphStyle} used by every PDF generator.
+
+    Registers the fonts the certificate styles need on first use. The styles
+    are shared between documents and threads, so never modify one; derive a
+    new ParagraphStyle with parent= instead.
+    """
+    global _styles
+    if _styles is None:
+        register_fonts()
+        with _lock:
+            if _styles is None:
+                _styles = _build_styles()
+    return _styles
+
+
+def get_table_styles():
+    """Return the shared, read-only {name: TableStyle} used by every PDF generator (see get_pdf_styles)."""
+    global _table_styles
+    if _table_styles is None:
+        with _lock:
+            if _table_styles is None:
+                _table_styles = _build_table_styles()
+    return _table_styles
+
+
+def _image(path):
+    """Decode and measure an image once; returns (ImageReader, (width, height)), or None if it cannot be read."""
+    with _lock:
+        if path in _images:
+            return _images[path]
+    entry = None
+    if os.path.exists(path):
+        try:
+            reader = ImageReader(path)
+            reader.getRGBData()  # Decode now so every document reuses the pixels
+            entry = (reader, reader.getSize())
+        except Exception as e:
+            logger.warning(f"Failed to load image {path}: {str(e)}")
+    with _lock:
+        _images[path] = entry
+    return entry
+
+
+def image_size(path):
+    """Return the (width, height) in pixels of a cached image, or None if it cannot be read."""
+    entry = _image(path)
+    return entry[1] if entry else None
+
+
+class CachedImage(Flowable):
+    """Flowable drawing an already decoded ImageReader at a fixed size, aligned by hAlign like platypus Image."""
+
+    def __init__(self, reader, width, height, h_align="CENTER"):
+        Flowable.__init__(self)
+        self.reader = reader
+        self.drawWidth = width
+        self.drawHeight = height
+        self.hAlign = h_align
+
+    def wrap(self, availWidth, availHeight):
+        return self.drawWidth, self.drawHeight
+
+    def draw(self):
+        self.canv.drawImage(self.reader, 0, 0, self.drawWidth, self.drawHeight, mask="auto")
+
+
+def image_flowable(path, width, height, h_align="CENTER"):
+    """Return a new flowable drawing the cached, already decoded image at path, or None if it cannot be read.
+
+    Flowables hold per-document layout state, so each document gets its own;
+    only the decoded image is shared.
+    """
+    entry = _image(path)
+    if entry is None:
+        return None
+    return CachedImage(entry[0], width, height, h_align)
+
+
+if __name__ == "__main__":
+    import io
+    import time
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Table
+    logo_path = os.path.join(BASE_DIR, "assets", "logo.png")
+    start = time.perf_counter()
+    for i in range(20):
+        buffer = io.BytesIO()
+        story = [Paragraph(f"Document {i}", get_pdf_styles()["title"]),
+                 Table([["Field", "Value"], ["Serial", f"DEMO {i:03d}"]], style=get_table_styles()["notification"])]
+        logo = image_flowable(logo_path, 120, 40, "RIGHT")
+        if logo is not None:
+            story.insert(0, logo)
+        SimpleDocTemplate(buffer).build(story)
+    print(f"Built 20 documents in {time.perf_counter() - start:.2f}s; logo size {image_size(logo_path)}")
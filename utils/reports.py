@@ -0,0 +1,167 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from database import get_db_connection, update_rollups
+from utils.config import get_logger
+from utils.analytics import stage_statistics, bottleneck
+
+logger = get_logger("reports")
+
+DEFAULT_TTL = 60  # Seconds a computed set of reports is reused before querying again
+MONTHS_SHOWN_DAYS = 180
+ASSEMBLY_OVERDUE_DAYS = 2
+CYCLE_TIME_DAYS = 365
+
+REPORT_NAMES = (
+    "Pumps by Month",
+    "Pumps by Status",
+    "Pumps by Branch",
+    "Pumps Over 2 Days in Assembly",
+    "Pumps Assembled This Week",
+    "Pumps Assembled This Month",
+    "Pumps Assembled This Year",
+    "Pump Model Distribution",
+    "Stage Cycle Times",
+)
+
+# Every pump count the Reports tab needs from the daily rollup: GROUPING() says which set a row belongs to.
+# Status counts are pumps currently in each status; branch, model and month counts are pumps created.
+PUMP_COUNTS_QUERY = """
+    SELECT status, branch, pump_model, month_key,
+           GROUPING(status), GROUPING(branch), GROUPING(pump_model), GROUPING(month_key),
+           CASE WHEN GROUPING(status) = 0 THEN SUM(entered - exited) ELSE SUM(created) END
+    FROM (
+        SELECT status, branch, pump_model, created, entered, exited,
+               CASE WHEN day >= ? AND created > 0 THEN CONVERT(CHAR(7), day, 120) END AS month_key
+        FROM pump_daily_rollup
+    ) r
+    GROUP BY GROUPING SETS ((status), (branch), (pump_model), (month_key))
+"""
+
+# Open and recently closed stages; Assembler rows also feed the assembly lists, so they carry pump details
+STAGE_QUERY = """
+    SELECT h.status, h.entered_at, h.exited_at, p.serial_number, p.customer, p.branch, p.pump_model, p.configuration
+    FROM pump_status_history h
+    LEFT JOIN pumps p ON p.serial_number = h.serial_number AND h.status = 'Assembler'
+    WHERE h.exited_at IS NULL OR h.exited_at >= ?
+"""
+
+
+def _start_of_day(moment):
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def build_reports(pump_counts, stages, now):
+    """Turn the rows of PUMP_COUNTS_QUERY and STAGE_QUERY into {report name: [(detail, value, display)]}.
+
+    value is what an export writes, display what the Treeview shows.
+    """
+    reports = {name: [] for name in REPORT_NAMES}
+    models = []
+    for status, branch, model, month, g_status, g_branch, g_model, g_month, count in pump_counts:
+        if count <= 0 or (not g_branch and not branch) or (not g_model and not model):
+            continue  # Statuses no pump is in, and pumps deleted before their branch/model was known
+        if not g_status:
+            reports["Pumps by Status"].append((status, count, count))
+        elif not g_branch:
+            reports["Pumps by Branch"].append((branch, count, count))
+        elif not g_model:
+            models.append((model, count))
+        elif not g_month and month is not None:
+            reports["Pumps by Month"].append((month, count, count))
+    reports["Pumps by Month"].sort(reverse=True)
+    total = sum(count for _, count in models)
+    for model, count in models:
+        percentage = f"{(count / total * 100) if total else 0:.2f}%"
+        reports["Pump Model Distribution"].append((f"{model}: {count} pumps", percentage, percentage))
+
+    today = _start_of_day(now)
+    overdue = now - timedelta(days=ASSEMBLY_OVERDUE_DAYS)
+    periods = (("Pumps Assembled This Week", today - timedelta(days=today.weekday())),
+               ("Pumps Assembled This Month", today.replace(day=1)),
+               ("Pumps Assembled This Year", today.replace(month=1, day=1)))
+    timings = []
+    for status, entered_at, exited_at, serial, customer, branch, model, configuration in stages:
+        timings.append((status, entered_at, exited_at))
+        if status != "Assembler" or serial is None:
+            continue
+        detail = f"{serial} | {customer} | {branch} | {model} | {configuration}"
+        if exited_at is None:
+            if entered_at <= overdue:
+                days = (now - entered_at).days
+                reports["Pumps Over 2 Days in Assembly"].append((detail, days, f"{days} days"))
+        else:
+            for name, start in periods:
+                if exited_at >= start:
+                    reports[name].append((detail, exited_at, exited_at))
+
+    stats = stage_statistics(timings, now)
+    cycle = reports["Stage Cycle Times"]
+    for stage, summary in stats.items():
+        lead, age = summary["lead_time_hours"], summary["wip_age_hours"]
+        if lead["count"]:
+            value = f"{lead['p50']:.1f} / {lead['p90']:.1f} / {lead['max']:.1f}"
+            cycle.append((f"{stage} lead time ({lead['count']} pumps, last 12 months): median / p90 / max", value, value))
+        if age["count"]:
+            buckets = ", ".join(f"{label}: {count}" for label, count in summary["wip_age_buckets"].items())
+            value = f"{age['p50']:.1f} / {age['p90']:.1f} / {age['max']:.1f}"
+            cycle.append((f"{stage} WIP ({age['count']} pumps; {buckets}): median / p90 / oldest age", value, value))
+    slowest = bottleneck(stats)
+    if slowest:
+        cycle.append(("Slowest stage (median lead time)", slowest, slowest))
+    return reports
+
+
+class ReportEngine:
+    """Computes every admin report from two grouped queries and caches the result for a short TTL.
+
+    Pump counts are read from pump_daily_rollup, which get() first brings up to date.
+
+    get() is safe to call from worker threads; concurrent callers share one
+    computation instead of each querying the database.
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._reports = None
+        self._computed_at = 0.0
+
+    def get(self, force=False):
+        """Return {report name: [(detail, value, display)]}, recomputing if the cache is older than the TTL."""
+        with self._lock:
+            if not force and self._reports is not None and time.monotonic() - self._computed_at < self.ttl:
+                return self._reports
+            start = time.perf_counter()
+            now = datetime.now()
+            since = now - timedelta(days=CYCLE_TIME_DAYS)  # Also covers the start of the year
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                update_rollups(cursor)
+                conn.commit()
+                cursor.execute(PUMP_COUNTS_QUERY, (now - timedelta(days=MONTHS_SHOWN_DAYS),))
+                pump_counts = cursor.fetchall()
+                cursor.execute(STAGE_QUERY, (since,))
+                stages = cursor.fetchall()
+            self._reports = build_reports(pump_counts, stages, now)
+            self._computed_at = time.monotonic()
+            logger.info(f"Computed {len(self._reports)} reports in {time.perf_counter() - start:.2f}s")
+            return self._reports
+
+    def invalidate(self):
+        with self._lock:
+            self._reports = None
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_report_engine():
+    """Return the shared report engine."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = ReportEngine()
+    return _engine
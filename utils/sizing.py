@@ -0,0 +1,457 @@
+import csv
+import json
+import os
+import re
+import sys
+import threading
+import numpy as np
+from utils.config import get_logger
+
+logger = get_logger("sizing")
+
+# Determine the base directory for bundled resources
+if getattr(sys, 'frozen', False):
+    BASE_DIR = sys._MEIPASS
+else:
+    BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PUMP_SIZING_PATH = os.path.join(BASE_DIR, "assets", "pump_sizing.json")
+PUMP_CURVES_PATH = os.path.join(BASE_DIR, "assets", "pump_curves.csv")
+DEFAULT_TOP_K = 3
+# Duty points sized per vectorized pass; bounds the (points x impellers) temporaries to a few MB
+DEFAULT_CHUNK_SIZE = 8192
+# Every H-Q curve is resampled onto this many evenly spaced flows so all impellers interpolate in one pass
+CURVE_GRID_POINTS = 65
+# Duty points per trim pass; the system-curve intersection works on (points x impellers x grid) arrays
+TRIM_CHUNK_SIZE = 512
+# Assumed pump efficiency for shaft power estimates (the published P1 curves peak at 50-55%)
+DEFAULT_PUMP_EFFICIENCY = 0.5
+MOTOR_KW_PATTERN = re.compile(r"([\d.]+)\s*KW", re.IGNORECASE)
+
+
+def derive_curve(impeller, points=7):
+    """Approximate an impeller's H-Q curve from its pump_sizing.json ranges.
+
+    The ranges are the bounding box of the published curve: shut-off pressure
+    at the lowest flow, falling to the lowest pressure at the highest flow.
+    Between them the curve is taken as the usual centrifugal parabola.
+    """
+    q_min, q_max = impeller["capacity_range_Lhr"]
+    p_min, p_max = impeller["pressure_range_bar"]
+    t = np.linspace(0.0, 1.0, points)
+    return q_min + (q_max - q_min) * t, p_max - (p_max - p_min) * t ** 2
+
+
+def motor_kw(pump_id):
+    """Return the motor rating in kW from a model name such as 'P1 2.2KW', or None."""
+    match = MOTOR_KW_PATTERN.search(pump_id)
+    return float(match.group(1)) if match else None
+
+
+def load_curves(path=PUMP_CURVES_PATH):
+    """Read sampled H-Q curves keyed by (pump_id, diameter_mm).
+
+    The file is long-format CSV: pump_id, diameter_mm, flow_Lhr, pressure_bar,
+    source, one row per sampled point. Returns {key: (flows, pressures, source)}.
+    """
+    points = {}
+    with open(path, "r", newline="") as f:
+        for row in csv.DictReader(f):
+            key = (row["pump_id"], float(row["diameter_mm"]))
+            entry = points.setdefault(key, ([], [], row.get("source") or "digitized"))
+            entry[0].append(float(row["flow_Lhr"]))
+            entry[1].append(float(row["pressure_bar"]))
+    curves = {}
+    for key, (flows, pressures, source) in points.items():
+        flows = np.array(flows)
+        order = np.argsort(flows, kind="stable")
+        curves[key] = (flows[order], np.array(pressures)[order], source)
+    return curves
+
+
+class SizingEngine:
+    """pump_sizing.json and the impeller H-Q curves flattened into one NumPy row per (pump, impeller).
+
+    A duty point fits an impeller when its flow is on the impeller's curve and
+    the pressure the curve delivers at that flow is at least the required
+    pressure. Fits are scored by the excess pressure relative to the curve
+    (lower is better), so the best match is the curve passing closest above
+    the duty point. Every impeller is checked and scored at once, for one duty
+    point or for a whole batch of them.
+    """
+
+    def __init__(self, path=PUMP_SIZING_PATH, curves_path=PUMP_CURVES_PATH):
+        self.path = path
+        self.curves_path = curves_path
+        self._lock = threading.Lock()
+        self._signature = None
+        self._pumps = []
+        self._impellers = []
+        self._arrays = None
+        self.version = 0
+
+    @staticmethod
+    def _stat(path):
+        try:
+            st = os.stat(path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def _refresh(self):
+        signature = (self._stat(self.path), self._stat(self.curves_path))
+        if signature == self._signature and self.version:
+            return
+        with self._lock:
+            if signature == self._signature and self.version:
+                return
+            pumps = []
+            if signature[0] is None:
+                logger.error(f"Pump sizing file not found: {self.path}")
+            else:
+                try:
+                    with open(self.path, "r") as f:
+                        pumps = json.load(f)
+                    logger.info(f"Loaded pump sizing data from {self.path}")
+                except (OSError, ValueError) as e:
+                    logger.error(f"Failed to load pump sizing data from {self.path}: {str(e)}")
+                    if self.version:
+                        return  # Keep the last good data
+            curves = {}
+            if signature[1] is None:
+                logger.warning(f"Pump curve file not found: {self.curves_path}, deriving curves from pump sizing ranges")
+            else:
+                try:
+                    curves = load_curves(self.curves_path)
+                    logger.info(f"Loaded {len(curves)} pump curves from {self.curves_path}")
+                except (OSError, ValueError, KeyError) as e:
+                    logger.error(f"Failed to load pump curves from {self.curves_path}: {str(e)}")
+                    if self.version:
+                        return
+            self._index(pumps, curves)
+            self._signature = signature
+            self.version += 1
+
+    def _index(self, pumps, curves):
+        impellers = []
+        for model_index, pump in enumerate(pumps):
+            for impeller in pump.get("impellers", []):
+                impellers.append((model_index, impeller))
+
+        # Resample each curve onto a common number of evenly spaced flows between its ends
+        grid = np.linspace(0.0, 1.0, CURVE_GRID_POINTS)
+        curve_lo = np.empty(len(impellers))
+        curve_hi = np.empty(len(impellers))
+        curve_head = np.empty((len(impellers), CURVE_GRID_POINTS))
+        sources = []
+        for row, (model_index, impeller) in enumerate(impellers):
+            curve = curves.pop((pumps[model_index]["id"], float(impeller["diameter_mm"])), None)
+            if curve is None or len(curve[0]) < 2:
+                flows, pressures = derive_curve(impeller)
+                source = "derived"
+            else:
+                flows, pressures, source = curve
+            curve_lo[row], curve_hi[row] = flows[0], flows[-1]
+            curve_head[row] = np.interp(flows[0] + (flows[-1] - flows[0]) * grid, flows, pressures)
+            sources.append(source)
+        for pump_id, diameter in curves:
+            logger.warning(f"Ignoring pump curve for {pump_id} {diameter:g}mm: not in pump sizing data")
+
+        # Impeller rows of each model, padded with -1, so per-model choices are one gather
+        slots = [[] for _ in pumps]
+        for row, (model_index, _) in enumerate(impellers):
+            slots[model_index].append(row)
+        model_slots = np.full((len(pumps), max([len(rows) for rows in slots] + [1])), -1, dtype=np.int64)
+        for model_index, rows in enumerate(slots):
+            model_slots[model_index, :len(rows)] = rows
+        diameter = np.array([impeller["diameter_mm"] for _, impeller in impellers], dtype=np.float64)
+        ratings = [motor_kw(pump["id"]) for pump in pumps]
+
+        self._arrays = {
+            "model_index": np.array([model_index for model_index, _ in impellers], dtype=np.int32),
+            "diameter": diameter,
+            "curve_lo": curve_lo,
+            "curve_hi": curve_hi,
+            "curve_flow": curve_lo[:, None] + (curve_hi - curve_lo)[:, None] * grid,
+            "curve_head": curve_head,
+            "model_slots": model_slots,
+            "model_min_diameter": np.min(np.where(model_slots >= 0, np.append(diameter, np.inf)[model_slots], np.inf), axis=1),
+            "motor_kw": np.array([np.nan if kw is None else kw for kw in ratings], dtype=np.float64),
+        }
+        self._pumps = pumps
+        self._impellers = impellers
+        self._curve_sources = sources
+        logger.debug(f"Indexed {len(impellers)} impellers across {len(pumps)} pump models")
+
+    def pumps(self):
+        """Return the pump_sizing.json records (shared; do not modify)."""
+        self._refresh()
+        return self._pumps
+
+    def arrays(self):
+        """Return the per-impeller arrays (shared; do not modify)."""
+        self._refresh()
+        return self._arrays
+
+    def curve_pressures(self, flows):
+        """Interpolate every impeller's curve at each flow.
+
+        Returns (pressures, on_curve), both of shape (len(flows), impellers);
+        on_curve is False where the flow is outside the impeller's curve.
+        """
+        a = self.arrays()
+        return self._interp_curves(np.arange(len(a["diameter"])), np.asarray(flows, dtype=np.float64)[:, None])
+
+    def _interp_curves(self, rows, flows):
+        """Interpolate the curves of impeller rows at flows (rows and flows broadcast together)."""
+        a = self._arrays
+        lo = a["curve_lo"][rows]
+        hi = a["curve_hi"][rows]
+        width = hi - lo
+        position = (flows - lo) / np.where(width > 0, width, 1.0) * (CURVE_GRID_POINTS - 1)
+        on_curve = (flows >= lo) & (flows <= hi)
+        position = np.clip(np.nan_to_num(position), 0, CURVE_GRID_POINTS - 1)
+        left = np.minimum(position.astype(np.int64), CURVE_GRID_POINTS - 2)
+        head = a["curve_head"]
+        lower = head[rows, left]
+        pressures = lower + (position - left) * (head[rows, left + 1] - lower)
+        return pressures, on_curve
+
+    def scores(self, flows, pressures):
+        """Score duty points against every impeller.
+
+        Returns an array of shape (len(flows), impellers) holding the excess
+        pressure relative to the curve where the impeller can deliver the duty
+        point and inf where it cannot.
+        """
+        curve, on_curve = self.curve_pressures(flows)
+        pressures = np.asarray(pressures, dtype=np.float64)[:, None]
+        excess = curve - pressures
+        fits = on_curve & (excess >= 0) & (curve > 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(fits, excess / curve, np.inf)
+
+    @staticmethod
+    def _top_k(scores, k):
+        """Indices and scores of the k lowest scores per row, best first, ties to the lower index.
+
+        Missing matches are -1 / inf.
+        """
+        rows, width = scores.shape
+        indices = np.full((rows, k), -1, dtype=np.int64)
+        best = np.full((rows, k), np.inf)
+        kk = min(k, width)
+        if rows == 0 or kk == 0:
+            return indices, best
+        if kk < width:
+            # Partial selection finds the k-th best score per row without sorting every impeller.
+            # Scores tied with it are taken in impeller order so results are deterministic.
+            kth = np.partition(scores, kk - 1, axis=1)[:, kk - 1:kk]
+            below = scores < kth
+            tied = scores == kth
+            room = kk - below.sum(axis=1, keepdims=True)
+            chosen = below | (tied & (np.cumsum(tied, axis=1) <= room))
+            candidates = np.nonzero(chosen)[1].reshape(rows, kk)
+        else:
+            candidates = np.broadcast_to(np.arange(width), (rows, width))
+        candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+        order = np.argsort(candidate_scores, axis=1, kind="stable")
+        candidates = np.take_along_axis(candidates, order, axis=1)
+        candidate_scores = np.take_along_axis(candidate_scores, order, axis=1)
+        found = np.isfinite(candidate_scores)
+        indices[:, :kk] = np.where(found, candidates, -1)
+        best[:, :kk] = candidate_scores
+        return indices, best
+
+    def find_batch(self, flows, pressures, k=DEFAULT_TOP_K, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Size many duty points at once.
+
+        Returns (indices, scores), both of shape (len(flows), k): the impeller
+        indices of the best k matches per point, best first, padded with -1
+        (score inf) when fewer than k impellers fit. Use impeller() to look up
+        an index. Points with NaN flow or pressure match nothing.
+        """
+        flows = np.asarray(flows, dtype=np.float64).ravel()
+        pressures = np.asarray(pressures, dtype=np.float64).ravel()
+        if flows.shape != pressures.shape:
+            raise ValueError("flows and pressures must have the same length")
+        self._refresh()
+        indices = np.empty((len(flows), k), dtype=np.int64)
+        scores = np.empty((len(flows), k))
+        for start in range(0, len(flows), chunk_size):
+            stop = start + chunk_size
+            indices[start:stop], scores[start:stop] = self._top_k(self.scores(flows[start:stop], pressures[start:stop]), k)
+        return indices, scores
+
+    def impeller(self, index, score=None):
+        """Return the recommendation dict for an impeller index from find_batch()."""
+        model_index, impeller = self._impellers[index]
+        return {
+            "pump_id": self._pumps[model_index]["id"],
+            "impeller_diameter": impeller["diameter_mm"],
+            "capacity_range_Lhr": impeller["capacity_range_Lhr"],
+            "pressure_range_bar": impeller["pressure_range_bar"],
+            "curve_source": self._curve_sources[index],
+            "suitability_score": float(score) if score is not None else None
+        }
+
+    def find(self, flow_rate, pressure, k=DEFAULT_TOP_K):
+        """Return the best k pump/impeller matches for one duty point, best first.
+
+        Each match includes the pressure its curve delivers at the requested flow.
+        """
+        indices, scores = self.find_batch([flow_rate], [pressure], k)
+        curve, _ = self.curve_pressures([flow_rate])
+        matches = []
+        for index, score in zip(indices[0], scores[0]):
+            if index >= 0:
+                match = self.impeller(index, score)
+                match["curve_pressure_bar"] = round(float(curve[0, index]), 3)
+                matches.append(match)
+        return matches
+
+    def _system_curve_flows(self, flows, pressures):
+        """Flow at which each impeller's curve meets the system curve through each duty point.
+
+        The system curve is the affinity parabola p = K * Q**2 through the duty
+        point; trimming an impeller moves its operating point along it. Returns
+        shape (len(flows), impellers), NaN where the curve does not cross it.
+        """
+        a = self._arrays
+        k = pressures / flows ** 2
+        gap = a["curve_head"][None, :, :] - k[:, None, None] * a["curve_flow"][None, :, :] ** 2
+        below = gap < 0
+        right = np.argmax(below, axis=2)
+        crosses = below.any(axis=2) & (right > 0)
+        right = np.maximum(right, 1)
+        left = right - 1
+        gap_left = np.take_along_axis(gap, left[..., None], axis=2)[..., 0]
+        gap_right = np.take_along_axis(gap, right[..., None], axis=2)[..., 0]
+        rows = np.arange(gap.shape[1])
+        flow_left = a["curve_flow"][rows, left]
+        flow_right = a["curve_flow"][rows, right]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            crossing = flow_left + gap_left / (gap_left - gap_right) * (flow_right - flow_left)
+        return np.where(crosses, crossing, np.nan)
+
+    def trim_batch(self, flows, pressures, efficiency=DEFAULT_PUMP_EFFICIENCY, chunk_size=TRIM_CHUNK_SIZE):
+        """Trim an impeller of every pump model to each duty point using the affinity laws.
+
+        For each model the smallest listed impeller whose curve reaches the duty
+        point is the reference. Its curve is intersected with the system curve
+        through the duty point at flow Q1, and the trimmed diameter is
+        D * Q / Q1, rounded up to a whole mm and kept within the model's listed
+        sizes. The expected pressure at the required flow comes from the
+        reference curve scaled by (d / D)**2 at flow Q * D / d. Shaft power assumes a
+        constant pump efficiency; headroom is against the motor rating in the
+        model name.
+
+        Returns a dict of arrays of shape (len(flows), models): reference
+        (impeller index, -1 where the model cannot reach the duty),
+        trimmed_diameter, expected_pressure, shaft_kw, headroom_kw and
+        min_trim (True where the trim was limited by the smallest listed size).
+        """
+        flows = np.asarray(flows, dtype=np.float64).ravel()
+        pressures = np.asarray(pressures, dtype=np.float64).ravel()
+        if flows.shape != pressures.shape:
+            raise ValueError("flows and pressures must have the same length")
+        a = self.arrays()
+        models = len(a["model_slots"])
+        result = {
+            "reference": np.full((len(flows), models), -1, dtype=np.int64),
+            "trimmed_diameter": np.full((len(flows), models), np.nan),
+            "expected_pressure": np.full((len(flows), models), np.nan),
+            "shaft_kw": np.full((len(flows), models), np.nan),
+            "headroom_kw": np.full((len(flows), models), np.nan),
+            "min_trim": np.zeros((len(flows), models), dtype=bool),
+        }
+        if not models or not len(a["diameter"]):
+            return result
+        model_rows = np.arange(models)
+        for start in range(0, len(flows), chunk_size):
+            stop = start + chunk_size
+            flow = flows[start:stop]
+            pressure = pressures[start:stop]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                reaches = np.isfinite(self.scores(flow, pressure)) & (flow > 0)[:, None] & (pressure > 0)[:, None]
+                system_flow = self._system_curve_flows(flow, pressure)
+            usable = reaches & np.isfinite(system_flow)
+
+            # Smallest usable listed impeller per model
+            candidate = np.append(np.where(usable, a["diameter"], np.inf), np.full((len(flow), 1), np.inf), axis=1)
+            per_model = candidate[:, a["model_slots"]]
+            pick = np.argmin(per_model, axis=2)
+            found = np.isfinite(np.take_along_axis(per_model, pick[..., None], axis=2)[..., 0])
+            reference = np.where(found, a["model_slots"][model_rows, pick], 0)
+
+            full = a["diameter"][reference]
+            raw = full * flow[:, None] / np.take_along_axis(system_flow, reference, axis=1)
+            trimmed = np.ceil(np.round(raw, 6))
+            min_trim = trimmed < a["model_min_diameter"]
+            trimmed = np.clip(trimmed, a["model_min_diameter"], full)
+            ratio = trimmed / full
+            curve, _ = self._interp_curves(reference, flow[:, None] / ratio)
+            expected = ratio ** 2 * curve
+            shaft = flow[:, None] * expected / 36000.0 / efficiency  # L/h x bar -> kW
+
+            result["reference"][start:stop] = np.where(found, reference, -1)
+            result["trimmed_diameter"][start:stop] = np.where(found, trimmed, np.nan)
+            result["expected_pressure"][start:stop] = np.where(found, expected, np.nan)
+            result["shaft_kw"][start:stop] = np.where(found, shaft, np.nan)
+            result["headroom_kw"][start:stop] = np.where(found, a["motor_kw"] - shaft, np.nan)
+            result["min_trim"][start:stop] = found & min_trim
+        return result
+
+    def trim(self, flow_rate, pressure, efficiency=DEFAULT_PUMP_EFFICIENCY):
+        """Return the trimmed impeller for every pump model that can reach one duty point.
+
+        Sorted by motor rating and then estimated shaft power, so the smallest
+        suitable motor comes first.
+        """
+        result = self.trim_batch([flow_rate], [pressure], efficiency, chunk_size=1)
+        a = self._arrays
+        trims = []
+        for model_index, reference in enumerate(result["reference"][0]):
+            if reference < 0:
+                continue
+            rating = a["motor_kw"][model_index]
+            headroom = result["headroom_kw"][0, model_index]
+            trims.append({
+                "pump_id": self._pumps[model_index]["id"],
+                "reference_diameter": self._impellers[reference][1]["diameter_mm"],
+                "trimmed_diameter": int(result["trimmed_diameter"][0, model_index]),
+                "expected_pressure_bar": round(float(result["expected_pressure"][0, model_index]), 3),
+                "motor_kw": None if np.isnan(rating) else float(rating),
+                "shaft_kw": round(float(result["shaft_kw"][0, model_index]), 3),
+                "headroom_kw": None if np.isnan(headroom) else round(float(headroom), 3),
+                "headroom_pct": None if np.isnan(headroom) else round(float(headroom / rating * 100), 1),
+                "min_trim": bool(result["min_trim"][0, model_index]),
+            })
+        trims.sort(key=lambda t: (t["motor_kw"] if t["motor_kw"] is not None else np.inf, t["shaft_kw"]))
+        return trims
+
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_sizing_engine():
+    """Return the shared sizing engine."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = SizingEngine()
+    return _engine
+
+if __name__ == "__main__":
+    import time
+    engine = get_sizing_engine()
+    for match in engine.find(20000, 0.5):
+        print(match)
+    for trim in engine.trim(20000, 0.5):
+        print(trim)
+    rng = np.random.default_rng(0)
+    flows = rng.uniform(0, 70000, 100000)
+    pressures = rng.uniform(0, 5, 100000)
+    start = time.perf_counter()
+    indices, _ = engine.find_batch(flows, pressures)
+    print(f"Sized {len(flows)} duty points in {time.perf_counter() - start:.3f}s, {np.count_nonzero(indices[:, 0] >= 0)} with a match")
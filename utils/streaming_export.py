@@ -0,0 +1,134 @@
+import csv
+import os
+from utils.config import get_logger
+
+logger = get_logger("streaming_export")
+
+# Rows fetched from the database and written per pass; memory use depends on this, not on the table size
+EXPORT_BATCH_SIZE = 5000
+# Rows an Excel worksheet can hold, header included; longer exports continue on a new sheet
+XLSX_MAX_ROWS = 1048576
+
+
+class ExportCancelled(Exception):
+    """Raised when an export is cancelled before it finishes; the partial file has been removed."""
+
+
+def is_xlsx(path):
+    return os.path.splitext(path)[1].lower() in (".xlsx", ".xlsm")
+
+
+class RowWriter:
+    """Write rows to a CSV file or a streaming (write-only) XLSX workbook.
+
+    Given a header, XLSX output starts a new worksheet (repeating the header)
+    whenever a sheet is full, so exports are not limited to one sheet's rows.
+    """
+
+    def __init__(self, path, sheet_title="Sheet", header=None):
+        self.path = path
+        self.sheet_title = sheet_title
+        self.header = list(header) if header is not None else None
+        if is_xlsx(path):
+            from openpyxl import Workbook
+            self._workbook = Workbook(write_only=True)
+            self._file = None
+            self._sheets = 0
+            self._new_sheet()
+        else:
+            self._workbook = None
+            self._file = open(path, "w", newline="", encoding="utf-8-sig")
+            self._writer = csv.writer(self._file)
+            if self.header is not None:
+                self._writer.writerow(self.header)
+
+    def _new_sheet(self):
+        self._sheets += 1
+        title = self.sheet_title if self._sheets == 1 else f"{self.sheet_title} {self._sheets}"
+        self._sheet = self._workbook.create_sheet(title[:31])
+        self._sheet_rows = 0
+        if self.header is not None:
+            self._sheet.append(self.header)
+            self._sheet_rows = 1
+
+    def writerows(self, rows):
+        if self._workbook is not None:
+            for row in rows:
+                if self._sheet_rows >= XLSX_MAX_ROWS:
+                    self._new_sheet()
+                self._sheet.append(row)
+                self._sheet_rows += 1
+        else:
+            self._writer.writerows(rows)
+
+    def close(self):
+        if self._workbook is not None:
+            self._workbook.save(self.path)
+        else:
+            self._file.close()
+
+    def discard(self):
+        """Close without keeping the file."""
+        if self._workbook is not None:
+            for sheet in self._workbook.worksheets:
+                sheet.close()  # Finishes the sheet's temporary file; nothing is written to path
+        else:
+            self._file.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def export_rows(batches, header, path, sheet_title="Export", progress=None, cancel_event=None):
+    """Write an iterable of row batches to path (CSV or XLSX by extension); returns the rows written.
+
+    progress(rows_written) is called after every batch, from the calling
+    thread. If cancel_event is set between batches the file is removed and
+    ExportCancelled raised.
+    """
+    writer = RowWriter(path, sheet_title, header)
+    total = 0
+    try:
+        for batch in batches:
+            if cancel_event is not None and cancel_event.is_set():
+                raise ExportCancelled(f"Export to {path} cancelled after {total} rows")
+            writer.writerows(batch)
+            total += len(batch)
+            if progress is not None:
+                progress(total)
+    except BaseException:
+        writer.discard()
+        raise
+    writer.close()
+    logger.info(f"Exported {total} rows to {path}")
+    return total
+
+
+def fetch_batches(cursor, batch_size=EXPORT_BATCH_SIZE):
+    """Yield the rows of the cursor's current result set in fetchmany batches."""
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield [tuple(row) for row in rows]
+
+
+def export_query(cursor, query, params, header, path, sheet_title="Export", progress=None, cancel_event=None,
+                 batch_size=EXPORT_BATCH_SIZE):
+    """Stream the result of a query to a CSV or XLSX file without holding it in memory; returns the rows written.
+
+    The rows are read with fetchmany as the file is written, so a million-row
+    table costs no more memory than one batch. Run it on a worker thread; see
+    export_rows for progress and cancellation.
+    """
+    cursor.execute(query, params)
+    return export_rows(fetch_batches(cursor, batch_size), header, path, sheet_title, progress, cancel_event)
+
+
+if __name__ == "__main__":
+    import tempfile
+    demo_batches = ([(i, f"user{i % 7}", f"Demo action {i}") for i in range(start, start + 1000)]
+                    for start in range(0, 10000, 1000))
+    demo_path = os.path.join(tempfile.gettempdir(), "streaming_export_demo.csv")
+    written = export_rows(demo_batches, ("Id", "Username", "Action"), demo_path,
+                          progress=lambda count: print(f"{count} rows written"))
+    print(f"Wrote {written} rows to {demo_path}")